@@ -5,3 +5,19 @@ AI 핵심 기능 모듈
 - Recommendation: 추천 시스템
 - Vector DB: 벡터 데이터베이스
 """
+
+
+def warmup():
+    """
+    AI 스택을 미리 초기화합니다 (API 클라이언트 생성, 벡터 DB / 추천 카탈로그 로드).
+    호출하지 않아도 각 구성 요소는 처음 사용할 때 초기화됩니다.
+    """
+    from ai_core.llm.llm_utils import get_async_openai_client, get_genai, get_openai_client
+    from ai_core.recommendation.catalog_index import catalog_index
+    from ai_core.vector_db.vector_db import vector_store
+
+    get_openai_client()
+    get_async_openai_client()
+    get_genai()
+    vector_store.is_ready  # 최초 접근 시 인덱스 로드
+    catalog_index.build()
@@ -1,25 +1,77 @@
 # ai_core/llm/__init__.py
 """
 LLM (Large Language Model) 관련 기능
-- 감정 분석
+- 감정 분석 (로컬 fast-path 분류기 + LLM)
 - 캐릭터 응답 생성
-- 공감 응답 생성
+- 공감 응답 생성 (감정 + 응답 통합 structured output 호출)
+- 추천 응답 캐시 (TTL + LRU, 키별 응답 변형 풀)
+- 채팅 의미 캐시 ((캐릭터, 감정)별 Faiss 인덱스)
+- 임베딩 (배치 / coalescing / 캐시)
+- 대화 기록 압축 (최근 턴 + 점진적 요약, 토큰 예산)
+- 동일 LLM 요청 중복 제거 (singleflight)
+- LLM 호출 안정성 (요청 시간 예산, hedging, circuit breaker)
+- 비동기(async) 버전: 이름 앞에 a가 붙은 함수들
+- 스트리밍 응답 생성 (astream_*)
 """
 
 from .llm_utils import (
+    EMPATHY_FALLBACK,
     extract_emotion,
     extract_recent_emotion,
     get_embedding,
+    get_embeddings,
+    aextract_emotion,
+    aextract_emotion_and_respond,
+    aextract_emotion_strict,
+    aextract_recent_emotion,
+    aget_embedding,
+    aget_embeddings,
+    agenerate_empathetic_response,
+    agenerate_recommendation_response,
+    astream_empathetic_response,
+    astream_recommendation_response,
+    chat_semantic_cache,
+    combined_chat_stats,
+    embedding_batcher,
+    embedding_cache,
+    emotion_classifier,
+    history_compactor,
+    llm_resilience,
+    llm_singleflight,
+    start_llm_request_deadline,
     generate_character_response,
     generate_empathetic_response,
-    generate_recommendation_response
+    generate_recommendation_response,
+    recommendation_cache
 )
 
 __all__ = [
+    'EMPATHY_FALLBACK',
     'extract_emotion',
     'extract_recent_emotion',
     'get_embedding',
+    'get_embeddings',
+    'aextract_emotion',
+    'aextract_emotion_and_respond',
+    'aextract_emotion_strict',
+    'aextract_recent_emotion',
+    'aget_embedding',
+    'aget_embeddings',
+    'agenerate_empathetic_response',
+    'agenerate_recommendation_response',
+    'astream_empathetic_response',
+    'astream_recommendation_response',
+    'chat_semantic_cache',
+    'combined_chat_stats',
+    'embedding_batcher',
+    'embedding_cache',
+    'emotion_classifier',
+    'history_compactor',
+    'llm_resilience',
+    'llm_singleflight',
+    'start_llm_request_deadline',
     'generate_character_response',
     'generate_empathetic_response',
-    'generate_recommendation_response'
+    'generate_recommendation_response',
+    'recommendation_cache'
 ]
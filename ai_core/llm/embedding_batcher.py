@@ -0,0 +1,147 @@
+# embedding_batcher.py
+# 임베딩 요청 마이크로 배칭 (coalescing)
+# 동시에 들어온 임베딩 요청들을 몇 ms 동안 모아 한 번의 배치 호출로 보내고,
+# 결과를 각 호출자에게 돌려줍니다.
+
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+
+class EmbeddingBatcher:
+    """
+    임베딩 요청 coalescer
+
+    Args:
+        embed_batch_fn: (texts, task_type) -> 임베딩 리스트. 실패 시 예외를 발생시킵니다.
+        max_batch_size: 한 번의 업스트림 호출에 담을 최대 텍스트 수
+        max_wait_ms: 첫 요청이 들어온 뒤 배치를 모으기 위해 기다리는 최대 시간
+        max_concurrent_batches: 동시에 진행할 수 있는 업스트림 배치 호출 수
+    """
+
+    def __init__(
+        self,
+        embed_batch_fn: Callable[[List[str], str], List[List[float]]],
+        max_batch_size: int = 100,
+        max_wait_ms: float = 5.0,
+        max_concurrent_batches: int = 4
+    ):
+        self.embed_batch_fn = embed_batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.max_concurrent_batches = max(1, max_concurrent_batches)
+
+        self._queue: "queue.Queue" = queue.Queue()
+        self._start_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        # 통계
+        self._stats_lock = threading.Lock()
+        self._requests = 0
+        self._batches = 0
+        self._batched_texts = 0
+        self._deduplicated = 0
+        self._errors = 0
+
+    def _ensure_started(self):
+        """수집 스레드를 처음 사용할 때 시작합니다."""
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_concurrent_batches,
+                    thread_name_prefix="embedding-batch"
+                )
+                self._thread = threading.Thread(
+                    target=self._collect_loop,
+                    name="embedding-batcher",
+                    daemon=True
+                )
+                self._thread.start()
+
+    def submit(self, text: str, task_type: str = "RETRIEVAL_QUERY") -> Future:
+        """임베딩 요청을 큐에 넣고 결과 Future를 반환합니다. 배치 호출이 실패하면 Future에 예외가 설정됩니다."""
+        self._ensure_started()
+        future: Future = Future()
+        with self._stats_lock:
+            self._requests += 1
+        self._queue.put((text, task_type, future))
+        return future
+
+    def embed(self, text: str, task_type: str = "RETRIEVAL_QUERY", timeout: Optional[float] = None):
+        """임베딩 요청을 제출하고 결과를 기다립니다."""
+        return self.submit(text, task_type).result(timeout=timeout)
+
+    def _collect_loop(self):
+        """요청을 max_wait 동안 (또는 max_batch_size가 찰 때까지) 모아서 배치로 넘깁니다."""
+        while True:
+            first = self._queue.get()
+            pending: Dict[str, list] = {first[1]: [first]}
+            collected = 1
+            deadline = time.monotonic() + self.max_wait
+
+            while collected < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                pending.setdefault(item[1], []).append(item)
+                collected += 1
+
+            for task_type, items in pending.items():
+                for start in range(0, len(items), self.max_batch_size):
+                    self._executor.submit(self._flush, task_type, items[start:start + self.max_batch_size])
+
+    def _flush(self, task_type: str, items: list):
+        """모인 요청을 한 번의 업스트림 호출로 처리하고 결과를 호출자에게 전달합니다."""
+        # 같은 배치 안의 중복 텍스트는 한 번만 임베딩
+        unique_texts = list(dict.fromkeys(text for text, _, _ in items))
+
+        with self._stats_lock:
+            self._batches += 1
+            self._batched_texts += len(unique_texts)
+            self._deduplicated += len(items) - len(unique_texts)
+
+        try:
+            embeddings = self.embed_batch_fn(unique_texts, task_type)
+            # 응답 개수가 다르면 어떤 벡터가 어떤 텍스트의 것인지 알 수 없으므로 배치 전체를 실패로 처리
+            if len(embeddings) != len(unique_texts):
+                raise ValueError(f"임베딩 개수 불일치 (요청 {len(unique_texts)}개, 응답 {len(embeddings)}개)")
+        except Exception as e:
+            print(f"배치 임베딩 생성 중 오류 발생: {e}")
+            with self._stats_lock:
+                self._errors += 1
+            for _, _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        results = dict(zip(unique_texts, embeddings))
+        for text, _, future in items:
+            if not future.done():
+                future.set_result(results[text])
+
+    def stats(self) -> dict:
+        """배치 처리 통계 (batch fill ratio = 평균 배치 크기 / max_batch_size)"""
+        with self._stats_lock:
+            avg_batch_size = self._batched_texts / self._batches if self._batches else 0.0
+            return {
+                "requests": self._requests,
+                "batches": self._batches,
+                "batched_texts": self._batched_texts,
+                "deduplicated": self._deduplicated,
+                "errors": self._errors,
+                "avg_batch_size": round(avg_batch_size, 2),
+                "batch_fill_ratio": round(avg_batch_size / self.max_batch_size, 4),
+                "requests_per_upstream_call": round(self._requests / self._batches, 2) if self._batches else 0.0,
+                "queue_size": self._queue.qsize(),
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0
+            }
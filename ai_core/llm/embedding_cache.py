@@ -0,0 +1,267 @@
+# embedding_cache.py
+# 2단계 임베딩 캐시
+# 1단계: 프로세스 내 LRU (bounded)
+# 2단계: SQLite 디스크 저장소 - 재시작 후에도 유지되고, 같은 호스트의 uvicorn 워커끼리 공유됩니다.
+# 키는 hash(model, task_type, text) 입니다.
+# 비동기 경로(aget_many/aput_many)는 메모리 단계만 이벤트 루프에서 처리하고, SQLite 조회/저장은 스레드에서 실행합니다.
+
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import List, Optional
+
+
+def make_cache_key(model: str, task_type: str, text: str) -> str:
+    """(모델, task_type, 텍스트)의 내용 해시"""
+    digest = hashlib.sha256()
+    for part in (model, task_type, text):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class EmbeddingCache:
+    """
+    임베딩 2단계 캐시
+
+    Args:
+        path: SQLite 파일 경로 (None 또는 빈 문자열이면 디스크 단계 비활성화)
+        memory_max_entries: 메모리 LRU 최대 항목 수
+        disk_max_entries: 디스크 저장소 최대 항목 수 (초과 시 오래 사용되지 않은 항목부터 제거)
+    """
+
+    # 디스크 용량 검사 주기 (삽입 N회마다 한 번)
+    _DISK_TRIM_INTERVAL = 256
+
+    def __init__(self, path: Optional[str], memory_max_entries: int = 4096, disk_max_entries: int = 200000):
+        self.path = path or None
+        self.memory_max_entries = max(0, memory_max_entries)
+        self.disk_max_entries = max(1, disk_max_entries)
+
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._disk_ready = False
+        self._inserts_since_trim = 0
+
+        # 통계
+        self._memory_hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._memory_evictions = 0
+        self._disk_evictions = 0
+        self._disk_errors = 0
+
+    # ---------- 디스크 (SQLite) ----------
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        """스레드별 SQLite 연결 (디스크 단계가 비활성화되었거나 실패하면 None)"""
+        if self.path is None:
+            return None
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            return conn
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=3.0, isolation_level=None)
+            # 여러 워커 프로세스가 동시에 읽고 쓸 수 있도록 WAL 모드 사용
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            if not self._disk_ready:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS embedding_cache ("
+                    "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_access REAL NOT NULL)"
+                )
+                conn.execute(
+                    "CREATE INDEX IF NOT EXISTS ix_embedding_cache_last_access "
+                    "ON embedding_cache (last_access)"
+                )
+                self._disk_ready = True
+            self._local.conn = conn
+            return conn
+        except sqlite3.Error as e:
+            print(f"임베딩 캐시 DB 연결 중 오류 발생: {e}")
+            self._disk_errors += 1
+            return None
+
+    def _disk_get_many(self, keys: List[str]) -> dict:
+        conn = self._connection()
+        if conn is None or not keys:
+            return {}
+        try:
+            found = {}
+            # SQLite 변수 개수 제한을 넘지 않도록 나눠서 조회
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = conn.execute(
+                    f"SELECT key, vector FROM embedding_cache WHERE key IN ({placeholders})",
+                    chunk
+                ).fetchall()
+                for key, blob in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[key] = vector.tolist()
+            if found:
+                now = time.time()
+                conn.executemany(
+                    "UPDATE embedding_cache SET last_access = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+            return found
+        except sqlite3.Error as e:
+            print(f"임베딩 캐시 조회 중 오류 발생: {e}")
+            self._disk_errors += 1
+            return {}
+
+    def _disk_put_many(self, items: List[tuple]):
+        conn = self._connection()
+        if conn is None or not items:
+            return
+        try:
+            now = time.time()
+            conn.executemany(
+                "INSERT OR REPLACE INTO embedding_cache (key, vector, last_access) VALUES (?, ?, ?)",
+                [(key, array("f", vector).tobytes(), now) for key, vector in items]
+            )
+            self._inserts_since_trim += len(items)
+            if self._inserts_since_trim >= self._DISK_TRIM_INTERVAL:
+                self._inserts_since_trim = 0
+                self._trim_disk(conn)
+        except sqlite3.Error as e:
+            print(f"임베딩 캐시 저장 중 오류 발생: {e}")
+            self._disk_errors += 1
+
+    def _trim_disk(self, conn: sqlite3.Connection):
+        """디스크 저장소가 크기 제한을 넘으면 가장 오래 사용되지 않은 항목부터 제거합니다."""
+        (count,) = conn.execute("SELECT COUNT(*) FROM embedding_cache").fetchone()
+        overflow = count - self.disk_max_entries
+        if overflow > 0:
+            conn.execute(
+                "DELETE FROM embedding_cache WHERE key IN ("
+                "SELECT key FROM embedding_cache ORDER BY last_access ASC LIMIT ?)",
+                (overflow,)
+            )
+            self._disk_evictions += overflow
+
+    # ---------- 메모리 (LRU) ----------
+
+    def _memory_put(self, key: str, vector: List[float]):
+        """lock 보유 상태에서 호출"""
+        if self.memory_max_entries == 0:
+            return
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_max_entries:
+            self._memory.popitem(last=False)
+            self._memory_evictions += 1
+
+    def _memory_get_many(self, keys: List[str]) -> tuple:
+        """메모리 단계 조회 결과와 디스크에서 찾아야 할 위치 목록 (results, disk_lookup)"""
+        results: List[Optional[List[float]]] = [None] * len(keys)
+        disk_lookup = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    self._memory_hits += 1
+                    results[i] = vector
+                else:
+                    disk_lookup.append(i)
+        return results, disk_lookup
+
+    def _merge_disk_hits(self, keys: List[str], results: list, disk_lookup: List[int], found: dict):
+        with self._lock:
+            for i in disk_lookup:
+                vector = found.get(keys[i])
+                if vector is not None:
+                    self._disk_hits += 1
+                    self._memory_put(keys[i], vector)
+                    results[i] = vector
+                else:
+                    self._misses += 1
+
+    def _memory_put_many(self, model: str, task_type: str, texts: List[str], vectors: List[Optional[List[float]]]) -> List[tuple]:
+        """메모리 단계에 저장하고, 디스크에 저장할 (key, vector) 목록을 반환합니다."""
+        items = [
+            (make_cache_key(model, task_type, text), list(vector))
+            for text, vector in zip(texts, vectors)
+            if vector is not None
+        ]
+        with self._lock:
+            for key, vector in items:
+                self._memory_put(key, vector)
+        return items
+
+    # ---------- 공개 API ----------
+
+    def get_many(self, model: str, task_type: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """여러 텍스트의 캐시된 임베딩을 조회합니다. 없는 항목은 None입니다."""
+        keys = [make_cache_key(model, task_type, text) for text in texts]
+        results, disk_lookup = self._memory_get_many(keys)
+        if disk_lookup:
+            found = self._disk_get_many(list({keys[i] for i in disk_lookup}))
+            self._merge_disk_hits(keys, results, disk_lookup, found)
+        return results
+
+    def get(self, model: str, task_type: str, text: str) -> Optional[List[float]]:
+        """텍스트 하나의 캐시된 임베딩을 조회합니다."""
+        return self.get_many(model, task_type, [text])[0]
+
+    def put_many(self, model: str, task_type: str, texts: List[str], vectors: List[Optional[List[float]]]):
+        """임베딩 결과를 두 단계 모두에 저장합니다. None(실패)은 저장하지 않습니다."""
+        items = self._memory_put_many(model, task_type, texts, vectors)
+        self._disk_put_many(items)
+
+    def put(self, model: str, task_type: str, text: str, vector: Optional[List[float]]):
+        """임베딩 결과 하나를 저장합니다."""
+        self.put_many(model, task_type, [text], [vector])
+
+    async def aget_many(self, model: str, task_type: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """get_many의 비동기 버전 (디스크 조회는 스레드에서 실행해 이벤트 루프를 막지 않음)"""
+        keys = [make_cache_key(model, task_type, text) for text in texts]
+        results, disk_lookup = self._memory_get_many(keys)
+        if disk_lookup:
+            found = {}
+            if self.path is not None:
+                found = await asyncio.to_thread(self._disk_get_many, list({keys[i] for i in disk_lookup}))
+            self._merge_disk_hits(keys, results, disk_lookup, found)
+        return results
+
+    async def aget(self, model: str, task_type: str, text: str) -> Optional[List[float]]:
+        return (await self.aget_many(model, task_type, [text]))[0]
+
+    async def aput_many(self, model: str, task_type: str, texts: List[str], vectors: List[Optional[List[float]]]):
+        """put_many의 비동기 버전 (디스크 저장은 스레드에서 실행)"""
+        items = self._memory_put_many(model, task_type, texts, vectors)
+        if items and self.path is not None:
+            await asyncio.to_thread(self._disk_put_many, items)
+
+    async def aput(self, model: str, task_type: str, text: str, vector: Optional[List[float]]):
+        await self.aput_many(model, task_type, [text], [vector])
+
+    def stats(self) -> dict:
+        """캐시 적중/미스/제거 통계"""
+        with self._lock:
+            lookups = self._memory_hits + self._disk_hits + self._misses
+            return {
+                "memory_hits": self._memory_hits,
+                "disk_hits": self._disk_hits,
+                "misses": self._misses,
+                "hit_rate": round((self._memory_hits + self._disk_hits) / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "memory_max_entries": self.memory_max_entries,
+                "memory_evictions": self._memory_evictions,
+                "disk_enabled": self.path is not None,
+                "disk_max_entries": self.disk_max_entries,
+                "disk_evictions": self._disk_evictions,
+                "disk_errors": self._disk_errors
+            }
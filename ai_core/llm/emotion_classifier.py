@@ -0,0 +1,139 @@
+# emotion_classifier.py
+# 로컬 감정 분류기 (fast-path)
+# 감정 어휘 사전 기반으로 '행복', '슬픔', '분노', '평온', '불안' 중 하나를 CPU에서 바로 판별합니다.
+# 확신도가 임계값 이상인 경우에만 사용하고, 그 외에는 LLM(extract_emotion)으로 넘깁니다.
+
+import re
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+
+# 감정별 어휘 (어간 단위, 값은 가중치)
+# 가중치 2: 감정을 직접 가리키는 단어 / 1: 정황상 감정을 암시하는 단어
+EMOTION_LEXICON: Dict[str, Dict[str, float]] = {
+    "행복": {
+        "행복": 2, "기쁘": 2, "기뻐": 2, "기쁜": 2, "신나": 2, "신난": 2, "즐거": 2, "즐겁": 2,
+        "좋아": 1, "좋았": 1, "좋은": 1, "최고": 1, "뿌듯": 2, "설레": 1, "설렜": 1,
+        "감사": 1, "고마": 1, "웃었": 1, "웃음": 1, "합격": 1, "축하": 1, "사랑": 1, "만족": 1
+    },
+    "슬픔": {
+        "슬프": 2, "슬퍼": 2, "슬픈": 2, "슬픔": 2, "우울": 2, "눈물": 2, "울었": 2, "울고": 1,
+        "외로": 2, "외롭": 2, "그리워": 1, "그립": 1, "보고싶": 1, "보고 싶": 1, "허전": 1,
+        "속상": 2, "서운": 1, "상실": 1, "이별": 1, "헤어": 1, "힘들": 1, "지쳤": 1, "공허": 1
+    },
+    "분노": {
+        "화나": 2, "화가": 2, "화났": 2, "짜증": 2, "열받": 2, "빡치": 2, "빡쳐": 2, "분노": 2,
+        "억울": 1, "어이없": 1, "어이가 없": 1, "싫어": 1, "미워": 1, "밉다": 1, "욕했": 1, "분하": 1
+    },
+    "평온": {
+        "평온": 2, "편안": 2, "편했": 1, "여유": 1, "차분": 2, "느긋": 2, "잔잔": 1, "평화": 2,
+        "산책": 1, "휴식": 1, "쉬었": 1, "한가": 1, "무난": 1, "평범": 1, "안정": 1
+    },
+    "불안": {
+        "불안": 2, "걱정": 2, "초조": 2, "긴장": 2, "두려": 2, "두렵": 2, "무서": 2, "무섭": 2,
+        "떨려": 1, "떨린": 1, "막막": 2, "조마조마": 2, "불확실": 1, "겁나": 2, "겁이": 1, "신경 쓰": 1
+    }
+}
+
+# 바로 뒤에 오면 감정 단어를 부정하는 표현 ("좋지 않았다", "행복하지 못해")
+_NEGATION_SUFFIX = re.compile(r"^\S{0,3}지\s*(않|못|말)")
+# 바로 앞에 오면 부정하는 표현 ("안 좋아", "못 쉬었다")
+_NEGATION_PREFIX = re.compile(r"(^|\s)(안|못)\s?$")
+
+
+@dataclass
+class EmotionPrediction:
+    """로컬 분류 결과"""
+    label: Optional[str]
+    confidence: float
+    scores: Dict[str, float]
+
+
+class LexiconEmotionClassifier:
+    """
+    어휘 사전 기반 감정 분류기
+
+    confidence = 최고 점수 / (전체 점수 + smoothing)
+    - 감정 단어가 하나도 없으면 0
+    - 서로 다른 감정의 단어가 섞이면 낮아지므로 LLM으로 넘어갑니다.
+    """
+
+    def __init__(self, lexicon: Dict[str, Dict[str, float]] = None, smoothing: float = 1.0):
+        self.lexicon = lexicon or EMOTION_LEXICON
+        self.smoothing = smoothing
+        # 전체 어휘를 하나의 정규식으로 묶어 한 번만 스캔 (긴 어휘 우선)
+        self._words = {
+            word: (label, weight)
+            for label, words in self.lexicon.items()
+            for word, weight in words.items()
+        }
+        self._pattern = re.compile(
+            "|".join(re.escape(word) for word in sorted(self._words, key=len, reverse=True))
+        )
+
+        # 통계
+        self._lock = threading.Lock()
+        self._fast_path_hits = 0
+        self._llm_fallbacks = 0
+        self._fallback_compared = 0
+        self._fallback_agreed = 0
+        self._shadow_compared = 0
+        self._shadow_agreed = 0
+
+    def predict(self, text: str) -> EmotionPrediction:
+        """텍스트의 감정을 로컬에서 판별합니다."""
+        scores = {label: 0.0 for label in self.lexicon}
+        if not text:
+            return EmotionPrediction(None, 0.0, scores)
+
+        for match in self._pattern.finditer(text):
+            before = text[max(0, match.start() - 3):match.start()]
+            after = text[match.end():match.end() + 8]
+            if _NEGATION_PREFIX.search(before) or _NEGATION_SUFFIX.search(after):
+                continue
+            label, weight = self._words[match.group()]
+            scores[label] += weight
+
+        total = sum(scores.values())
+        if total == 0:
+            return EmotionPrediction(None, 0.0, scores)
+
+        label = max(scores, key=scores.get)
+        confidence = scores[label] / (total + self.smoothing)
+        return EmotionPrediction(label, round(confidence, 4), scores)
+
+    # ---------- 지표 ----------
+
+    def record_fast_path(self):
+        with self._lock:
+            self._fast_path_hits += 1
+
+    def record_fallback(self, local_label: Optional[str], llm_label: str):
+        """LLM으로 넘어간 경우, 로컬 추정치가 있으면 LLM 결과와의 일치 여부를 기록합니다."""
+        with self._lock:
+            self._llm_fallbacks += 1
+            if local_label is not None:
+                self._fallback_compared += 1
+                self._fallback_agreed += int(local_label == llm_label)
+
+    def record_shadow(self, local_label: str, llm_label: str):
+        """fast-path 결과를 샘플링해 LLM으로 재확인한 결과를 기록합니다."""
+        with self._lock:
+            self._shadow_compared += 1
+            self._shadow_agreed += int(local_label == llm_label)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self._fast_path_hits + self._llm_fallbacks
+            return {
+                "fast_path_hits": self._fast_path_hits,
+                "llm_fallbacks": self._llm_fallbacks,
+                "fast_path_hit_rate": round(self._fast_path_hits / total, 4) if total else 0.0,
+                # 확신도가 낮았던 로컬 추정치와 LLM 결과의 일치율
+                "fallback_agreement": round(self._fallback_agreed / self._fallback_compared, 4) if self._fallback_compared else None,
+                "fallback_compared": self._fallback_compared,
+                # fast-path로 답한 결과를 샘플링해 LLM과 비교한 일치율 (fast-path 정확도 추정치)
+                "shadow_agreement": round(self._shadow_agreed / self._shadow_compared, 4) if self._shadow_compared else None,
+                "shadow_compared": self._shadow_compared
+            }
@@ -0,0 +1,211 @@
+# history_compactor.py
+# 긴 대화 기록 압축 (최근 N턴은 그대로, 이전 턴은 점진적으로 갱신되는 요약으로)
+# 감정 추출 프롬프트와 추천용 임베딩에 들어가는 대화 기록이 토큰 예산을 넘지 않도록 합니다.
+# 요약은 "이전 턴까지의 요약"을 키로 캐시해, 대화가 길어져도 새로 밀려난 턴만 요약에 합칩니다.
+
+import hashlib
+import math
+import threading
+from collections import OrderedDict
+from typing import Awaitable, Callable, List, Tuple
+
+SUMMARY_HEADER = "[이전 대화 요약]"
+RECENT_HEADER = "[최근 대화]"
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    토큰 수 추정 (토크나이저 없이)
+    영문/숫자는 약 4글자당 1토큰, 한글 등 비ASCII 문자는 약 1.5글자당 1토큰으로 계산합니다.
+    """
+    if not text:
+        return 0
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return math.ceil(ascii_chars / 4 + (len(text) - ascii_chars) / 1.5)
+
+
+def split_turns(history: str) -> List[str]:
+    """대화 기록 문자열을 턴(비어 있지 않은 줄) 목록으로 나눕니다."""
+    return [line.strip() for line in history.splitlines() if line.strip()]
+
+
+def _truncate_tail(text: str, max_tokens: int) -> str:
+    """토큰 예산에 맞게 앞부분을 잘라 뒷부분(최근 내용)만 남깁니다."""
+    while text and estimate_tokens(text) > max_tokens:
+        text = text[len(text) // 8 + 1:]
+    return text
+
+
+class HistoryCompactor:
+    """
+    대화 기록 압축기
+
+    Args:
+        summarize: (이전 요약, 새로 합칠 턴 목록, 최대 토큰 수) -> 갱신된 요약 을 반환하는 코루틴 함수
+        keep_turns: 그대로 남길 최근 턴 수
+        token_budget: 압축 결과의 최대 토큰 수 (추정치), 이하이면 압축하지 않음
+        summary_max_tokens: 요약의 최대 토큰 수
+        max_summaries: 캐시할 요약 수 (LRU)
+    """
+
+    def __init__(
+        self,
+        summarize: Callable[[str, List[str], int], Awaitable[str]],
+        keep_turns: int = 6,
+        token_budget: int = 1000,
+        summary_max_tokens: int = 200,
+        max_summaries: int = 4096
+    ):
+        self.summarize = summarize
+        self.keep_turns = max(1, keep_turns)
+        self.token_budget = token_budget
+        self.summary_max_tokens = min(summary_max_tokens, token_budget // 2)
+        self.max_summaries = max_summaries
+
+        # 대화 앞부분 해시 -> 그 앞부분 전체의 요약
+        self._summaries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # 통계
+        self._requests = 0
+        self._compacted = 0
+        self._tokens_in = 0
+        self._tokens_out = 0
+        self._summary_calls = 0
+        self._summary_cache_hits = 0
+        self._summary_failures = 0
+        self._folded_turns = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.token_budget > 0
+
+    # ---------- 요약 캐시 ----------
+
+    @staticmethod
+    def _prefix_hashes(turns: List[str]) -> List[str]:
+        """앞에서부터 i개 턴의 누적 해시 (hashes[i-1] = turns[:i])"""
+        hashes = []
+        digest = b""
+        for turn in turns:
+            digest = hashlib.sha256(digest + turn.encode("utf-8")).digest()
+            hashes.append(digest.hex())
+        return hashes
+
+    def _cached_summary(self, prefix_hashes: List[str]) -> Tuple[int, str]:
+        """가장 긴 요약된 앞부분 (턴 수, 요약)"""
+        with self._lock:
+            for count in range(len(prefix_hashes), 0, -1):
+                summary = self._summaries.get(prefix_hashes[count - 1])
+                if summary is not None:
+                    self._summaries.move_to_end(prefix_hashes[count - 1])
+                    return count, summary
+        return 0, ""
+
+    def _store_summary(self, prefix_hash: str, summary: str):
+        with self._lock:
+            self._summaries[prefix_hash] = summary
+            self._summaries.move_to_end(prefix_hash)
+            while len(self._summaries) > self.max_summaries:
+                self._summaries.popitem(last=False)
+
+    # ---------- 압축 ----------
+
+    async def afold(self, summary: str, turns: List[str]) -> str:
+        """
+        이전 요약에 새 턴을 합친 요약 (LLM 1회)
+        요약에 실패하면 이전 요약을 그대로 반환합니다. (합치지 못한 턴은 버려짐)
+        """
+        if not turns:
+            return summary
+        self._summary_calls += 1
+        try:
+            folded = await self.summarize(summary, turns, self.summary_max_tokens)
+        except Exception as e:
+            print(f"대화 요약 중 오류 발생: {e}")
+            self._summary_failures += 1
+            return summary
+        self._folded_turns += len(turns)
+        return _truncate_tail(folded.strip(), self.summary_max_tokens)
+
+    def render(self, summary: str, recent: List[str]) -> str:
+        """요약 + 최근 턴을 토큰 예산 안에서 하나의 문자열로 만듭니다 (예산을 넘는 오래된 턴부터 제외)."""
+        budget = self.token_budget
+        if summary:
+            budget -= estimate_tokens(summary) + estimate_tokens(SUMMARY_HEADER + RECENT_HEADER) + 2
+
+        kept: List[str] = []
+        used = 0
+        for turn in reversed(recent):
+            cost = estimate_tokens(turn) + 1
+            if used + cost > budget:
+                if not kept:
+                    kept.append(_truncate_tail(turn, max(budget - 1, 1)))
+                break
+            kept.append(turn)
+            used += cost
+        kept.reverse()
+
+        if not summary:
+            return "\n".join(kept)
+        return "\n".join([SUMMARY_HEADER, summary, RECENT_HEADER, *kept])
+
+    async def acompact_history(self, history: str) -> str:
+        """
+        대화 기록 문자열 압축 (클라이언트가 매번 전체 대화를 보내는 경우)
+        토큰 예산 이하이면 그대로 반환하고, 넘으면 최근 keep_turns 턴 + 이전 턴 요약으로 바꿉니다.
+        이전 요청에서 만든 요약을 재사용하므로 새로 밀려난 턴만 요약에 합칩니다.
+        """
+        tokens_in = estimate_tokens(history)
+        if not self.enabled or tokens_in <= self.token_budget:
+            self.record(tokens_in, tokens_in)
+            return history
+
+        turns = split_turns(history)
+        split_at = max(len(turns) - self.keep_turns, 0)
+        older, recent = turns[:split_at], turns[split_at:]
+
+        summary = ""
+        if older:
+            prefix_hashes = self._prefix_hashes(older)
+            cached_count, summary = self._cached_summary(prefix_hashes)
+            if cached_count == len(older):
+                self._summary_cache_hits += 1
+            else:
+                summary = await self.afold(summary, older[cached_count:])
+                if summary:
+                    self._store_summary(prefix_hashes[-1], summary)
+
+        compacted = self.render(summary, recent)
+        self.record(tokens_in, estimate_tokens(compacted))
+        return compacted
+
+    # ---------- 지표 ----------
+
+    def record(self, tokens_in: int, tokens_out: int):
+        """요청 1건의 압축 전/후 토큰 수를 기록합니다."""
+        self._requests += 1
+        self._tokens_in += tokens_in
+        self._tokens_out += tokens_out
+        if tokens_out < tokens_in:
+            self._compacted += 1
+
+    def stats(self) -> dict:
+        tokens_saved = self._tokens_in - self._tokens_out
+        return {
+            "enabled": self.enabled,
+            "keep_turns": self.keep_turns,
+            "token_budget": self.token_budget,
+            "requests": self._requests,
+            "compacted": self._compacted,
+            # 토큰 수는 estimate_tokens 추정치
+            "tokens_in": self._tokens_in,
+            "tokens_out": self._tokens_out,
+            "tokens_saved": tokens_saved,
+            "avg_tokens_saved_per_request": round(tokens_saved / self._requests, 1) if self._requests else 0.0,
+            "summary_calls": self._summary_calls,
+            "summary_cache_hits": self._summary_cache_hits,
+            "summary_failures": self._summary_failures,
+            "folded_turns": self._folded_turns,
+            "cached_summaries": len(self._summaries)
+        }
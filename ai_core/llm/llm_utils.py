@@ -1,35 +1,233 @@
 # llm_utils.py
+import asyncio
+import json
 import os
-from openai import OpenAI
-import google.generativeai as genai
+import random
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Optional
 from dotenv import load_dotenv
 
+from .embedding_batcher import EmbeddingBatcher
+from .embedding_cache import EmbeddingCache
+from .emotion_classifier import LexiconEmotionClassifier
+from .history_compactor import HistoryCompactor
+from .resilience import CircuitBreaker, DeadlineExceeded, ResilientCaller, remaining_time, set_request_deadline
+from .response_cache import ResponseCache
+from .semantic_cache import SemanticCache
+from .singleflight import Singleflight
+
 # ✅ .env 불러오기
 load_dotenv()
 
-# ✅ 환경변수에서 API 키 가져오기
-api_key = os.getenv("OPENAI_API_KEY")
-if not api_key:
-    raise ValueError("❌ OPENAI_API_KEY가 설정되지 않았습니다. .env 파일을 확인하세요.")
+# ✅ API 클라이언트는 처음 사용할 때 초기화합니다 (import 시점에 openai / google SDK를 로드하지 않음)
+_client = None
+_async_client = None
+_genai = None
+_init_lock = threading.Lock()
 
-google_api_key = os.getenv("GOOGLE_API_KEY")
-if not google_api_key:
-    raise ValueError("❌ GOOGLE_API_KEY가 설정되지 않았습니다. .env 파일을 확인하세요.")
 
-# ✅ OpenAI 클라이언트 초기화
-client = OpenAI(api_key=api_key)
+def _require_env(name: str) -> str:
+    """환경변수에서 API 키 가져오기"""
+    value = os.getenv(name)
+    if not value:
+        raise ValueError(f"❌ {name}가 설정되지 않았습니다. .env 파일을 확인하세요.")
+    return value
 
-# ✅ Google AI 초기화
-genai.configure(api_key=google_api_key)
 
+def get_openai_client():
+    """OpenAI 동기 클라이언트 (최초 호출 시 생성)"""
+    global _client
+    if _client is None:
+        with _init_lock:
+            if _client is None:
+                from openai import OpenAI
+                _client = OpenAI(api_key=_require_env("OPENAI_API_KEY"), timeout=llm_resilience.call_timeout)
+    return _client
+
+
+def get_async_openai_client():
+    """OpenAI 비동기 클라이언트 (최초 호출 시 생성)"""
+    global _async_client
+    if _async_client is None:
+        with _init_lock:
+            if _async_client is None:
+                from openai import AsyncOpenAI
+                _async_client = AsyncOpenAI(api_key=_require_env("OPENAI_API_KEY"), timeout=llm_resilience.call_timeout)
+    return _async_client
+
+
+def get_genai():
+    """Google AI 모듈 (최초 호출 시 import 및 API 키 설정)"""
+    global _genai
+    if _genai is None:
+        with _init_lock:
+            if _genai is None:
+                import google.generativeai as genai
+                genai.configure(api_key=_require_env("GOOGLE_API_KEY"))
+                _genai = genai
+    return _genai
+
+
+# ✅ 프로바이더별 동시 요청 수 제한 (async 경로에서 사용)
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "256"))
+GOOGLE_MAX_CONCURRENCY = int(os.getenv("GOOGLE_MAX_CONCURRENCY", "64"))
+openai_semaphore = asyncio.Semaphore(OPENAI_MAX_CONCURRENCY)
+google_semaphore = asyncio.Semaphore(GOOGLE_MAX_CONCURRENCY)
+
+# 채팅 모델 및 감정 라벨
+CHAT_MODEL = "gpt-4o-mini"
+VALID_EMOTIONS = ["행복", "슬픔", "분노", "평온", "불안"]
+DEFAULT_EMOTION = "평온"
+
+# 공감 응답 생성 실패 시 기본 메시지
+EMPATHY_FALLBACK = "괜찮아요, 당신의 이야기를 듣고 있어요. 함께 있어줄게요."
+
+# ✅ 로컬 감정 분류기 (확신도가 임계값 이상이면 LLM 호출 없이 응답, 1 초과로 두면 비활성화)
+EMOTION_FAST_PATH_THRESHOLD = float(os.getenv("EMOTION_FAST_PATH_THRESHOLD", "0.6"))
+# fast-path 결과 중 LLM으로 재확인해 일치율을 측정할 비율
+EMOTION_FAST_PATH_SHADOW_RATE = float(os.getenv("EMOTION_FAST_PATH_SHADOW_RATE", "0.02"))
+emotion_classifier = LexiconEmotionClassifier()
+
+# ✅ /api/chat 통합 호출 (감정 + 공감 응답을 structured output 1회로 생성, false면 기존 2회 호출)
+LLM_COMBINED_CHAT = os.getenv("LLM_COMBINED_CHAT", "true").lower() == "true"
+_combined_chat_lock = threading.Lock()
+_combined_chat_counts = {"calls": 0, "validation_failures": 0, "errors": 0}
+
+
+def _record_combined_chat(name: str):
+    with _combined_chat_lock:
+        _combined_chat_counts[name] += 1
+
+
+# ✅ 추천 응답 캐시 (캐릭터/카테고리/감정/추천 항목이 같으면 LLM 호출 없이 응답, 변형 수 0이면 비활성화)
+recommendation_cache = ResponseCache(
+    ttl_seconds=float(os.getenv("RECOMMENDATION_CACHE_TTL_SECONDS", "3600")),
+    max_keys=int(os.getenv("RECOMMENDATION_CACHE_MAX_KEYS", "2048")),
+    variants_per_key=int(os.getenv("RECOMMENDATION_CACHE_VARIANTS", "3"))
+)
+
+# ✅ /api/chat 의미 캐시 (같은 사용자의 비슷한 질문이면 (캐릭터, 감정)별로 저장된 응답을 재사용, 크기 0이면 비활성화)
+chat_semantic_cache = SemanticCache(
+    threshold=float(os.getenv("CHAT_SEMANTIC_CACHE_THRESHOLD", "0.92")),
+    max_entries_per_key=int(os.getenv("CHAT_SEMANTIC_CACHE_SIZE", "512")),
+    max_scopes=int(os.getenv("CHAT_SEMANTIC_CACHE_MAX_SCOPES", "4096")),
+    sample_rate=float(os.getenv("CHAT_SEMANTIC_CACHE_SAMPLE_RATE", "0.05"))
+)
+
+# ✅ 동일 LLM 요청 중복 제거 (같은 모델/메시지/temperature 요청이 동시에 진행 중이면 결과 공유)
+llm_singleflight = Singleflight(enabled=os.getenv("LLM_SINGLEFLIGHT", "true").lower() == "true")
+
+
+def _is_provider_failure(error: BaseException) -> bool:
+    """circuit breaker 실패로 셀 오류인지 (잘못된 요청 400은 프로바이더 상태와 무관)"""
+    from openai import BadRequestError
+    return not isinstance(error, BadRequestError)
+
+
+# ✅ LLM 호출 안정성 (호출별 시간 제한, 요청 시간 예산, hedging, circuit breaker)
+# API 요청 하나가 LLM 응답을 기다리는 총 시간 (초, 0이면 예산 없음 → 호출별 제한만 적용)
+LLM_REQUEST_BUDGET_SECONDS = float(os.getenv("LLM_REQUEST_BUDGET_SECONDS", "30"))
+llm_resilience = ResilientCaller(
+    call_timeout=float(os.getenv("LLM_CALL_TIMEOUT_SECONDS", "20")),
+    breaker=CircuitBreaker(
+        failure_threshold=int(os.getenv("LLM_CIRCUIT_FAILURE_THRESHOLD", "5")),
+        reset_seconds=float(os.getenv("LLM_CIRCUIT_RESET_SECONDS", "30"))
+    ),
+    hedge=os.getenv("LLM_HEDGE", "false").lower() == "true",
+    hedge_min_samples=int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "50")),
+    is_failure=_is_provider_failure,
+    # openai_semaphore 대기는 시간 제한 밖에서 (로컬 부하로 breaker가 열리지 않도록)
+    limiter=openai_semaphore
+)
+
+
+def start_llm_request_deadline():
+    """현재 요청의 LLM 시간 예산 시작 (async 라우트 의존성에서 호출)"""
+    set_request_deadline(LLM_REQUEST_BUDGET_SECONDS)
+
+# 응답을 기다리지 않는 백그라운드 작업 참조 (GC 방지)
+_background_tasks = set()
+
+
+def _spawn_background(coro):
+    """응답 경로와 무관한 작업을 백그라운드에서 실행합니다."""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+
+def _normalize_emotion(text: str) -> str:
+    """LLM 응답에서 유효한 감정 라벨을 찾습니다 (없으면 기본값)."""
+    for emotion in VALID_EMOTIONS:
+        if emotion in text:
+            return emotion
+    return DEFAULT_EMOTION
+
+
+# 임베딩 모델 (벡터 DB, 추천 카탈로그와 동일한 모델을 사용해야 함)
+EMBEDDING_MODEL = "models/text-embedding-004"
+
+# 한 번의 배치 임베딩 호출에 담을 수 있는 최대 텍스트 수 (Gemini batchEmbedContents 제한)
+EMBEDDING_MAX_BATCH_SIZE = int(os.getenv("EMBEDDING_MAX_BATCH_SIZE", "100"))
+
+# 동시 임베딩 요청을 모으는 대기 시간 (0이면 coalescing 비활성화)
+# coalescing 배치는 별도 스레드에서 호출되어 google_semaphore 대신 EMBEDDING_MAX_CONCURRENT_BATCHES로만 제한되므로 기본값은 비활성화
+EMBEDDING_BATCH_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_WAIT_MS", "0"))
+
+# coalescing 배치 결과를 기다리는 최대 시간 (업스트림이 응답하지 않아도 요청이 무한정 대기하지 않도록)
+EMBEDDING_BATCH_TIMEOUT_SECONDS = float(os.getenv("EMBEDDING_BATCH_TIMEOUT_SECONDS", "10"))
+
+
+def _embed_upstream(texts: list, task_type: str) -> list:
+    """Gemini 배치 임베딩 호출 (실패 시 예외 발생)"""
+    result = get_genai().embed_content(
+        model=EMBEDDING_MODEL,
+        content=texts,
+        task_type=task_type
+    )
+    return result['embedding']
+
+
+# ✅ 임베딩 요청 coalescer (동시 요청을 한 번의 배치 호출로 묶음)
+embedding_batcher = EmbeddingBatcher(
+    _embed_upstream,
+    max_batch_size=EMBEDDING_MAX_BATCH_SIZE,
+    max_wait_ms=EMBEDDING_BATCH_WAIT_MS,
+    max_concurrent_batches=int(os.getenv("EMBEDDING_MAX_CONCURRENT_BATCHES", "4"))
+)
+
+
+# ✅ 임베딩 캐시 (프로세스 내 LRU + 워커 간 공유되는 SQLite 디스크 캐시)
+embedding_cache = EmbeddingCache(
+    os.getenv(
+        "EMBEDDING_CACHE_PATH",
+        os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data", "embedding_cache.sqlite3")
+    ),
+    memory_max_entries=int(os.getenv("EMBEDDING_CACHE_MEMORY_SIZE", "4096")),
+    disk_max_entries=int(os.getenv("EMBEDDING_CACHE_DISK_MAX_ENTRIES", "200000"))
+)
+
+
+def _embed_one(text, task_type: str):
+    """캐시를 거치지 않는 단건 임베딩 (coalescing 사용 시 배치로 묶임)"""
+    if EMBEDDING_BATCH_WAIT_MS > 0:
+        try:
+            return embedding_batcher.embed(text, task_type, timeout=EMBEDDING_BATCH_TIMEOUT_SECONDS)
+        except FutureTimeoutError:
+            print("임베딩 생성 중 오류 발생: 배치 임베딩 응답 시간 초과")
+            return None
+        except Exception as e:
+            # 배치 호출 실패 (embedding_batcher가 이미 오류를 기록함)
+            return None
 
-# 🔹 임베딩 함수 (Google 임베딩 사용 - 벡터 DB와 동일한 모델)
-def get_embedding(text):
     try:
-        result = genai.embed_content(
-            model="models/text-embedding-004",
+        result = get_genai().embed_content(
+            model=EMBEDDING_MODEL,
             content=text,
-            task_type="RETRIEVAL_QUERY"
+            task_type=task_type
         )
         return result['embedding']
     except Exception as e:
@@ -37,8 +235,226 @@ def get_embedding(text):
         return None
 
 
-# 🔹 감정 추출 함수
-def extract_emotion(user_input: str) -> str:
+# 🔹 임베딩 함수 (Google 임베딩 사용 - 벡터 DB와 동일한 모델)
+def get_embedding(text, task_type: str = "RETRIEVAL_QUERY"):
+    """
+    텍스트 하나를 임베딩합니다.
+    검색 질의는 RETRIEVAL_QUERY, 검색 대상 문서(카탈로그 등)는 RETRIEVAL_DOCUMENT를 사용합니다.
+    embedding_cache에 있으면 원격 호출 없이 반환하고,
+    동시에 들어온 캐시 미스 요청은 embedding_batcher가 한 번의 배치 호출로 묶습니다.
+    """
+    cached = embedding_cache.get(EMBEDDING_MODEL, task_type, text)
+    if cached is not None:
+        return cached
+
+    embedding = _embed_one(text, task_type)
+    embedding_cache.put(EMBEDDING_MODEL, task_type, text, embedding)
+    return embedding
+
+
+# 🔹 배치 임베딩 함수
+def get_embeddings(texts: list, task_type: str = "RETRIEVAL_QUERY") -> list:
+    """
+    여러 텍스트를 배치 호출로 임베딩합니다.
+    입력과 같은 순서의 리스트를 반환하며, 실패한 항목은 None입니다.
+    캐시에 없는 텍스트만 원격으로 임베딩합니다.
+    """
+    embeddings = embedding_cache.get_many(EMBEDDING_MODEL, task_type, texts)
+    missing = list(dict.fromkeys(text for text, vector in zip(texts, embeddings) if vector is None))
+
+    fetched = {}
+    for start in range(0, len(missing), EMBEDDING_MAX_BATCH_SIZE):
+        chunk = missing[start:start + EMBEDDING_MAX_BATCH_SIZE]
+        try:
+            result = _embed_upstream(chunk, task_type)
+            if len(result) != len(chunk):
+                raise ValueError(f"임베딩 개수 불일치 (요청 {len(chunk)}개, 응답 {len(result)}개)")
+            fetched.update(zip(chunk, result))
+            embedding_cache.put_many(EMBEDDING_MODEL, task_type, chunk, result)
+        except Exception as e:
+            print(f"배치 임베딩 생성 중 오류 발생: {e}")
+
+    return [
+        vector if vector is not None else fetched.get(text)
+        for text, vector in zip(texts, embeddings)
+    ]
+
+
+async def _aembed_upstream(texts: list, task_type: str) -> list:
+    """Gemini 비동기 배치 임베딩 호출 (실패 시 예외 발생)"""
+    async with google_semaphore:
+        result = await get_genai().embed_content_async(
+            model=EMBEDDING_MODEL,
+            content=texts,
+            task_type=task_type
+        )
+    return result['embedding']
+
+
+# 🔹 비동기 임베딩 함수
+async def aget_embedding(text, task_type: str = "RETRIEVAL_QUERY"):
+    """
+    get_embedding의 비동기 버전 (이벤트 루프를 막지 않음)
+    coalescing이 켜져 있으면 embedding_batcher의 배치에 합류하고,
+    꺼져 있으면 Gemini 비동기 API를 직접 호출합니다.
+    """
+    cached = await embedding_cache.aget(EMBEDDING_MODEL, task_type, text)
+    if cached is not None:
+        return cached
+
+    if EMBEDDING_BATCH_WAIT_MS > 0:
+        timeout = EMBEDDING_BATCH_TIMEOUT_SECONDS
+        remaining = remaining_time()
+        if remaining is not None:
+            timeout = max(min(timeout, remaining), 0)
+        try:
+            embedding = await asyncio.wait_for(asyncio.wrap_future(embedding_batcher.submit(text, task_type)), timeout)
+        except asyncio.TimeoutError:
+            print("임베딩 생성 중 오류 발생: 배치 임베딩 응답 시간 초과")
+            embedding = None
+        except Exception as e:
+            # 배치 호출 실패 (embedding_batcher가 이미 오류를 기록함)
+            embedding = None
+    else:
+        try:
+            embedding = (await _aembed_upstream([text], task_type))[0]
+        except Exception as e:
+            print(f"임베딩 생성 중 오류 발생: {e}")
+            embedding = None
+
+    await embedding_cache.aput(EMBEDDING_MODEL, task_type, text, embedding)
+    return embedding
+
+
+# 🔹 비동기 배치 임베딩 함수
+async def aget_embeddings(texts: list, task_type: str = "RETRIEVAL_QUERY") -> list:
+    """get_embeddings의 비동기 버전 (청크들은 동시에 요청)"""
+    embeddings = await embedding_cache.aget_many(EMBEDDING_MODEL, task_type, texts)
+    missing = list(dict.fromkeys(text for text, vector in zip(texts, embeddings) if vector is None))
+    chunks = [
+        missing[start:start + EMBEDDING_MAX_BATCH_SIZE]
+        for start in range(0, len(missing), EMBEDDING_MAX_BATCH_SIZE)
+    ]
+
+    results = await asyncio.gather(
+        *(_aembed_upstream(chunk, task_type) for chunk in chunks),
+        return_exceptions=True
+    )
+
+    fetched = {}
+    for chunk, result in zip(chunks, results):
+        if isinstance(result, Exception):
+            print(f"배치 임베딩 생성 중 오류 발생: {result}")
+            continue
+        if len(result) != len(chunk):
+            print(f"배치 임베딩 생성 중 오류 발생: 임베딩 개수 불일치 (요청 {len(chunk)}개, 응답 {len(result)}개)")
+            continue
+        fetched.update(zip(chunk, result))
+
+    if fetched:
+        fetched_texts = list(fetched)
+        await embedding_cache.aput_many(EMBEDDING_MODEL, task_type, fetched_texts, [fetched[text] for text in fetched_texts])
+
+    return [
+        vector if vector is not None else fetched.get(text)
+        for text, vector in zip(texts, embeddings)
+    ]
+
+
+# 🔹 채팅 completion 공통 함수
+def _chat_completion(messages: list, temperature: float = None) -> str:
+    """OpenAI 채팅 completion 호출 (실패 시 예외 발생, 시간 제한/circuit breaker 적용)"""
+    kwargs = {"model": CHAT_MODEL, "messages": messages}
+    if temperature is not None:
+        kwargs["temperature"] = temperature
+    timeout = llm_resilience.before_call()
+    started = time.monotonic()
+    try:
+        response = get_openai_client().chat.completions.create(timeout=timeout, **kwargs)
+    except Exception as e:
+        llm_resilience.after_call(e)
+        raise
+    llm_resilience.after_call(latency=time.monotonic() - started)
+    return response.choices[0].message.content.strip()
+
+
+async def _acreate_chat_completion(kwargs: dict) -> str:
+    # 동시 요청 수 제한(openai_semaphore)은 llm_resilience가 시간 제한 전에 적용
+    response = await get_async_openai_client().chat.completions.create(**kwargs)
+    return response.choices[0].message.content.strip()
+
+
+async def _achat_completion(messages: list, temperature: float = None, response_format: dict = None) -> str:
+    """
+    OpenAI 비동기 채팅 completion 호출 (동시 요청 수는 openai_semaphore로 제한)
+    같은 요청이 이미 진행 중이면 새로 호출하지 않고 그 결과를 함께 사용합니다. (llm_singleflight)
+    실제 호출에는 시간 제한, hedging, circuit breaker가 적용되고 (llm_resilience),
+    기다리는 요청마다 자신의 남은 시간 예산까지만 기다립니다.
+    """
+    kwargs = {"model": CHAT_MODEL, "messages": messages}
+    if temperature is not None:
+        kwargs["temperature"] = temperature
+    if response_format is not None:
+        kwargs["response_format"] = response_format
+
+    remaining = remaining_time()
+    if remaining is not None and remaining <= 0:
+        raise DeadlineExceeded("요청 시간 예산을 초과했습니다")
+    return await llm_singleflight.do(
+        Singleflight.make_key(**kwargs),
+        lambda: llm_resilience.call(lambda: _acreate_chat_completion(kwargs)),
+        timeout=remaining
+    )
+
+
+async def _astream_chat_completion(messages: list, temperature: float = None):
+    """OpenAI 스트리밍 completion - 토큰 조각(delta)을 도착하는 대로 yield 합니다."""
+    kwargs = {"model": CHAT_MODEL, "messages": messages, "stream": True}
+    if temperature is not None:
+        kwargs["temperature"] = temperature
+    # 시간 제한은 openai_semaphore 자리를 얻은 뒤 첫 응답(스트림 시작)까지 적용, 스트림 전체 결과로 circuit breaker 갱신
+    async with openai_semaphore:
+        timeout = llm_resilience.before_call()
+        completed = False
+        try:
+            stream = await asyncio.wait_for(get_async_openai_client().chat.completions.create(**kwargs), timeout)
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
+            completed = True
+        except Exception as e:
+            completed = True
+            llm_resilience.after_call(e, full_timeout=timeout >= llm_resilience.call_timeout)
+            raise
+        finally:
+            if not completed:
+                # 소비자가 스트림을 중간에 닫음
+                llm_resilience.abandon()
+    # 스트림 전체 시간은 hedging 기준(p95) 지연 통계에 넣지 않음
+    llm_resilience.after_call()
+
+
+async def _astream_with_fallback(messages: list, temperature: float, fallback: str, error_label: str):
+    """
+    스트리밍 completion에 기존 fallback 메시지 규칙을 적용합니다.
+    토큰을 하나도 보내기 전에 실패하면 fallback 메시지를 한 번에 보냅니다.
+    """
+    sent_any = False
+    try:
+        async for delta in _astream_chat_completion(messages, temperature):
+            sent_any = True
+            yield delta
+    except Exception as e:
+        print(f"{error_label} 중 오류 발생: {e}")
+        if not sent_any:
+            yield fallback
+
+
+# 🔹 프롬프트 구성 함수
+def _emotion_messages(user_input: str) -> list:
     prompt = f"""
     다음 문장에서 가장 두드러지는 핵심 감정 한 가지를
     '행복', '슬픔', '분노', '평온', '불안' 중에서 하나만 골라주세요.
@@ -47,27 +463,10 @@ def extract_emotion(user_input: str) -> str:
     문장: "{user_input}"
     감정:
     """
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}]
-        )
-        return response.choices[0].message.content.strip()
-    except Exception as e:
-        print(f"감정 추출 중 오류 발생: {e}")
-        return "평온"
+    return [{"role": "user", "content": prompt}]
 
 
-# 🔹 전체 대화에서 최근 감정 추출 함수 (개선 버전)
-def extract_recent_emotion(conversation_history: str) -> str:
-    """
-    대화 전체를 분석하되, 여러 감정이 있을 경우 가장 최근 감정을 선택합니다.
-    짧은 인사말이나 간단한 응답은 무시합니다.
-    """
-    # 대화 내역이 비어있거나 너무 짧으면 기본값 반환
-    if not conversation_history or len(conversation_history.strip()) < 5:
-        return "평온"
-
+def _recent_emotion_messages(conversation_history: str) -> list:
     prompt = f"""
     다음은 사용자가 작성한 대화 내역입니다.
     전체 대화를 읽고, 가장 최근에 표현된 감정을 파악해주세요.
@@ -84,21 +483,265 @@ def extract_recent_emotion(conversation_history: str) -> str:
 
     가장 최근 감정:
     """
+    return [{"role": "user", "content": prompt}]
+
+
+def _empathetic_system_prompt(character: str) -> str:
+    from prompt.characters import get_character_prompt
+
+    # 캐릭터 프롬프트 가져오기
+    character_prompt = get_character_prompt(character)
+
+    # 공감 중심의 프롬프트 구성
+    return character_prompt + """
+
+    중요한 규칙:
+    1. 사용자의 감정을 먼저 인정하고 공감해주세요
+    2. 사용자의 경험을 소중하게 여기는 태도를 보여주세요
+    3. 판단하지 말고, 있는 그대로 받아들여주세요
+    4. 따뜻하고 진심 어린 위로를 전해주세요
+    5. 캐릭터의 말투를 유지하면서도 진정성을 잃지 마세요
+    """
+
+
+def _empathetic_messages(character: str, user_sentence: str, user_emotion: str) -> list:
+    system_prompt = _empathetic_system_prompt(character)
+
+    user_prompt = f"""
+    사용자가 이렇게 말했습니다: "{user_sentence}"
+
+    감정 분석 결과: {user_emotion}
+
+    당신의 캐릭터 특성을 살려서, 사용자에게 진심으로 공감하고 위로해주세요.
+    사용자의 감정을 충분히 이해하고 있다는 것을 보여주며,
+    따뜻한 말로 응답해주세요.
+
+    응답은 3-5문장 정도로 작성해주세요.
+    """
+
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt}
+    ]
+
+
+# 감정 분류 + 공감 응답을 한 번에 받는 structured output 스키마
+COMBINED_CHAT_SCHEMA = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "empathetic_chat",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "emotion": {"type": "string", "enum": VALID_EMOTIONS},
+                "answer": {"type": "string"}
+            },
+            "required": ["emotion", "answer"],
+            "additionalProperties": False
+        }
+    }
+}
+
+
+def _combined_chat_messages(character: str, user_sentence: str) -> list:
+    system_prompt = _empathetic_system_prompt(character) + f"""
+    응답 형식:
+    - emotion: 사용자 문장의 핵심 감정을 {', '.join(VALID_EMOTIONS)} 중 하나로 고르세요
+    - answer: 위 규칙과 캐릭터 말투에 맞춘 공감 응답
+    """
+
+    user_prompt = f"""
+    사용자가 이렇게 말했습니다: "{user_sentence}"
+
+    먼저 사용자의 감정을 판단한 뒤, 당신의 캐릭터 특성을 살려서 사용자에게 진심으로 공감하고 위로해주세요.
+    사용자의 감정을 충분히 이해하고 있다는 것을 보여주며,
+    따뜻한 말로 응답해주세요.
+
+    응답은 3-5문장 정도로 작성해주세요.
+    """
+
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt}
+    ]
+
+
+def _parse_combined_chat(raw: str) -> tuple:
+    """structured output 결과를 검증합니다. 형식이 맞지 않으면 ValueError를 발생시킵니다."""
+    data = json.loads(raw)
+    if not isinstance(data, dict):
+        raise ValueError("응답이 JSON 객체가 아닙니다.")
+    emotion = data.get("emotion")
+    answer = data.get("answer")
+    if emotion not in VALID_EMOTIONS:
+        raise ValueError(f"유효하지 않은 감정 라벨입니다: {emotion!r}")
+    if not isinstance(answer, str) or not answer.strip():
+        raise ValueError("공감 응답이 비어 있습니다.")
+    return emotion, answer.strip()
+
+
+def _recommendation_messages(character: str, category: str, recommendation_data: dict, formatted_recommendation: str) -> list:
+    from prompt.characters import get_character_prompt
+
+    # 캐릭터 프롬프트 가져오기
+    character_prompt = get_character_prompt(character)
+
+    # 감정 정보 추출
+    current_emotion = recommendation_data.get("current_emotion", "")
+
+    system_prompt = character_prompt + """
+
+    당신은 사용자의 감정 상태를 파악하고, 그에 맞는 추천을 해주는 역할입니다.
+    추천할 때는:
+    1. 사용자의 현재 감정을 먼저 공감해주세요
+    2. 왜 이 추천이 도움이 될지 설명해주세요
+    3. 캐릭터의 특성을 살려 자연스럽게 추천해주세요
+    """
+
+    user_prompt = f"""
+    사용자의 현재 감정: {current_emotion}
+    추천 카테고리: {category}
+
+    다음 추천 정보를 바탕으로, 캐릭터의 말투를 살려서 자연스럽게 추천해주세요:
+
+    {formatted_recommendation}
+
+    사용자에게 이 추천이 왜 좋은지, 어떤 도움이 될지 함께 설명해주세요.
+    응답은 4-6문장 정도로 작성해주세요.
+    """
+
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt}
+    ]
+
+
+# 🔹 감정 추출 함수
+def extract_emotion(user_input: str) -> str:
+    """
+    문장의 핵심 감정을 추출합니다.
+    로컬 분류기가 충분히 확신하면 바로 반환하고, 그렇지 않을 때만 LLM을 호출합니다.
+    """
+    prediction = emotion_classifier.predict(user_input)
+    if prediction.label and prediction.confidence >= EMOTION_FAST_PATH_THRESHOLD:
+        emotion_classifier.record_fast_path()
+        return prediction.label
+
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.3  # 더 일관된 결과를 위해 낮은 temperature
-        )
-        emotion = response.choices[0].message.content.strip()
+        emotion = _normalize_emotion(_chat_completion(_emotion_messages(user_input)))
+    except Exception as e:
+        print(f"감정 추출 중 오류 발생: {e}")
+        return DEFAULT_EMOTION
+
+    emotion_classifier.record_fallback(prediction.label, emotion)
+    return emotion
+
+
+async def _ashadow_check_emotion(user_input: str, local_label: str):
+    """fast-path 결과를 LLM 결과와 비교해 일치율을 기록합니다."""
+    try:
+        emotion = _normalize_emotion(await _achat_completion(_emotion_messages(user_input)))
+        emotion_classifier.record_shadow(local_label, emotion)
+    except Exception as e:
+        print(f"감정 분류 재확인 중 오류 발생: {e}")
+
+
+async def aextract_emotion_strict(user_input: str) -> str:
+    """
+    aextract_emotion과 같지만, LLM 호출이 실패하면 기본 감정 대신 예외를 그대로 발생시킵니다.
+    결과를 저장하는 경로(일기 백그라운드 분석)에서 실패와 실제 결과를 구분할 때 사용합니다.
+    """
+    prediction = emotion_classifier.predict(user_input)
+    if prediction.label and prediction.confidence >= EMOTION_FAST_PATH_THRESHOLD:
+        emotion_classifier.record_fast_path()
+        if random.random() < EMOTION_FAST_PATH_SHADOW_RATE:
+            _spawn_background(_ashadow_check_emotion(user_input, prediction.label))
+        return prediction.label
+
+    emotion = _normalize_emotion(await _achat_completion(_emotion_messages(user_input)))
+    emotion_classifier.record_fallback(prediction.label, emotion)
+    return emotion
+
+
+async def aextract_emotion(user_input: str) -> str:
+    """extract_emotion의 비동기 버전 (fast-path 결과 일부는 백그라운드에서 LLM으로 재확인, 실패 시 기본 감정)"""
+    try:
+        return await aextract_emotion_strict(user_input)
+    except Exception as e:
+        print(f"감정 추출 중 오류 발생: {e}")
+        return DEFAULT_EMOTION
+
+
+# 🔹 전체 대화에서 최근 감정 추출 함수 (개선 버전)
+def extract_recent_emotion(conversation_history: str) -> str:
+    """
+    대화 전체를 분석하되, 여러 감정이 있을 경우 가장 최근 감정을 선택합니다.
+    짧은 인사말이나 간단한 응답은 무시합니다.
+    """
+    # 대화 내역이 비어있거나 너무 짧으면 기본값 반환
+    if not conversation_history or len(conversation_history.strip()) < 5:
+        return DEFAULT_EMOTION
+
+    try:
+        # 더 일관된 결과를 위해 낮은 temperature
+        emotion = _chat_completion(_recent_emotion_messages(conversation_history), temperature=0.3)
         # 유효한 감정인지 확인
-        valid_emotions = ["행복", "슬픔", "분노", "평온", "불안"]
-        if emotion in valid_emotions:
-            return emotion
-        return "평온"
+        return emotion if emotion in VALID_EMOTIONS else DEFAULT_EMOTION
     except Exception as e:
         print(f"최근 감정 추출 중 오류 발생: {e}")
-        return "평온"
+        return DEFAULT_EMOTION
+
+
+async def aextract_recent_emotion(conversation_history: str) -> str:
+    """extract_recent_emotion의 비동기 버전"""
+    if not conversation_history or len(conversation_history.strip()) < 5:
+        return DEFAULT_EMOTION
+
+    try:
+        emotion = await _achat_completion(_recent_emotion_messages(conversation_history), temperature=0.3)
+        return emotion if emotion in VALID_EMOTIONS else DEFAULT_EMOTION
+    except Exception as e:
+        print(f"최근 감정 추출 중 오류 발생: {e}")
+        return DEFAULT_EMOTION
+
+
+# 🔹 대화 기록 압축 (긴 대화는 최근 턴 + 이전 턴 요약으로)
+def _history_summary_messages(summary: str, turns: list, max_tokens: int) -> list:
+    previous = summary or "(없음)"
+    conversation = "\n".join(turns)
+    prompt = f"""
+    다음은 사용자와 챗봇의 이전 대화 요약과, 그 뒤에 이어진 대화입니다.
+    두 내용을 합쳐 하나의 요약으로 갱신해주세요.
+
+    중요한 규칙:
+    1. 사용자가 겪은 일과 감정의 변화를 시간 순서대로 남기세요.
+    2. 인사말이나 짧은 반응은 생략하세요.
+    3. 약 {max_tokens}토큰 이내의 한국어 평문으로, 다른 설명 없이 요약만 응답하세요.
+
+    이전 요약:
+    {previous}
+
+    이어진 대화:
+    {conversation}
+
+    갱신된 요약:
+    """
+    return [{"role": "user", "content": prompt}]
+
+
+async def _asummarize_history(summary: str, turns: list, max_tokens: int) -> str:
+    return await _achat_completion(_history_summary_messages(summary, turns, max_tokens), temperature=0.3)
+
+
+# ✅ 대화 기록 압축기 (토큰 예산 0이면 비활성화)
+history_compactor = HistoryCompactor(
+    summarize=_asummarize_history,
+    keep_turns=int(os.getenv("HISTORY_KEEP_TURNS", "6")),
+    token_budget=int(os.getenv("HISTORY_TOKEN_BUDGET", "1000")),
+    summary_max_tokens=int(os.getenv("HISTORY_SUMMARY_MAX_TOKENS", "200")),
+    max_summaries=int(os.getenv("HISTORY_SUMMARY_CACHE_SIZE", "4096"))
+)
 
 
 # 🔹 위로 메시지 생성 함수
@@ -115,7 +758,7 @@ def generate_comforting_message(user_emotion: str, content: dict) -> str:
     응답은 한국어로, 친근하고 다정한 말투로 작성해주세요.
     """
     try:
-        response = client.chat.completions.create(
+        response = get_openai_client().chat.completions.create(
             model="gpt-4o-mini",
             messages=[{"role": "user", "content": prompt}]
         )
@@ -155,7 +798,7 @@ def generate_character_response(character: str, user_emotion: str, content: dict
     """
 
     try:
-        response = client.chat.completions.create(
+        response = get_openai_client().chat.completions.create(
             model="gpt-4o-mini",
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -173,104 +816,222 @@ def generate_empathetic_response(character: str, user_sentence: str, user_emotio
     """
     사용자의 말에 깊이 공감하는 응답을 생성합니다.
     """
-    from prompt.characters import get_character_prompt
+    try:
+        # 더 자연스럽고 다양한 응답을 위해 temperature 0.8
+        return _chat_completion(_empathetic_messages(character, user_sentence, user_emotion), temperature=0.8)
+    except Exception as e:
+        print(f"공감 응답 생성 중 오류 발생: {e}")
+        return EMPATHY_FALLBACK
 
-    # 캐릭터 프롬프트 가져오기
-    character_prompt = get_character_prompt(character)
 
-    # 공감 중심의 프롬프트 구성
-    system_prompt = character_prompt + """
+async def agenerate_empathetic_response(character: str, user_sentence: str, user_emotion: str) -> str:
+    """generate_empathetic_response의 비동기 버전"""
+    try:
+        return await _achat_completion(_empathetic_messages(character, user_sentence, user_emotion), temperature=0.8)
+    except Exception as e:
+        print(f"공감 응답 생성 중 오류 발생: {e}")
+        return EMPATHY_FALLBACK
 
-    중요한 규칙:
-    1. 사용자의 감정을 먼저 인정하고 공감해주세요
-    2. 사용자의 경험을 소중하게 여기는 태도를 보여주세요
-    3. 판단하지 말고, 있는 그대로 받아들여주세요
-    4. 따뜻하고 진심 어린 위로를 전해주세요
-    5. 캐릭터의 말투를 유지하면서도 진정성을 잃지 마세요
-    """
 
-    user_prompt = f"""
-    사용자가 이렇게 말했습니다: "{user_sentence}"
+def astream_empathetic_response(character: str, user_sentence: str, user_emotion: str):
+    """generate_empathetic_response의 스트리밍 버전 (async generator)"""
+    return _astream_with_fallback(
+        _empathetic_messages(character, user_sentence, user_emotion),
+        0.8,
+        EMPATHY_FALLBACK,
+        "공감 응답 생성"
+    )
 
-    감정 분석 결과: {user_emotion}
 
-    당신의 캐릭터 특성을 살려서, 사용자에게 진심으로 공감하고 위로해주세요.
-    사용자의 감정을 충분히 이해하고 있다는 것을 보여주며,
-    따뜻한 말로 응답해주세요.
+# 🔹 감정 분석 + 공감 응답 통합 함수 (/api/chat)
+async def _acombined_emotion_and_response(character: str, user_sentence: str, local_label) -> tuple:
+    """structured output 1회 호출로 (emotion, answer)를 받고, 검증에 실패하면 2회 호출로 넘어갑니다."""
+    if LLM_COMBINED_CHAT:
+        _record_combined_chat("calls")
+        try:
+            raw = await _achat_completion(
+                _combined_chat_messages(character, user_sentence),
+                temperature=0.8,
+                response_format=COMBINED_CHAT_SCHEMA
+            )
+            emotion, answer = _parse_combined_chat(raw)
+            emotion_classifier.record_fallback(local_label, emotion)
+            return emotion, answer
+        except (ValueError, AttributeError) as e:
+            # JSON 파싱/검증 실패, 거절 응답(content 없음) 등
+            print(f"통합 응답 검증 실패, 2회 호출로 전환: {e}")
+            _record_combined_chat("validation_failures")
+        except Exception as e:
+            print(f"통합 응답 생성 중 오류 발생, 2회 호출로 전환: {e}")
+            _record_combined_chat("errors")
 
-    응답은 3-5문장 정도로 작성해주세요.
+    emotion = await aextract_emotion(user_sentence)
+    return emotion, await agenerate_empathetic_response(character, user_sentence, emotion)
+
+
+async def aextract_emotion_and_respond(character: str, user_sentence: str, cache_scope: Optional[str] = None) -> tuple:
+    """
+    감정 라벨과 공감 응답을 (emotion, answer)로 함께 반환합니다.
+    - 같은 사용자(cache_scope)의 의미 캐시에 비슷한 질문이 있으면 LLM 호출 없이 저장된 응답을 반환합니다.
+      (응답에 대화 내용이 반영되므로 사용자 간에는 공유하지 않으며, cache_scope가 없으면 캐시를 쓰지 않음)
+    - 로컬 분류기가 확신하면 감정은 바로 정하고, 응답 생성 1회만 호출합니다.
+    - 그 외에는 structured output 1회 호출로 감정과 응답을 함께 받습니다.
+    - structured output이 검증에 실패하면 기존 2회 호출 경로(감정 추출 → 공감 응답)로 넘어갑니다.
     """
+    vector = None
+    if chat_semantic_cache.enabled and cache_scope is not None:
+        vector = await aget_embedding(user_sentence, task_type="SEMANTIC_SIMILARITY")
 
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.8  # 더 자연스럽고 다양한 응답을 위해
-        )
-        return response.choices[0].message.content.strip()
-    except Exception as e:
-        print(f"공감 응답 생성 중 오류 발생: {e}")
-        return "괜찮아요, 당신의 이야기를 듣고 있어요. 함께 있어줄게요."
+    prediction = emotion_classifier.predict(user_sentence)
+    if prediction.label and prediction.confidence >= EMOTION_FAST_PATH_THRESHOLD:
+        emotion = await aextract_emotion(user_sentence)
+        hit = chat_semantic_cache.lookup(cache_scope, character, user_sentence, vector, emotions=[emotion])
+        if hit is not None:
+            return emotion, hit.answer
+        answer = await agenerate_empathetic_response(character, user_sentence, emotion)
+    else:
+        # 감정을 아직 모르므로 캐릭터의 모든 감정 파티션에서 찾고, 적중하면 저장된 감정을 그대로 사용
+        hit = chat_semantic_cache.lookup(cache_scope, character, user_sentence, vector)
+        if hit is not None:
+            return hit.emotion, hit.answer
+        emotion, answer = await _acombined_emotion_and_response(character, user_sentence, prediction.label)
+
+    # 실패 시 기본 메시지는 저장하지 않음
+    if answer != EMPATHY_FALLBACK and cache_scope is not None:
+        chat_semantic_cache.add(cache_scope, character, emotion, user_sentence, vector, answer)
+    return emotion, answer
+
+
+def combined_chat_stats() -> dict:
+    """통합 호출 성공/검증 실패/오류 통계"""
+    with _combined_chat_lock:
+        stats = dict(_combined_chat_counts)
+    stats["enabled"] = LLM_COMBINED_CHAT
+    failed = stats["validation_failures"] + stats["errors"]
+    stats["success_rate"] = round((stats["calls"] - failed) / stats["calls"], 4) if stats["calls"] else None
+    return stats
 
 
 # 🔹 추천 응답 생성 함수
+def _recommendation_cache_key(character: str, category: str, recommendation_data: dict) -> tuple:
+    """추천 응답 캐시 키: (캐릭터, 카테고리, 현재 감정, 추천 감정, 추천 항목들)"""
+    items = recommendation_data.get("all_recommendations") or [recommendation_data.get("recommendation") or {}]
+    item_ids = ",".join(str(item.get("title") or item.get("name") or "") for item in items)
+    return (
+        (character or "").strip(),
+        (category or "").strip(),
+        recommendation_data.get("current_emotion", ""),
+        recommendation_data.get("recommended_emotion", ""),
+        item_ids
+    )
+
+
 def generate_recommendation_response(character: str, category: str, recommendation_data: dict, formatted_recommendation: str) -> str:
     """
     RAG 기반 추천을 캐릭터 말투로 전달합니다.
+    같은 입력의 응답 변형이 다 모이기 전까지는 새로 생성해 캐시에 추가하고, 이후에는 캐시에서 응답합니다.
     """
-    from prompt.characters import get_character_prompt
+    key = _recommendation_cache_key(character, category, recommendation_data)
+    cached, refill = recommendation_cache.lookup(key)
+    if cached is not None and not refill:
+        return cached
 
-    # 캐릭터 프롬프트 가져오기
-    character_prompt = get_character_prompt(character)
+    messages = _recommendation_messages(character, category, recommendation_data, formatted_recommendation)
+    try:
+        answer = _chat_completion(messages, temperature=0.7)
+    except Exception as e:
+        print(f"추천 응답 생성 중 오류 발생: {e}")
+        if refill:
+            recommendation_cache.release(key)
+        return cached or f"{formatted_recommendation}\n\n이 추천이 도움이 되었으면 좋겠어요!"
 
-    # 감정 정보 추출
-    current_emotion = recommendation_data.get("current_emotion", "")
-    recommended_emotion = recommendation_data.get("recommended_emotion", "")
+    if refill:
+        recommendation_cache.add(key, answer)
+    return answer
 
-    system_prompt = character_prompt + """
 
-    당신은 사용자의 감정 상태를 파악하고, 그에 맞는 추천을 해주는 역할입니다.
-    추천할 때는:
-    1. 사용자의 현재 감정을 먼저 공감해주세요
-    2. 왜 이 추천이 도움이 될지 설명해주세요
-    3. 캐릭터의 특성을 살려 자연스럽게 추천해주세요
-    """
+async def _arefill_recommendation_cache(key: tuple, messages: list):
+    """추천 응답 변형을 하나 더 만들어 캐시에 추가합니다 (실패 응답은 저장하지 않음)."""
+    stored = False
+    try:
+        recommendation_cache.add(key, await _achat_completion(messages, temperature=0.7))
+        stored = True
+    except Exception as e:
+        print(f"추천 응답 캐시 채우기 중 오류 발생: {e}")
+    finally:
+        # 실패뿐 아니라 취소(CancelledError)된 경우에도 변형 생성 권한을 반납
+        if not stored:
+            recommendation_cache.release(key)
 
-    user_prompt = f"""
-    사용자의 현재 감정: {current_emotion}
-    추천 카테고리: {category}
 
-    다음 추천 정보를 바탕으로, 캐릭터의 말투를 살려서 자연스럽게 추천해주세요:
+async def agenerate_recommendation_response(character: str, category: str, recommendation_data: dict, formatted_recommendation: str) -> str:
+    """
+    generate_recommendation_response의 비동기 버전
+    캐시된 변형이 있으면 바로 응답하고, 변형이 부족하면 백그라운드에서 하나 더 생성합니다.
+    """
+    key = _recommendation_cache_key(character, category, recommendation_data)
+    messages = _recommendation_messages(character, category, recommendation_data, formatted_recommendation)
+    cached, refill = recommendation_cache.lookup(key)
+    if cached is not None:
+        if refill:
+            _spawn_background(_arefill_recommendation_cache(key, messages))
+        return cached
 
-    {formatted_recommendation}
+    stored = False
+    try:
+        answer = await _achat_completion(messages, temperature=0.7)
+        if refill:
+            recommendation_cache.add(key, answer)
+            stored = True
+        return answer
+    except Exception as e:
+        print(f"추천 응답 생성 중 오류 발생: {e}")
+        return f"{formatted_recommendation}\n\n이 추천이 도움이 되었으면 좋겠어요!"
+    finally:
+        # 실패뿐 아니라 요청 취소(CancelledError)로 끝난 경우에도 변형 생성 권한을 반납
+        if refill and not stored:
+            recommendation_cache.release(key)
 
-    사용자에게 이 추천이 왜 좋은지, 어떤 도움이 될지 함께 설명해주세요.
-    응답은 4-6문장 정도로 작성해주세요.
+
+async def astream_recommendation_response(character: str, category: str, recommendation_data: dict, formatted_recommendation: str):
+    """
+    generate_recommendation_response의 스트리밍 버전 (async generator)
+    캐시된 변형이 있으면 한 번에 보내고, 없으면 토큰 단위로 스트리밍합니다.
     """
+    key = _recommendation_cache_key(character, category, recommendation_data)
+    messages = _recommendation_messages(character, category, recommendation_data, formatted_recommendation)
+    cached, refill = recommendation_cache.lookup(key)
+    if cached is not None:
+        if refill:
+            _spawn_background(_arefill_recommendation_cache(key, messages))
+        yield cached
+        return
 
+    # 끝까지 정상적으로 받은 응답만 캐시에 저장합니다 (fallback 문구, 중간에 끊긴 응답은 저장하지 않음)
+    answer = []
+    stored = False
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.7
-        )
-        return response.choices[0].message.content.strip()
+        async for delta in _astream_chat_completion(messages, 0.7):
+            answer.append(delta)
+            yield delta
+        if refill:
+            recommendation_cache.add(key, "".join(answer).strip())
+            stored = True
     except Exception as e:
         print(f"추천 응답 생성 중 오류 발생: {e}")
-        return f"{formatted_recommendation}\n\n이 추천이 도움이 되었으면 좋겠어요!"
+        if not answer:
+            yield f"{formatted_recommendation}\n\n이 추천이 도움이 되었으면 좋겠어요!"
+    finally:
+        # 클라이언트 연결 종료(GeneratorExit)나 취소(CancelledError)로 끝난 경우에도 변형 생성 권한을 반납
+        if refill and not stored:
+            recommendation_cache.release(key)
 
 
 # 🔹 간단 응답 함수
 def get_llm_answer(user_sentence: str) -> str:
     try:
         prompt = f"다음 문장에 대해 공감하고 짧게 답해주세요(한국어): \"{user_sentence}\""
-        response = client.chat.completions.create(
+        response = get_openai_client().chat.completions.create(
             model="gpt-4o-mini",
             messages=[{"role": "user", "content": prompt}]
         )
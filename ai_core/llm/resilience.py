@@ -0,0 +1,314 @@
+# resilience.py
+# LLM 호출 안정성 계층 (요청 시간 예산, hedging, circuit breaker)
+# - 요청 시간 예산: API 요청마다 마감 시각을 contextvar로 두고, 그 안의 LLM 호출은 남은 시간까지만 기다립니다.
+# - hedging: 응답이 최근 p95 지연보다 늦어지면 같은 요청을 한 번 더 보내 먼저 온 응답을 사용합니다. (선택)
+# - circuit breaker: 연속 실패가 쌓이면 일정 시간 호출 없이 바로 실패시켜, 호출부의 기본 메시지(fallback)로 넘어갑니다.
+
+import asyncio
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Optional
+
+# 현재 요청의 마감 시각 (time.monotonic 기준, 없으면 None)
+_deadline: ContextVar[Optional[float]] = ContextVar("llm_deadline", default=None)
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """요청 시간 예산을 모두 사용함"""
+
+
+class CircuitOpenError(Exception):
+    """circuit breaker가 열려 있어 호출하지 않음"""
+
+
+def set_request_deadline(budget_seconds: float):
+    """
+    현재 컨텍스트(요청)의 시간 예산을 시작합니다. (0 이하이면 예산 없음)
+    async 의존성/미들웨어에서 호출해야 같은 요청의 LLM 호출에 적용됩니다.
+    """
+    _deadline.set(time.monotonic() + budget_seconds if budget_seconds > 0 else None)
+
+
+def remaining_time() -> Optional[float]:
+    """현재 요청의 남은 시간 (초, 예산이 없으면 None)"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+class LatencyTracker:
+    """최근 성공한 호출의 지연 시간 (rolling window)"""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float, min_samples: int = 1) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < max(1, min_samples):
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+
+
+class CircuitBreaker:
+    """
+    연속 실패 기반 circuit breaker
+
+    closed → (연속 실패 failure_threshold회) → open → (reset_seconds 경과) → half_open
+    half_open 에서는 시험 호출 1건만 허용하고, 성공하면 closed, 실패하면 다시 open 으로 돌아갑니다.
+
+    Args:
+        failure_threshold: open 으로 전환되는 연속 실패 수 (0이면 비활성화)
+        reset_seconds: open 유지 시간
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+        # 통계
+        self._opened = 0
+        self._rejected = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.failure_threshold > 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def allow(self) -> bool:
+        """지금 호출해도 되는지 (open 이면 False)"""
+        if not self.enabled:
+            return True
+        with self._lock:
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_seconds:
+                    self._rejected += 1
+                    return False
+                self._state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self._state == self.HALF_OPEN:
+                if self._probe_in_flight:
+                    self._rejected += 1
+                    return False
+                self._probe_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def release(self):
+        """결과 없이 끝난 호출 (취소 등) - half_open 시험 호출 자리를 돌려놓음"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._consecutive_failures += 1
+            if self._state == self.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self._opened += 1
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "state": self._state,
+                "consecutive_failures": self._consecutive_failures,
+                "opened": self._opened,
+                "rejected": self._rejected
+            }
+
+
+class ResilientCaller:
+    """
+    호출 1건에 시간 제한 + (선택) hedging + circuit breaker 를 적용합니다.
+
+    Args:
+        call_timeout: 호출 1건의 최대 대기 시간 (요청 예산이 더 적게 남았으면 남은 시간)
+        breaker: circuit breaker
+        hedge: True면 p95 지연을 넘긴 호출에 같은 요청을 한 번 더 보냄
+        hedge_min_samples: hedging 기준(p95)을 계산하기 위한 최소 표본 수
+        is_failure: breaker 실패로 셀 예외인지 판단하는 함수 (기본: 모든 예외)
+        limiter: 로컬 동시 호출 수 제한 (asyncio.Semaphore 등). 자리를 얻은 뒤에 시간 제한을 시작하므로
+            로컬 대기열에서 기다린 시간은 프로바이더 시간 초과/breaker 실패로 세지 않습니다.
+            (hedging으로 보내는 중복 요청은 원 요청의 자리를 함께 사용)
+    """
+
+    def __init__(
+        self,
+        call_timeout: float = 20.0,
+        breaker: Optional[CircuitBreaker] = None,
+        hedge: bool = False,
+        hedge_min_samples: int = 50,
+        is_failure: Optional[Callable[[BaseException], bool]] = None,
+        limiter: Optional[asyncio.Semaphore] = None
+    ):
+        self.call_timeout = call_timeout
+        self.breaker = breaker or CircuitBreaker()
+        self.hedge = hedge
+        self.hedge_min_samples = hedge_min_samples
+        self.is_failure = is_failure or (lambda error: True)
+        self.limiter = limiter
+        self.latency = LatencyTracker()
+
+        # 통계
+        self._calls = 0
+        self._timeouts = 0
+        self._deadline_exceeded = 0
+        self._errors = 0
+        self._hedges = 0
+        self._hedge_wins = 0
+
+    # ---------- 호출 전/후 ----------
+
+    def before_call(self) -> float:
+        """
+        호출 가능 여부를 확인하고 이번 호출의 시간 제한(초)을 반환합니다.
+
+        Raises:
+            CircuitOpenError: breaker가 열려 있음
+            DeadlineExceeded: 요청 시간 예산을 이미 다 씀
+        """
+        self._calls += 1
+        remaining = remaining_time()
+        if remaining is not None and remaining <= 0:
+            self._deadline_exceeded += 1
+            raise DeadlineExceeded("요청 시간 예산을 초과했습니다")
+        if not self.breaker.allow():
+            raise CircuitOpenError("LLM 프로바이더 상태가 불안정해 호출을 건너뜁니다")
+        return self.call_timeout if remaining is None else min(self.call_timeout, remaining)
+
+    def after_call(self, error: Optional[BaseException] = None, latency: Optional[float] = None, full_timeout: bool = True):
+        """
+        호출 결과를 breaker와 지연 통계에 반영합니다.
+        요청 예산 때문에 짧아진 시간 제한에 걸린 경우(full_timeout=False)는 프로바이더 실패로 세지 않습니다.
+        """
+        if error is None:
+            self.breaker.record_success()
+            if latency is not None:
+                self.latency.record(latency)
+            return
+        if isinstance(error, asyncio.TimeoutError):
+            self._timeouts += 1
+            if full_timeout:
+                self.breaker.record_failure()
+            else:
+                self._deadline_exceeded += 1
+                self.breaker.release()
+            return
+        self._errors += 1
+        if self.is_failure(error):
+            self.breaker.record_failure()
+        else:
+            # 잘못된 요청 등 프로바이더 상태와 무관한 오류
+            self.breaker.release()
+
+    def abandon(self):
+        """호출이 결과 없이 중단됨 (요청 취소, 스트림 중단)"""
+        self.breaker.release()
+
+    # ---------- 호출 ----------
+
+    async def call(self, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """factory()를 (limiter 자리를 얻은 뒤) 시간 제한/hedging/breaker를 적용해 실행합니다."""
+        if self.limiter is None:
+            return await self._call(factory)
+        async with self.limiter:
+            return await self._call(factory)
+
+    async def _call(self, factory: Callable[[], Awaitable[Any]]) -> Any:
+        timeout = self.before_call()
+        started = time.monotonic()
+        try:
+            result = await asyncio.wait_for(self._hedged(factory, timeout), timeout)
+        except asyncio.TimeoutError as e:
+            self.after_call(e, full_timeout=timeout >= self.call_timeout)
+            if timeout < self.call_timeout:
+                raise DeadlineExceeded("요청 시간 예산을 초과했습니다") from e
+            raise
+        except asyncio.CancelledError:
+            self.abandon()
+            raise
+        except Exception as e:
+            self.after_call(e)
+            raise
+        self.after_call(latency=time.monotonic() - started)
+        return result
+
+    async def _hedged(self, factory: Callable[[], Awaitable[Any]], timeout: float) -> Any:
+        """p95 지연을 넘기면 같은 요청을 한 번 더 보내고, 먼저 성공한 응답을 반환합니다."""
+        delay = self.latency.percentile(0.95, self.hedge_min_samples) if self.hedge else None
+        if delay is None or delay >= timeout:
+            return await factory()
+
+        tasks = [asyncio.ensure_future(factory())]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done:
+                return tasks[0].result()
+
+            self._hedges += 1
+            tasks.append(asyncio.ensure_future(factory()))
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is tasks[1]:
+                            self._hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    # ---------- 지표 ----------
+
+    def stats(self) -> dict:
+        p50 = self.latency.percentile(0.5)
+        p95 = self.latency.percentile(0.95)
+        return {
+            "calls": self._calls,
+            "call_timeout_seconds": self.call_timeout,
+            "timeouts": self._timeouts,
+            "deadline_exceeded": self._deadline_exceeded,
+            "errors": self._errors,
+            "latency_ms_p50": round(p50 * 1000, 1) if p50 is not None else None,
+            "latency_ms_p95": round(p95 * 1000, 1) if p95 is not None else None,
+            "hedge_enabled": self.hedge,
+            "hedges": self._hedges,
+            "hedge_wins": self._hedge_wins,
+            "circuit_breaker": self.breaker.stats()
+        }
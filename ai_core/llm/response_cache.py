@@ -0,0 +1,153 @@
+# response_cache.py
+# LLM 응답 캐시 (TTL + LRU, 키마다 N개의 응답 변형 풀)
+# 입력 조합이 적은 응답(예: 추천 메시지)을 재사용해 LLM 호출 없이 응답합니다.
+# 같은 키에 여러 변형을 모아 두고 무작위로 골라, 매번 똑같은 문장이 나가지 않도록 합니다.
+
+import random
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, List, Optional, Tuple
+
+
+class _Entry:
+    """키 하나의 변형 풀과 통계"""
+    __slots__ = ("variants", "refilling", "hits", "misses", "created_at")
+
+    def __init__(self):
+        self.variants: List[Tuple[float, str]] = []  # (저장 시각, 응답)
+        self.refilling = False
+        self.hits = 0
+        self.misses = 0
+        self.created_at = time.monotonic()
+
+
+class ResponseCache:
+    """
+    TTL + LRU 응답 캐시
+
+    Args:
+        ttl_seconds: 변형 하나의 유효 시간 (초)
+        max_keys: 최대 키 수 (초과 시 가장 오래 사용되지 않은 키부터 제거)
+        variants_per_key: 키마다 모아 둘 응답 변형 수 (0이면 캐시 비활성화)
+    """
+
+    def __init__(self, ttl_seconds: float = 3600.0, max_keys: int = 2048, variants_per_key: int = 3):
+        self.ttl_seconds = ttl_seconds
+        self.max_keys = max(1, max_keys)
+        self.variants_per_key = max(0, variants_per_key)
+
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # 통계
+        self._hits = 0
+        self._misses = 0
+        self._stores = 0
+        self._expired = 0
+        self._evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.variants_per_key > 0
+
+    def _drop_expired(self, entry: _Entry, now: float):
+        """lock 보유 상태에서 호출"""
+        alive = [(stored_at, text) for stored_at, text in entry.variants if now - stored_at < self.ttl_seconds]
+        self._expired += len(entry.variants) - len(alive)
+        entry.variants = alive
+
+    def lookup(self, key: Hashable) -> Tuple[Optional[str], bool]:
+        """
+        캐시된 변형 하나와 변형을 더 만들어야 하는지 여부를 반환합니다.
+        두 번째 값이 True이면 호출자가 새 응답을 만들어 add() (실패 시 release())해야 합니다.
+        같은 키에 대해 동시에 한 호출자만 True를 받습니다.
+        """
+        if not self.enabled:
+            return None, False
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = _Entry()
+                self._entries[key] = entry
+                while len(self._entries) > self.max_keys:
+                    self._entries.popitem(last=False)
+                    self._evictions += 1
+            else:
+                self._entries.move_to_end(key)
+                self._drop_expired(entry, now)
+
+            text = random.choice(entry.variants)[1] if entry.variants else None
+            if text is not None:
+                entry.hits += 1
+                self._hits += 1
+            else:
+                entry.misses += 1
+                self._misses += 1
+
+            refill = len(entry.variants) < self.variants_per_key and not entry.refilling
+            if refill:
+                entry.refilling = True
+            return text, refill
+
+    def add(self, key: Hashable, text: str):
+        """새로 생성한 응답을 변형 풀에 추가합니다."""
+        if not self.enabled:
+            return
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                # 생성하는 동안 LRU로 제거된 경우
+                entry = _Entry()
+                self._entries[key] = entry
+                while len(self._entries) > self.max_keys:
+                    self._entries.popitem(last=False)
+                    self._evictions += 1
+            entry.refilling = False
+            if len(entry.variants) < self.variants_per_key:
+                entry.variants.append((time.monotonic(), text))
+                self._stores += 1
+
+    def release(self, key: Hashable):
+        """응답 생성에 실패한 경우 변형 생성 권한을 반납합니다."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.refilling = False
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self, top_keys: int = 20) -> dict:
+        """전체 적중률과 적중 수 상위 키별 통계"""
+        now = time.monotonic()
+        with self._lock:
+            lookups = self._hits + self._misses
+            ranked = sorted(self._entries.items(), key=lambda item: item[1].hits, reverse=True)[:top_keys]
+            keys = [
+                {
+                    "key": "|".join(str(part) for part in key) if isinstance(key, tuple) else str(key),
+                    "hits": entry.hits,
+                    "misses": entry.misses,
+                    "variants": len(entry.variants),
+                    "age_s": round(now - entry.created_at, 1)
+                }
+                for key, entry in ranked
+            ]
+            return {
+                "enabled": self.enabled,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "stores": self._stores,
+                "expired": self._expired,
+                "evictions": self._evictions,
+                "entries": len(self._entries),
+                "max_keys": self.max_keys,
+                "variants_per_key": self.variants_per_key,
+                "ttl_seconds": self.ttl_seconds,
+                "keys": keys
+            }
@@ -0,0 +1,224 @@
+# semantic_cache.py
+# 의미 기반 응답 캐시 (/api/chat)
+# 사용자(scope)별, (캐릭터, 감정)별로 이전 질문 임베딩을 작은 메모리 Faiss 인덱스에 보관하고,
+# 새 질문과의 코사인 유사도가 임계값 이상이면 저장된 응답을 그대로 돌려줍니다.
+# 응답에는 사용자의 대화 내용이 반영되므로 다른 사용자에게는 재사용하지 않습니다.
+
+import hashlib
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+@dataclass
+class SemanticHit:
+    """캐시 적중 결과"""
+    emotion: str
+    answer: str
+    similarity: float
+    matched_text: str
+
+
+class _Partition:
+    """(캐릭터, 감정) 하나의 인덱스와 저장된 응답 (삽입 순서 = 제거 순서)"""
+
+    def __init__(self, dimension: int):
+        import faiss
+
+        self.dimension = dimension
+        self.index = faiss.IndexIDMap(faiss.IndexFlatIP(dimension))
+        self.entries: "OrderedDict[int, Tuple[str, str]]" = OrderedDict()  # id -> (질문, 응답)
+
+
+class SemanticCache:
+    """
+    의미 기반 응답 캐시
+
+    Args:
+        threshold: 적중으로 판단할 최소 코사인 유사도
+        max_entries_per_key: (캐릭터, 감정)별 최대 항목 수 (0이면 비활성화, 초과 시 오래된 항목부터 제거)
+        max_scopes: 캐시를 보관할 최대 사용자(scope) 수 (초과 시 가장 오래 사용되지 않은 사용자부터 제거)
+        sample_rate: 적중 결과를 품질 검토용으로 기록할 비율
+        sample_size: 보관할 검토 샘플 수
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.92,
+        max_entries_per_key: int = 512,
+        max_scopes: int = 4096,
+        sample_rate: float = 0.05,
+        sample_size: int = 100
+    ):
+        self.threshold = threshold
+        self.max_entries_per_key = max(0, max_entries_per_key)
+        self.max_scopes = max(1, max_scopes)
+        self.sample_rate = sample_rate
+
+        # scope -> {(캐릭터, 감정) -> 파티션}
+        self._scopes: "OrderedDict[str, Dict[Tuple[str, str], _Partition]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._samples = deque(maxlen=sample_size)
+
+        # 통계
+        self._lookups = 0
+        self._hits = 0
+        self._hit_similarity_sum = 0.0
+        self._near_misses = 0
+        self._stores = 0
+        self._evictions = 0
+        self._scope_evictions = 0
+        self._errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries_per_key > 0
+
+    @staticmethod
+    def _as_query(vector) -> np.ndarray:
+        query = np.asarray(vector, dtype=np.float32).reshape(1, -1)
+        norm = np.linalg.norm(query)
+        return query / norm if norm > 0 else query
+
+    @staticmethod
+    def _digest(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()[:12]
+
+    def lookup(
+        self,
+        scope: str,
+        character: str,
+        text: str,
+        vector,
+        emotions: Optional[List[str]] = None
+    ) -> Optional[SemanticHit]:
+        """
+        같은 사용자(scope)의 이전 질문 중 가장 유사한 것을 찾아, 임계값 이상이면 저장된 응답을 반환합니다.
+        emotions를 주지 않으면 해당 캐릭터의 모든 감정 파티션에서 찾습니다.
+        """
+        if not self.enabled or vector is None:
+            return None
+
+        query = self._as_query(vector)
+        best: Optional[SemanticHit] = None
+        with self._lock:
+            self._lookups += 1
+            partitions = self._scopes.get(scope)
+            if partitions is None:
+                return None
+            self._scopes.move_to_end(scope)
+            try:
+                for (key_character, emotion), partition in partitions.items():
+                    if key_character != character or (emotions is not None and emotion not in emotions):
+                        continue
+                    if partition.index.ntotal == 0 or partition.dimension != query.shape[1]:
+                        continue
+                    scores, ids = partition.index.search(query, 1)
+                    entry_id = int(ids[0][0])
+                    if entry_id < 0:
+                        continue
+                    similarity = float(scores[0][0])
+                    if best is None or similarity > best.similarity:
+                        matched_text, answer = partition.entries[entry_id]
+                        best = SemanticHit(emotion, answer, similarity, matched_text)
+            except Exception as e:
+                print(f"의미 캐시 조회 중 오류 발생: {e}")
+                self._errors += 1
+                return None
+
+            if best is None or best.similarity < self.threshold:
+                # 임계값 바로 아래 (0.05 이내) 후보 수는 임계값 조정 참고용
+                if best is not None and best.similarity >= self.threshold - 0.05:
+                    self._near_misses += 1
+                return None
+
+            self._hits += 1
+            self._hit_similarity_sum += best.similarity
+            if random.random() < self.sample_rate:
+                # 대화 원문은 남기지 않고 해시와 길이만 기록
+                self._samples.append({
+                    "character": character,
+                    "emotion": best.emotion,
+                    "query_hash": self._digest(text),
+                    "query_length": len(text),
+                    "matched_hash": self._digest(best.matched_text),
+                    "matched_length": len(best.matched_text),
+                    "similarity": round(best.similarity, 4),
+                    "at": time.time()
+                })
+            return best
+
+    def add(self, scope: str, character: str, emotion: str, text: str, vector, answer: str):
+        """질문 임베딩과 응답을 사용자(scope)별로 저장합니다. 파티션이 가득 차면 가장 오래된 항목부터 제거합니다."""
+        if not self.enabled or vector is None or not answer:
+            return
+
+        query = self._as_query(vector)
+        key = (character, emotion)
+        with self._lock:
+            try:
+                partitions = self._scopes.get(scope)
+                if partitions is None:
+                    partitions = {}
+                    self._scopes[scope] = partitions
+                    while len(self._scopes) > self.max_scopes:
+                        self._scopes.popitem(last=False)
+                        self._scope_evictions += 1
+                self._scopes.move_to_end(scope)
+
+                partition = partitions.get(key)
+                if partition is None or partition.dimension != query.shape[1]:
+                    partition = _Partition(query.shape[1])
+                    partitions[key] = partition
+
+                entry_id = self._next_id
+                self._next_id += 1
+                partition.index.add_with_ids(query, np.array([entry_id], dtype=np.int64))
+                partition.entries[entry_id] = (text, answer)
+                self._stores += 1
+
+                overflow = len(partition.entries) - self.max_entries_per_key
+                if overflow > 0:
+                    evicted = [partition.entries.popitem(last=False)[0] for _ in range(overflow)]
+                    partition.index.remove_ids(np.array(evicted, dtype=np.int64))
+                    self._evictions += overflow
+            except Exception as e:
+                print(f"의미 캐시 저장 중 오류 발생: {e}")
+                self._errors += 1
+
+    def clear(self, scope: Optional[str] = None):
+        """전체 또는 사용자(scope) 하나의 캐시를 비웁니다."""
+        with self._lock:
+            if scope is None:
+                self._scopes.clear()
+            else:
+                self._scopes.pop(scope, None)
+
+    def stats(self, recent_samples: int = 20) -> dict:
+        """적중률, 적중 유사도 평균, 최근 품질 검토 샘플 (샘플은 해시/길이만 포함)"""
+        with self._lock:
+            partitions = [p for scope in self._scopes.values() for p in scope.values()]
+            return {
+                "enabled": self.enabled,
+                "threshold": self.threshold,
+                "lookups": self._lookups,
+                "hits": self._hits,
+                "hit_rate": round(self._hits / self._lookups, 4) if self._lookups else 0.0,
+                "avg_hit_similarity": round(self._hit_similarity_sum / self._hits, 4) if self._hits else None,
+                "near_misses": self._near_misses,
+                "stores": self._stores,
+                "evictions": self._evictions,
+                "scope_evictions": self._scope_evictions,
+                "errors": self._errors,
+                "scopes": len(self._scopes),
+                "partitions": len(partitions),
+                "entries": sum(len(p.entries) for p in partitions),
+                "max_entries_per_key": self.max_entries_per_key,
+                "samples": list(self._samples)[-recent_samples:]
+            }
@@ -0,0 +1,88 @@
+# singleflight.py
+# 동일한 LLM 요청의 중복 제거 (request coalescing)
+# 클라이언트 재시도나 중복 제출로 같은 프롬프트가 동시에 들어오면, 업스트림 호출 1회의 결과를 함께 사용합니다.
+# 공유 호출은 asyncio.shield 로 감싸므로, 기다리던 요청 하나가 시간 초과/취소되어도 다른 요청에는 영향이 없습니다.
+# 공유 호출은 빈 컨텍스트에서 실행되므로 먼저 온 요청의 contextvar(요청 시간 예산 등)를 물려받지 않습니다.
+
+import asyncio
+import contextvars
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+class Singleflight:
+    """
+    진행 중인 동일 요청을 하나의 Task로 합치는 계층
+
+    Args:
+        enabled: False면 중복 제거 없이 매번 바로 호출
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+        # 통계
+        self._calls = 0
+        self._leaders = 0
+        self._shared = 0
+        self._waiter_timeouts = 0
+        self._errors = 0
+
+    @staticmethod
+    def make_key(**request: Any) -> str:
+        """요청 파라미터(모델, 메시지, temperature 등)로 만든 키"""
+        payload = json.dumps(request, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _on_done(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # 모든 대기자가 먼저 떠난 경우에도 예외가 "retrieve되지 않음" 경고로 남지 않도록 확인
+        if not task.cancelled() and task.exception() is not None:
+            self._errors += 1
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[Any]], timeout: Optional[float] = None) -> Any:
+        """
+        key가 같은 요청이 진행 중이면 그 결과를 기다리고, 없으면 factory()를 실행합니다.
+        timeout은 대기자마다 따로 적용되며, 시간 초과 시 asyncio.TimeoutError가 발생합니다.
+        (공유 호출 자체는 다른 대기자를 위해 계속 진행)
+        """
+        self._calls += 1
+        if not self.enabled:
+            self._leaders += 1
+            return await factory()
+
+        task = self._inflight.get(key)
+        if task is None:
+            # 먼저 온 요청(leader)의 남은 시간 예산이 공유 호출 전체를 잘라내지 않도록 빈 컨텍스트에서 실행
+            # (공유 호출은 호출 자체의 시간 제한만 받고, 대기자는 각자 timeout까지만 기다림)
+            task = contextvars.Context().run(asyncio.ensure_future, factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done, key=key: self._on_done(key, done))
+            self._leaders += 1
+        else:
+            self._shared += 1
+
+        try:
+            if timeout is None or timeout <= 0:
+                return await asyncio.shield(task)
+            return await asyncio.wait_for(asyncio.shield(task), timeout)
+        except asyncio.TimeoutError:
+            self._waiter_timeouts += 1
+            raise
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "calls": self._calls,
+            # 업스트림으로 실제 전송된 호출 수
+            "upstream_calls": self._leaders,
+            # 진행 중인 동일 호출의 결과를 공유한 수 (절약된 호출)
+            "deduplicated": self._shared,
+            "dedup_rate": round(self._shared / self._calls, 4) if self._calls else 0.0,
+            "inflight": len(self._inflight),
+            "waiter_timeouts": self._waiter_timeouts,
+            "upstream_errors": self._errors
+        }
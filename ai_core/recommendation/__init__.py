@@ -3,13 +3,24 @@
 추천 시스템 모듈
 - 스마트 콘텐츠 추천
 - RAG 기반 추천
+- 카탈로그 임베딩 저장소
 """
 
-from .content_recommender import get_smart_recommendation
+from .catalog_index import catalog_index
+from .content_recommender import (
+    get_smart_recommendation,
+    aget_smart_recommendation,
+    aget_multi_category_recommendation,
+    aget_all_emotion_recommendations
+)
 from .rag_recommender import get_rag_recommendation, format_recommendation
 
 __all__ = [
+    'catalog_index',
     'get_smart_recommendation',
+    'aget_smart_recommendation',
+    'aget_multi_category_recommendation',
+    'aget_all_emotion_recommendations',
     'get_rag_recommendation',
     'format_recommendation'
 ]
@@ -0,0 +1,291 @@
+# catalog_index.py
+# 추천 카탈로그 임베딩 저장소
+# (감정, 카테고리)별로 정규화된 float32 임베딩 행렬을 한 번만 만들어 두고,
+# 요청 시에는 질의 텍스트 임베딩 1회 + 행렬곱 1회로 랭킹합니다.
+
+import hashlib
+import os
+import sys
+import tempfile
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# 프로젝트 루트를 sys.path에 추가
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, BASE_DIR)
+
+from ai_core.llm.llm_utils import EMBEDDING_MODEL, get_embeddings
+from data.recommendation_data import CATEGORY_DATA, get_recommendation_data
+
+DATA_DIR = os.path.join(BASE_DIR, "data")
+CATALOG_PATH = os.path.join(DATA_DIR, "catalog_embeddings.npz")
+
+
+def get_content_text(content: Dict, category: str) -> str:
+    """
+    콘텐츠 정보를 임베딩용 텍스트로 변환합니다.
+    """
+    if category == "도서":
+        title = content.get("title", "")
+        author = content.get("author", "")
+        description = content.get("description", "")
+        return f"{title} {author} {description}"
+
+    elif category == "음악":
+        title = content.get("title", "")
+        artist = content.get("artist", "")
+        description = content.get("description", "")
+        return f"{title} {artist} {description}"
+
+    elif category == "식사":
+        name = content.get("name", "")
+        description = content.get("description", "")
+        category_type = content.get("category", "")
+        return f"{name} {description} {category_type}"
+
+    return ""
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """행 단위 L2 정규화 (영벡터는 그대로 0으로 둡니다)"""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def top_k_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """점수 배열에서 상위 K개 인덱스를 내림차순으로 반환합니다 (argpartition 사용)."""
+    k = min(top_k, scores.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+def _fingerprint(texts: List[str]) -> str:
+    """카탈로그 텍스트 목록의 지문 (데이터가 바뀌면 재계산 대상)"""
+    digest = hashlib.sha1(EMBEDDING_MODEL.encode("utf-8"))
+    for text in texts:
+        digest.update(b"\x00")
+        digest.update(text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class CatalogIndex:
+    """
+    (감정, 카테고리)별 카탈로그 임베딩 행렬 저장소
+
+    - 행렬은 RETRIEVAL_DOCUMENT 임베딩을 L2 정규화한 float32 배열입니다.
+    - data/catalog_embeddings.npz 에 저장해 두면 재시작 시 원격 호출 없이 로드합니다.
+    - 카탈로그 데이터가 바뀐 (감정, 카테고리)만 다시 임베딩합니다.
+    """
+
+    def __init__(self, path: str = CATALOG_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._matrices: Dict[Tuple[str, str], np.ndarray] = {}
+        self._fingerprints: Dict[Tuple[str, str], str] = {}
+        self._loaded = False
+
+    def _load_file(self):
+        """저장된 임베딩 파일을 읽어옵니다. 파일이 없으면 아무것도 하지 않습니다."""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with np.load(self.path, allow_pickle=False) as stored:
+                keys = stored["keys"].tolist()
+                fingerprints = stored["fingerprints"].tolist()
+                for i, (key, fingerprint) in enumerate(zip(keys, fingerprints)):
+                    emotion, category = key.split("\t")
+                    contents = get_recommendation_data(emotion, category)
+                    texts = [get_content_text(content, category) for content in contents]
+                    # 저장 이후 카탈로그가 바뀐 항목은 버리고 다시 계산
+                    if fingerprint != _fingerprint(texts):
+                        continue
+                    self._matrices[(emotion, category)] = stored[f"m{i}"]
+                    self._fingerprints[(emotion, category)] = fingerprint
+        except Exception as e:
+            print(f"카탈로그 임베딩 파일 로드 중 오류 발생: {e}")
+            self._matrices.clear()
+            self._fingerprints.clear()
+
+    def _save_file(self):
+        """
+        현재 행렬들을 파일로 저장합니다 (임시 파일에 쓴 뒤 교체).
+        임시 파일은 매번 고유한 이름으로 만들어, 여러 워커가 동시에 저장해도 덜 쓰인 파일로 교체되지 않습니다.
+        """
+        # 완전하게 계산된 (지문이 있는) 행렬만 저장
+        keys = [key for key in self._matrices if key in self._fingerprints]
+        arrays = {f"m{i}": self._matrices[key] for i, key in enumerate(keys)}
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(
+                dir=os.path.dirname(self.path) or None,
+                prefix=os.path.basename(self.path) + ".",
+                suffix=".tmp.npz"
+            )
+            with os.fdopen(fd, "wb") as tmp_file:
+                np.savez(
+                    tmp_file,
+                    keys=np.array([f"{emotion}\t{category}" for emotion, category in keys]),
+                    fingerprints=np.array([self._fingerprints[key] for key in keys]),
+                    **arrays
+                )
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"카탈로그 임베딩 파일 저장 중 오류 발생: {e}")
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _embed_texts(self, texts: List[str]) -> Tuple[np.ndarray, bool]:
+        """
+        카탈로그 텍스트들을 문서 임베딩으로 변환합니다.
+        실패한 항목은 영벡터(유사도 0)로 채우고, 완전성 여부를 함께 반환합니다.
+        """
+        to_embed = [text for text in texts if text]
+        embedded = dict(zip(to_embed, get_embeddings(to_embed, task_type="RETRIEVAL_DOCUMENT"))) if to_embed else {}
+        vectors = [embedded.get(text) if text else None for text in texts]
+        complete = all(vector is not None for text, vector in zip(texts, vectors) if text)
+
+        dimension = next((len(v) for v in vectors if v is not None), 0)
+        if dimension == 0:
+            return np.zeros((len(texts), 0), dtype=np.float32), False
+
+        matrix = np.zeros((len(texts), dimension), dtype=np.float32)
+        for i, vector in enumerate(vectors):
+            if vector is not None:
+                matrix[i] = vector
+        return normalize_rows(matrix), complete
+
+    def build(self, force: bool = False) -> int:
+        """
+        전체 카탈로그의 임베딩 행렬을 준비합니다.
+        변경된 항목만 다시 임베딩하며, 새로 계산한 (감정, 카테고리) 수를 반환합니다.
+        """
+        with self._lock:
+            if not self._loaded:
+                self._load_file()
+                self._loaded = True
+
+            rebuilt = 0
+            for category, emotion_map in CATEGORY_DATA.items():
+                for emotion, contents in emotion_map.items():
+                    if self._ensure(emotion, category, contents, force):
+                        rebuilt += 1
+
+            if rebuilt:
+                self._save_file()
+            return rebuilt
+
+    def _ensure(self, emotion: str, category: str, contents: List[Dict], force: bool = False) -> bool:
+        """(감정, 카테고리) 행렬이 최신인지 확인하고, 필요하면 다시 계산합니다. (lock 보유 상태에서 호출)"""
+        key = (emotion, category)
+        texts = [get_content_text(content, category) for content in contents]
+        fingerprint = _fingerprint(texts)
+
+        if not force and self._fingerprints.get(key) == fingerprint and key in self._matrices:
+            return False
+
+        matrix, complete = self._embed_texts(texts)
+        if matrix.shape[1] == 0:
+            return False
+
+        self._matrices[key] = matrix
+        # 일부 임베딩이 실패한 경우 지문을 남기지 않아 다음 빌드 때 다시 계산합니다.
+        if complete:
+            self._fingerprints[key] = fingerprint
+        else:
+            self._fingerprints.pop(key, None)
+        return complete
+
+    def is_ready(self, emotion: str, category: str) -> bool:
+        """(감정, 카테고리) 행렬이 원격 호출 없이 바로 사용 가능한지 여부"""
+        key = (emotion, category)
+        return key in self._matrices and key in self._fingerprints
+
+    def _ready_matrix(self, emotion: str, category: str) -> Optional[np.ndarray]:
+        """준비된 (지문이 확인된) 행렬만 반환합니다. 없으면 계산하지 않고 None을 반환합니다."""
+        key = (emotion, category)
+        if key not in self._fingerprints:
+            return None
+        return self._matrices.get(key)
+
+    def get_matrix(self, emotion: str, category: str) -> Optional[np.ndarray]:
+        """(감정, 카테고리)의 정규화된 임베딩 행렬을 반환합니다. 처음 요청 시 로드/계산합니다."""
+        key = (emotion, category)
+        matrix = self._matrices.get(key)
+        if matrix is not None and key in self._fingerprints:
+            return matrix
+
+        contents = get_recommendation_data(emotion, category)
+        if not contents:
+            return None
+
+        with self._lock:
+            if not self._loaded:
+                self._load_file()
+                self._loaded = True
+            if self._ensure(emotion, category, contents):
+                self._save_file()
+            return self._matrices.get(key)
+
+    def rank(self, query_vector, emotion: str, category: str, top_k: int = 3) -> List[Dict]:
+        """
+        질의 벡터와 (감정, 카테고리) 카탈로그의 코사인 유사도로 상위 K개 콘텐츠를 반환합니다.
+        준비된 행렬만 사용하며 (임베딩 호출 없음), 행렬이 준비되지 않았으면 카탈로그 순서대로 K개를 반환합니다.
+        """
+        contents = get_recommendation_data(emotion, category)
+        if not contents:
+            return []
+
+        matrix = self._ready_matrix(emotion, category)
+        if query_vector is None or matrix is None or matrix.shape[0] != len(contents):
+            return contents[:top_k]
+
+        query = normalize_rows(np.asarray(query_vector, dtype=np.float32))
+        scores = matrix @ query
+        return [contents[i] for i in top_k_indices(scores, top_k)]
+
+    def _rank_pools(self, query_vector, pools: List[Tuple[str, str]], top_k: int) -> Dict[Tuple[str, str], List[Dict]]:
+        """
+        여러 (감정, 카테고리) 풀을 한 번에 랭킹합니다.
+        풀 행렬을 이어 붙여 행렬곱 1회로 점수를 구한 뒤 풀별 상위 K개를 고릅니다.
+        준비되지 않은 풀은 임베딩하지 않고 카탈로그 순서대로 K개를 반환합니다.
+        """
+        results: Dict[Tuple[str, str], List[Dict]] = {}
+        blocks = []
+        for emotion, category in pools:
+            contents = get_recommendation_data(emotion, category)
+            matrix = self._ready_matrix(emotion, category) if contents else None
+            if query_vector is None or matrix is None or matrix.shape[0] != len(contents):
+                results[(emotion, category)] = contents[:top_k]
+            else:
+                blocks.append(((emotion, category), contents, matrix))
+
+        if blocks:
+            query = normalize_rows(np.asarray(query_vector, dtype=np.float32))
+            scores = np.vstack([matrix for _, _, matrix in blocks]) @ query
+            offset = 0
+            for pool, contents, matrix in blocks:
+                block_scores = scores[offset:offset + matrix.shape[0]]
+                offset += matrix.shape[0]
+                results[pool] = [contents[i] for i in top_k_indices(block_scores, top_k)]
+
+        return results
+
+    def rank_categories(self, query_vector, emotion: str, categories: List[str], top_k: int = 3) -> Dict[str, List[Dict]]:
+        """한 감정의 여러 카테고리를 한 번에 랭킹합니다."""
+        results = self._rank_pools(query_vector, [(emotion, category) for category in categories], top_k)
+        return {category: results[(emotion, category)] for category in categories}
+
+    def rank_emotions(self, query_vector, emotions: List[str], category: str, top_k: int = 3) -> Dict[str, List[Dict]]:
+        """한 카테고리의 여러 감정 풀을 한 번에 랭킹합니다 (감정이 정해지기 전에 미리 랭킹할 때 사용)."""
+        results = self._rank_pools(query_vector, [(emotion, category) for emotion in emotions], top_k)
+        return {emotion: results[(emotion, category)] for emotion in emotions}
+
+
+# 전역 카탈로그 인덱스 인스턴스
+catalog_index = CatalogIndex()
@@ -1,7 +1,7 @@
 # content_recommender.py
 # 의미 기반 콘텐츠 추천 시스템
 
-import numpy as np
+import asyncio
 import os
 import sys
 from typing import List, Dict
@@ -10,114 +10,95 @@ from typing import List, Dict
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 sys.path.insert(0, BASE_DIR)
 
-from ai_core.llm.llm_utils import get_embedding
-from data.recommendation_data import get_recommendation_data
+from ai_core.llm.llm_utils import aget_embedding, get_embedding
+from ai_core.recommendation.catalog_index import catalog_index
+from data.recommendation_data import CATEGORY_DATA, get_recommendation_data
 
 
-def calculate_cosine_similarity(vec1: np.ndarray, vec2: np.ndarray) -> float:
-    """두 벡터 간의 코사인 유사도를 계산합니다."""
-    dot_product = np.dot(vec1, vec2)
-    norm1 = np.linalg.norm(vec1)
-    norm2 = np.linalg.norm(vec2)
-
-    if norm1 == 0 or norm2 == 0:
-        return 0.0
-
-    return dot_product / (norm1 * norm2)
-
-
-def get_content_embedding(content: Dict, category: str) -> str:
+def get_smart_recommendation(
+    user_text: str,
+    emotion: str,
+    category: str,
+    top_k: int = 3
+) -> List[Dict]:
     """
-    콘텐츠 정보를 텍스트로 변환합니다.
+    감정 기반으로 콘텐츠를 필터링한 후,
+    사용자 입력과 가장 관련성 높은 콘텐츠를 추천합니다.
+    카탈로그 임베딩은 미리 계산된 행렬을 사용하므로 원격 호출은 사용자 텍스트 1회뿐입니다.
     """
-    if category == "도서":
-        title = content.get("title", "")
-        author = content.get("author", "")
-        description = content.get("description", "")
-        return f"{title} {author} {description}"
+    # 1. 감정에 맞는 콘텐츠 풀 가져오기
+    contents = get_recommendation_data(emotion, category)
 
-    elif category == "음악":
-        title = content.get("title", "")
-        artist = content.get("artist", "")
-        description = content.get("description", "")
-        return f"{title} {artist} {description}"
+    if not contents:
+        return []
 
-    elif category == "식사":
-        name = content.get("name", "")
-        description = content.get("description", "")
-        category_type = content.get("category", "")
-        return f"{name} {description} {category_type}"
+    if not user_text:
+        return contents[:top_k]
 
-    return ""
+    # 2. 사용자 텍스트 임베딩 후 카탈로그 행렬과 유사도 기반으로 랭킹 (행렬이 없으면 먼저 계산)
+    user_embedding = get_embedding(user_text)
+    catalog_index.get_matrix(emotion, category)
+    return catalog_index.rank(user_embedding, emotion, category, top_k)
 
 
-def rank_contents_by_similarity(
+async def aget_smart_recommendation(
     user_text: str,
-    contents: List[Dict],
+    emotion: str,
     category: str,
     top_k: int = 3
 ) -> List[Dict]:
-    """
-    사용자 입력과 콘텐츠 간의 의미적 유사도를 계산하여 상위 K개를 반환합니다.
-    """
-    if not contents or not user_text:
-        return contents[:top_k]
+    """get_smart_recommendation의 비동기 버전 (이벤트 루프를 막지 않음)"""
+    contents = get_recommendation_data(emotion, category)
 
-    # 사용자 텍스트 임베딩
-    user_embedding = get_embedding(user_text)
-    if user_embedding is None:
-        # 임베딩 실패 시 첫 K개 반환
-        return contents[:top_k]
+    if not contents:
+        return []
 
-    user_vec = np.array(user_embedding)
+    if not user_text:
+        return contents[:top_k]
 
-    # 각 콘텐츠의 유사도 계산
-    scored_contents = []
+    user_embedding = await aget_embedding(user_text)
 
-    for content in contents:
-        content_text = get_content_embedding(content, category)
-        if not content_text:
-            scored_contents.append((content, 0.0))
-            continue
+    # 카탈로그 행렬이 아직 없으면 (첫 요청) 임베딩 계산을 스레드에서 수행
+    if not catalog_index.is_ready(emotion, category):
+        await asyncio.to_thread(catalog_index.get_matrix, emotion, category)
 
-        content_embedding = get_embedding(content_text)
-        if content_embedding is None:
-            scored_contents.append((content, 0.0))
-            continue
+    return catalog_index.rank(user_embedding, emotion, category, top_k)
 
-        content_vec = np.array(content_embedding)
-        similarity = calculate_cosine_similarity(user_vec, content_vec)
-        scored_contents.append((content, similarity))
 
-    # 유사도 기준 내림차순 정렬
-    scored_contents.sort(key=lambda x: x[1], reverse=True)
+async def aget_multi_category_recommendation(
+    user_vector,
+    emotion: str,
+    categories: List[str],
+    top_k: int = 3
+) -> Dict[str, List[Dict]]:
+    """
+    이미 임베딩된 사용자 텍스트로 여러 카테고리를 한 번에 추천합니다.
+    같은 텍스트를 카테고리마다 다시 임베딩하지 않고, 랭킹은 행렬곱 1회로 처리합니다.
+    """
+    pending = [category for category in categories if not catalog_index.is_ready(emotion, category)]
+    for category in pending:
+        await asyncio.to_thread(catalog_index.get_matrix, emotion, category)
 
-    # 상위 K개 반환
-    return [content for content, score in scored_contents[:top_k]]
+    return catalog_index.rank_categories(user_vector, emotion, categories, top_k)
 
 
-def get_smart_recommendation(
+async def aget_all_emotion_recommendations(
     user_text: str,
-    emotion: str,
     category: str,
     top_k: int = 3
-) -> List[Dict]:
+) -> Dict[str, List[Dict]]:
     """
-    감정 기반으로 콘텐츠를 필터링한 후,
-    사용자 입력과 가장 관련성 높은 콘텐츠를 추천합니다.
+    감정이 정해지기 전에 카테고리의 모든 감정 풀을 미리 랭킹합니다. (감정 -> 상위 K개)
+    감정 추출과 동시에 실행하면, 감정이 나온 뒤에는 해당 풀의 결과만 고르면 됩니다.
     """
-    # 1. 감정에 맞는 콘텐츠 풀 가져오기
-    contents = get_recommendation_data(emotion, category)
+    emotions = list(CATEGORY_DATA.get(category, {}).keys())
+    if not emotions:
+        return {}
 
-    if not contents:
-        return []
+    user_vector = await aget_embedding(user_text) if user_text else None
 
-    # 2. 사용자 입력과의 유사도 기반으로 랭킹
-    ranked_contents = rank_contents_by_similarity(
-        user_text=user_text,
-        contents=contents,
-        category=category,
-        top_k=top_k
-    )
+    pending = [emotion for emotion in emotions if not catalog_index.is_ready(emotion, category)]
+    for emotion in pending:
+        await asyncio.to_thread(catalog_index.get_matrix, emotion, category)
 
-    return ranked_contents
+    return catalog_index.rank_emotions(user_vector, emotions, category, top_k)
@@ -9,7 +9,7 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__fil
 sys.path.insert(0, BASE_DIR)
 
 from ai_core.llm.llm_utils import get_embedding
-from ai_core.vector_db.vector_db import find_dissimilar_emotion_key
+from ai_core.vector_db.vector_db import vector_store
 from data.recommendation_data import get_recommendation_data
 
 def get_rag_recommendation(conversation_history: str, category: str) -> Dict:
@@ -31,17 +31,10 @@ def get_rag_recommendation(conversation_history: str, category: str) -> Dict:
         opposite_emotion = "평온"
         current_emotion = "불안"
     else:
-        # 2. 벡터 DB에서 반대 감정 찾기
-        opposite_emotion = find_dissimilar_emotion_key(emotion_vector)
-        # 현재 감정은 벡터 DB의 모든 감정 중 가장 유사한 것
-        from vector_db import EMOTIONS, index
-        import numpy as np
-        import faiss
-
-        query_vector = np.array([emotion_vector]).astype('float32')
-        faiss.normalize_L2(query_vector)
-        distances, indices = index.search(query_vector, k=1)
-        current_emotion = EMOTIONS[indices[0][0]]
+        # 2. 벡터 DB에서 현재 감정(가장 유사)과 반대 감정(가장 먼)을 한 번에 찾기
+        nearest, farthest = vector_store.search(emotion_vector, k=1)
+        current_emotion = nearest[0][0]
+        opposite_emotion = farthest[0][0]
 
     # 3. 반대 감정 기반으로 추천 데이터 가져오기
     recommendations = get_recommendation_data(opposite_emotion, category)
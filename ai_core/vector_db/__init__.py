@@ -3,11 +3,14 @@
 벡터 데이터베이스 모듈
 - 감정 벡터 검색
 - 유사도 계산
+- 반대 감정 표 / 인덱스 핫 리로드 (VectorStore)
 """
 
-from .vector_db import find_dissimilar_emotion_key, get_random_content
+from .vector_db import VectorStore, vector_store, find_dissimilar_emotion_key, get_random_content
 
 __all__ = [
+    'VectorStore',
+    'vector_store',
     'find_dissimilar_emotion_key',
     'get_random_content'
 ]
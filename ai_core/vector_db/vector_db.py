@@ -1,27 +1,214 @@
+import os
 import pickle
 import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
 import numpy as np
-import faiss
-import os
 
 # 데이터 파일 경로 설정
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 DATA_DIR = os.path.join(BASE_DIR, "data")
+INDEX_PATH = os.path.join(DATA_DIR, "vector_db.faiss")
+EMOTION_DATA_PATH = os.path.join(DATA_DIR, "emotion_data.pkl")
+
+
+@dataclass
+class _VectorState:
+    """한 번에 교체되는 벡터 DB 상태 (인덱스 + 라벨 + 파생 테이블)"""
+    index: object
+    emotions: List[str]
+    emotion_data: Dict
+    opposites: Dict[str, str]
+    index_mtime: float
+    data_mtime: float
+
+
+class VectorStore:
+    """
+    감정 벡터 DB (Faiss IndexFlatIP + emotion_data.pkl)
+
+    - 처음 사용할 때 로드합니다 (import 시점에 디스크를 읽지 않음).
+    - 한 번의 검색으로 가장 가까운/먼 감정 k개를 함께 구합니다.
+    - 고정된 감정 라벨의 반대 감정 표는 로드 시 미리 계산하므로, 라벨 질의는 임베딩 API를 쓰지 않습니다.
+    - 인덱스 파일이 교체되면 (os.replace 등) 재시작 없이 새 상태로 원자적으로 바꿉니다.
+      각 워커는 reload_check_interval초마다 파일 수정 시각을 확인합니다.
+    """
+
+    def __init__(
+        self,
+        index_path: str = INDEX_PATH,
+        data_path: str = EMOTION_DATA_PATH,
+        reload_check_interval: float = 30.0
+    ):
+        self.index_path = index_path
+        self.data_path = data_path
+        self.reload_check_interval = reload_check_interval
+        self._state: Optional[_VectorState] = None
+        self._lock = threading.Lock()
+        self._last_reload_check = 0.0
+        self._load_failed = False
+
+    def _build_state(self, index_path: str, data_path: str) -> _VectorState:
+        """파일에서 새 상태를 만듭니다 (현재 상태는 건드리지 않음)."""
+        import faiss
+
+        index_mtime = os.path.getmtime(index_path)
+        data_mtime = os.path.getmtime(data_path)
+        index = faiss.read_index(index_path)
+        with open(data_path, "rb") as f:
+            db_data = pickle.load(f)
+
+        emotions = db_data["emotions"]
+        if index.ntotal != len(emotions):
+            raise ValueError(f"인덱스 벡터 수({index.ntotal})와 감정 라벨 수({len(emotions)})가 다릅니다.")
+
+        # 저장된 벡터는 정규화되어 있으므로 내적 = 코사인 유사도
+        vectors = index.reconstruct_n(0, index.ntotal)
+        similarity = vectors @ vectors.T
+        opposites = {
+            emotion: emotions[int(np.argmin(similarity[i]))]
+            for i, emotion in enumerate(emotions)
+        }
+
+        return _VectorState(
+            index=index,
+            emotions=emotions,
+            emotion_data=db_data["data"],
+            opposites=opposites,
+            index_mtime=index_mtime,
+            data_mtime=data_mtime
+        )
+
+    def reload(self, index_path: Optional[str] = None, data_path: Optional[str] = None) -> bool:
+        """
+        새 인덱스 파일을 로드해 현재 상태와 원자적으로 교체합니다.
+        로드에 실패하면 기존 상태를 유지하고 False를 반환합니다.
+        """
+        index_path = index_path or self.index_path
+        data_path = data_path or self.data_path
+        try:
+            state = self._build_state(index_path, data_path)
+        except (FileNotFoundError, OSError, ValueError, KeyError, RuntimeError) as e:
+            print(f"벡터 DB 로드 중 오류 발생: {e}")
+            return False
+
+        with self._lock:
+            self.index_path = index_path
+            self.data_path = data_path
+            self._state = state
+            self._load_failed = False
+        print("벡터 DB가 성공적으로 로드되었습니다.")
+        return True
+
+    def _files_changed(self, state: _VectorState) -> bool:
+        try:
+            return (
+                os.path.getmtime(self.index_path) != state.index_mtime
+                or os.path.getmtime(self.data_path) != state.data_mtime
+            )
+        except OSError:
+            return False
 
-# Faiss 인덱스와 감정 데이터 로드
-try:
-    index = faiss.read_index(os.path.join(DATA_DIR, "vector_db.faiss"))
-    with open(os.path.join(DATA_DIR, "emotion_data.pkl"), "rb") as f:
-        db_data = pickle.load(f)
-    
-    EMOTIONS = db_data["emotions"]
-    EMOTION_DATA = db_data["data"]
-    IS_DB_READY = True
-    print("벡터 DB가 성공적으로 로드되었습니다.")
-except FileNotFoundError:
-    IS_DB_READY = False
-    print("오류: vector_db.faiss 또는 emotion_data.pkl 파일을 찾을 수 없습니다.")
-    print("먼저 populate_db.py 스크립트를 실행하여 DB를 생성해주세요.")
+    def _current(self) -> Optional[_VectorState]:
+        """현재 상태 (최초 사용 시 로드, 주기적으로 파일 변경 확인)"""
+        state = self._state
+        if state is None:
+            if self._load_failed:
+                return None
+            with self._lock:
+                if self._state is None and not self._load_failed:
+                    try:
+                        self._state = self._build_state(self.index_path, self.data_path)
+                        print("벡터 DB가 성공적으로 로드되었습니다.")
+                    except FileNotFoundError:
+                        self._load_failed = True
+                        print("오류: vector_db.faiss 또는 emotion_data.pkl 파일을 찾을 수 없습니다.")
+                        print("먼저 scripts/mk_data_db.py 스크립트를 실행하여 DB를 생성해주세요.")
+                state = self._state
+            self._last_reload_check = time.monotonic()
+            return state
+
+        now = time.monotonic()
+        if self.reload_check_interval > 0 and now - self._last_reload_check >= self.reload_check_interval:
+            self._last_reload_check = now
+            if self._files_changed(state):
+                self.reload()
+                state = self._state
+        return state
+
+    @property
+    def is_ready(self) -> bool:
+        return self._current() is not None
+
+    @property
+    def emotions(self) -> List[str]:
+        state = self._current()
+        return list(state.emotions) if state else []
+
+    def search(self, vector, k: int = 1) -> Tuple[List[Tuple[str, float]], List[Tuple[str, float]]]:
+        """
+        주어진 벡터와 가장 가까운 감정 k개와 가장 먼 감정 k개를 한 번의 검색으로 반환합니다.
+        각 항목은 (감정, 코사인 유사도)이며, 가까운 쪽은 유사도 내림차순, 먼 쪽은 오름차순입니다.
+        """
+        import faiss
+
+        state = self._current()
+        if state is None:
+            raise ConnectionError("벡터 DB가 준비되지 않았습니다.")
+
+        query_vector = np.array([vector]).astype('float32')
+        faiss.normalize_L2(query_vector)
+
+        # IndexFlatIP는 유사도가 높은 순으로 정렬하므로, 전체를 한 번 검색해 양 끝을 사용합니다.
+        distances, indices = state.index.search(query_vector, k=state.index.ntotal)
+        ranked = [
+            (state.emotions[i], float(d))
+            for i, d in zip(indices[0], distances[0])
+            if i >= 0
+        ]
+        return ranked[:k], ranked[::-1][:k]
+
+    def nearest_emotion(self, vector) -> str:
+        """주어진 벡터와 코사인 유사도가 가장 높은 감정"""
+        nearest, _ = self.search(vector, k=1)
+        return nearest[0][0]
+
+    def farthest_emotion(self, vector) -> str:
+        """주어진 벡터와 코사인 유사도가 가장 낮은 감정"""
+        _, farthest = self.search(vector, k=1)
+        return farthest[0][0]
+
+    def opposite_of(self, emotion: str) -> Optional[str]:
+        """
+        감정 라벨의 반대 감정 (미리 계산된 표, 임베딩 API 호출 없음)
+        DB가 준비되지 않았거나 모르는 라벨이면 None을 반환합니다.
+        """
+        state = self._current()
+        if state is None:
+            return None
+        return state.opposites.get(emotion)
+
+    def get_random_content(self, emotion_key: str) -> dict:
+        """주어진 감정 키에 해당하는 콘텐츠 중 하나를 무작위로 선택합니다."""
+        state = self._current()
+        if state is None:
+            raise ConnectionError("벡터 DB가 준비되지 않았습니다.")
+
+        content_pool = state.emotion_data.get(emotion_key, {})
+        if not content_pool:
+            return {"error": "추천할 콘텐츠가 없습니다."}
+
+        content_type = random.choice(list(content_pool.keys()))
+        content_item = random.choice(content_pool[content_type])
+
+        return {content_type: content_item}
+
+
+# 전역 벡터 저장소 인스턴스 (지연 로드)
+vector_store = VectorStore()
 
 
 def find_dissimilar_emotion_key(vector: np.ndarray) -> str:
@@ -30,37 +217,9 @@ def find_dissimilar_emotion_key(vector: np.ndarray) -> str:
     Faiss의 IndexFlatIP는 내적(dot product)을 계산하므로, 정규화된 벡터들 사이에서는
     내적이 코사인 유사도와 같습니다. 따라서 가장 작은 값을 찾으면 됩니다.
     """
-    if not IS_DB_READY:
-        raise ConnectionError("벡터 DB가 준비되지 않았습니다.")
-
-    # 입력 벡터 정규화
-    query_vector = np.array([vector]).astype('float32')
-    faiss.normalize_L2(query_vector)
-
-    # 가장 낮은 유사도(가장 먼 거리)를 가진 벡터 1개를 검색
-    # k=len(EMOTIONS)로 전체를 검색한 뒤, 첫번째(자기 자신)를 제외하고 선택할 수도 있음
-    # 여기서는 가장 낮은 하나만 찾습니다.
-    distances, indices = index.search(query_vector, k=1)
-    
-    # IndexFlatIP는 최대 내적을 찾으므로, k를 늘려 가장 낮은 값을 찾아야 합니다.
-    # 모든 벡터와의 거리를 계산하고 가장 작은 값을 선택합니다.
-    distances, indices = index.search(query_vector, k=len(EMOTIONS))
-
-    # 검색 결과는 유사도가 높은 순으로 정렬되므로, 가장 마지막 인덱스가 유사도가 가장 낮은 벡터입니다.
-    dissimilar_index = indices[0][-1]
+    return vector_store.farthest_emotion(vector)
 
-    return EMOTIONS[dissimilar_index]
 
 def get_random_content(emotion_key: str) -> dict:
     """주어진 감정 키에 해당하는 콘텐츠 중 하나를 무작위로 선택합니다."""
-    if not IS_DB_READY:
-        raise ConnectionError("벡터 DB가 준비되지 않았습니다.")
-        
-    content_pool = EMOTION_DATA.get(emotion_key, {})
-    if not content_pool:
-        return {"error": "추천할 콘텐츠가 없습니다."}
-
-    content_type = random.choice(list(content_pool.keys()))
-    content_item = random.choice(content_pool[content_type])
-    
-    return {content_type: content_item}
+    return vector_store.get_random_content(emotion_key)
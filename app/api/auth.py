@@ -1,18 +1,28 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.core.deps import get_db
-from app.core.security import verify_password, create_access_token
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.deps import get_async_db, get_current_principal, security
+from app.core.security import PasswordHasherBusy, create_access_token, password_hasher, revoke_token
 from app.schemas.user import UserSignupRequest, UserSignupResponse, UserLoginRequest, UserLoginResponse
-from app.crud.user import create_user, get_user_by_username, check_duplicate_user
+from app.crud.user import acreate_user, aget_user_by_username, acheck_duplicate_user, aupdate_user_password_hash
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 
+def _busy_exception() -> HTTPException:
+    """비밀번호 해싱 대기열 초과"""
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="요청이 많아 잠시 후 다시 시도해주세요",
+        headers={"Retry-After": "1"}
+    )
+
+
 @router.post("/signup", response_model=UserSignupResponse, status_code=status.HTTP_201_CREATED)
-def signup(user: UserSignupRequest, db: Session = Depends(get_db)):
+async def signup(user: UserSignupRequest, db: AsyncSession = Depends(get_async_db)):
     """회원가입 - 최적화된 중복 체크 (3쿼리 → 1쿼리)"""
     # 중복 체크 (1번의 쿼리로 username, email, nickname 동시 검증)
-    existing_user = check_duplicate_user(db, user.username, user.email, user.nick_name)
+    existing_user = await acheck_duplicate_user(db, user.username, user.email, user.nick_name)
 
     if existing_user:
         # 어떤 필드가 중복되었는지 확인하여 구체적인 에러 메시지 제공
@@ -33,28 +43,39 @@ def signup(user: UserSignupRequest, db: Session = Depends(get_db)):
             )
 
     # 유저 생성
-    new_user = create_user(db, user)
+    try:
+        new_user = await acreate_user(db, user)
+    except PasswordHasherBusy:
+        raise _busy_exception()
     return {"message": "회원가입이 완료되었습니다", "user": new_user}
 
 
 @router.post("/login", response_model=UserLoginResponse)
-def login(user_login: UserLoginRequest, db: Session = Depends(get_db)):
+async def login(user_login: UserLoginRequest, db: AsyncSession = Depends(get_async_db)):
     """로그인"""
     # 유저 조회
-    user = get_user_by_username(db, user_login.username)
+    user = await aget_user_by_username(db, user_login.username)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="아이디 또는 비밀번호가 올바르지 않습니다"
         )
 
-    # 비밀번호 검증
-    if not verify_password(user_login.password, user.password):
+    # 비밀번호 검증 (bcrypt는 전용 프로세스 풀에서 실행)
+    try:
+        verified, new_hash = await password_hasher.verify_and_update(user_login.password, user.password)
+    except PasswordHasherBusy:
+        raise _busy_exception()
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="아이디 또는 비밀번호가 올바르지 않습니다"
         )
 
+    # BCRYPT_ROUNDS가 바뀐 경우 새 cost로 재해싱한 값 저장
+    if new_hash is not None:
+        await aupdate_user_password_hash(db, user, new_hash)
+
     # JWT 토큰 생성
     access_token = create_access_token(data={"sub": user.username, "userId": user.user_id})
 
@@ -63,3 +84,9 @@ def login(user_login: UserLoginRequest, db: Session = Depends(get_db)):
         "token_type": "bearer",
         "user": user
     }
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(get_current_principal)])
+async def logout(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """로그아웃 - 현재 토큰을 만료 시각까지 폐기 (서버 프로세스 메모리 기준)"""
+    revoke_token(credentials.credentials)
@@ -1,31 +1,70 @@
-from fastapi import APIRouter, HTTPException, status
+import asyncio
+import json
+import time
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 import openai
 from typing import Optional
 
 # AI 핵심 기능 import
 from ai_core.llm import (
-    extract_emotion,
-    extract_recent_emotion,
-    get_embedding,
-    generate_empathetic_response,
-    generate_recommendation_response
+    EMPATHY_FALLBACK,
+    aextract_emotion,
+    aextract_emotion_and_respond,
+    aextract_recent_emotion,
+    aget_embedding,
+    agenerate_recommendation_response,
+    astream_empathetic_response,
+    astream_recommendation_response,
+    chat_semantic_cache,
+    combined_chat_stats,
+    embedding_batcher,
+    embedding_cache,
+    emotion_classifier,
+    history_compactor,
+    llm_resilience,
+    llm_singleflight,
+    start_llm_request_deadline,
+    recommendation_cache
+)
+from ai_core.vector_db import find_dissimilar_emotion_key, vector_store
+from app.core.deps import get_current_principal, get_optional_principal
+from app.core.security import Principal
+from app.services.conversation_store import conversation_store, session_key
+from ai_core.recommendation import (
+    format_recommendation,
+    aget_all_emotion_recommendations,
+    aget_multi_category_recommendation
 )
-from ai_core.vector_db import find_dissimilar_emotion_key
-from ai_core.recommendation import format_recommendation, get_smart_recommendation
 
-router = APIRouter(prefix="/api", tags=["AI Chat & Recommendation"])
+
+async def _llm_request_deadline():
+    """
+    요청마다 LLM 시간 예산을 시작합니다. (LLM_REQUEST_BUDGET_SECONDS)
+    async 의존성이어야 설정한 마감 시각이 같은 요청의 라우트 실행에 적용됩니다.
+    """
+    start_llm_request_deadline()
+
+
+router = APIRouter(
+    prefix="/api",
+    tags=["AI Chat & Recommendation"],
+    dependencies=[Depends(_llm_request_deadline)]
+)
 
 
 class ChatRequest(BaseModel):
     sentence: str
     character: str = "강아지"  # 기본값은 강아지
+    session_id: Optional[str] = None  # 비로그인 클라이언트의 대화 세션 ID (로그인 시 무시)
 
 
 class RecommendRequest(BaseModel):
     type: str  # 도서, 음악, 식사
     character: str = "강아지"
-    conversation_history: str = ""
+    conversation_history: str = ""  # 서버에 대화 세션이 없을 때만 사용
+    session_id: Optional[str] = None
 
 
 class DiaryAnalysisRequest(BaseModel):
@@ -33,27 +72,56 @@ class DiaryAnalysisRequest(BaseModel):
     class_type: str = "일반"
 
 
+async def _timed(awaitable, timings: dict, name: str):
+    """awaitable을 실행하고 소요 시간(ms)을 timings[name]에 기록합니다."""
+    started = time.perf_counter()
+    try:
+        return await awaitable
+    finally:
+        timings[name] = round((time.perf_counter() - started) * 1000, 1)
+
+
+async def _find_opposite_emotion(emotion: str) -> Optional[str]:
+    """
+    감정 라벨의 반대 감정을 찾습니다.
+    고정 라벨은 미리 계산된 표를 사용하고, 표에 없는 라벨만 임베딩 후 벡터 DB를 검색합니다.
+    """
+    opposite_emotion = vector_store.opposite_of(emotion)
+    if opposite_emotion is not None:
+        return opposite_emotion
+
+    emotion_vector = await aget_embedding(emotion)
+    if emotion_vector is None:
+        return None
+    return find_dissimilar_emotion_key(emotion_vector)
+
+
+def _session_key(request, principal: Optional[Principal]) -> Optional[str]:
+    return session_key(principal.user_id if principal else None, request.session_id)
+
+
 @router.post("/chat")
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, principal: Optional[Principal] = Depends(get_optional_principal)):
     """
     AI 챗봇 - 감정 분석 및 공감 응답
     1. 문장에서 감정 추출
     2. 공감 기능이 강화된 응답 생성
-    3. 감정 벡터를 만들어 벡터 DB에서 반대 감정 찾기
-    4. 반대 감정 기반 콘텐츠 추천
-    5. 캐릭터 말투로 응답 생성
+    (1, 2는 structured output 1회 호출로 함께 처리하고, 검증 실패 시 순차 2회 호출로 전환)
+    3. 로그인 사용자 또는 session_id가 있으면 대화 턴을 감정과 함께 세션에 기록
     """
     try:
-        # 1. 감정 추출
-        emotion = extract_emotion(request.sentence)
-
-        # 2. 공감 기능 강화 - 먼저 사용자의 감정에 공감
-        empathy_response = generate_empathetic_response(
+        # 1~2. 감정 추출 + 사용자의 감정에 공감하는 응답 (의미 캐시는 같은 사용자/세션 안에서만 재사용)
+        key = _session_key(request, principal)
+        emotion, empathy_response = await aextract_emotion_and_respond(
             character=request.character,
             user_sentence=request.sentence,
-            user_emotion=emotion
+            cache_scope=key
         )
 
+        # 3. 대화 세션 기록 (/recommend 에서 재사용, fallback 응답은 감정도 기본값이므로 기록하지 않음)
+        if key is not None and empathy_response != EMPATHY_FALLBACK:
+            await conversation_store.append_turn(key, request.sentence, emotion, empathy_response)
+
         return {
             "answer": empathy_response,
             "detected_emotion": emotion
@@ -81,57 +149,83 @@ async def chat(request: ChatRequest):
         )
 
 
-@router.post("/recommend")
-async def recommend(request: RecommendRequest):
+async def _prepare_recommendation(request: RecommendRequest, key: Optional[str] = None) -> Optional[dict]:
     """
-    RAG 기반 지능형 추천 시스템
-    1. 전체 대화 기록에서 최근 감정 분석
-    2. 벡터 DB를 활용한 반대 감정 찾기
-    3. 대화 내용과 가장 관련성 높은 콘텐츠 추천
-    4. 캐릭터 말투로 응답 생성
+    /recommend 공통 단계 (1~3): 최근 감정 분석 → 반대 감정 → 콘텐츠 선택
+    서버에 대화 세션이 있으면 /chat 에서 감지한 마지막 감정과 캐시된 대화 임베딩을 재사용하고,
+    없으면 conversation_history 를 분석합니다. (길면 최근 턴 + 이전 턴 요약으로 압축)
+    추천할 데이터가 없으면 None을 반환합니다.
     """
-    try:
-        # 1. 전체 대화에서 최근 감정 추출
-        conversation = request.conversation_history or "평범한 하루"
+    session = await conversation_store.get_session(key) if key is not None else None
+
+    # 1. 최근 감정 (세션: 마지막 턴의 감정 / 세션 없음: 전체 대화에서 추출)
+    if session is not None:
+        recent_emotion = conversation_store.latest_emotion(session)
+    else:
+        conversation = await history_compactor.acompact_history(request.conversation_history or "평범한 하루")
 
         # 최근 감정 추출 (여러 감정이 있을 경우 가장 최근 것 선택)
-        recent_emotion = extract_recent_emotion(conversation)
-
-        # 2. 감정 임베딩 생성 후 벡터 DB에서 반대 감정 찾기
-        emotion_vector = get_embedding(recent_emotion)
-        if emotion_vector is None:
-            # fallback
-            opposite_emotion = "평온"
-        else:
-            opposite_emotion = find_dissimilar_emotion_key(emotion_vector)
-
-        # 3. 의미 기반 스마트 추천
-        selected = get_smart_recommendation(
-            user_text=conversation,
+        # 대화 임베딩과 랭킹은 감정과 무관하므로 동시에 실행해 모든 감정 풀을 미리 랭킹해 둠
+        recent_emotion, ranked_by_emotion = await asyncio.gather(
+            aextract_recent_emotion(conversation),
+            aget_all_emotion_recommendations(conversation, request.type, top_k=3)
+        )
+
+    # 2. 벡터 DB에서 반대 감정 찾기
+    opposite_emotion = await _find_opposite_emotion(recent_emotion)
+    if opposite_emotion is None:
+        # fallback
+        opposite_emotion = "평온"
+
+    # 3. 의미 기반 스마트 추천
+    if session is not None:
+        user_vector = await conversation_store.aget_embedding(key, session)
+        recommendations = await aget_multi_category_recommendation(
+            user_vector=user_vector,
             emotion=opposite_emotion,
-            category=request.type,
+            categories=[request.type],
             top_k=3
         )
+        selected = recommendations[request.type]
+    else:
+        # 미리 랭킹한 결과 중 반대 감정 풀만 선택
+        selected = ranked_by_emotion.get(opposite_emotion, [])
+
+    if not selected:
+        return None
+
+    return {
+        "category": request.type,
+        "current_emotion": recent_emotion,
+        "recommended_emotion": opposite_emotion,
+        "recommendation": selected[0] if selected else {},
+        "all_recommendations": selected
+    }
+
+
+@router.post("/recommend")
+async def recommend(request: RecommendRequest, principal: Optional[Principal] = Depends(get_optional_principal)):
+    """
+    RAG 기반 지능형 추천 시스템
+    1. 대화 세션의 마지막 감정 재사용 (세션이 없으면 전체 대화 기록에서 최근 감정 분석)
+    2. 벡터 DB를 활용한 반대 감정 찾기
+    3. 대화 내용과 가장 관련성 높은 콘텐츠 추천 (모든 감정 풀을 1번 단계와 동시에 미리 랭킹해 두고 선택)
+    4. 캐릭터 말투로 응답 생성
+    """
+    try:
+        recommendation_data = await _prepare_recommendation(request, _session_key(request, principal))
 
-        if not selected:
+        if recommendation_data is None:
             return {
                 "answer": f"{request.type} 추천 데이터가 없습니다.",
                 "recommendation_data": {"error": "데이터 없음"}
             }
 
-        recommendation_data = {
-            "category": request.type,
-            "current_emotion": recent_emotion,
-            "recommended_emotion": opposite_emotion,
-            "recommendation": selected[0] if selected else {},
-            "all_recommendations": selected
-        }
-
         # 4. 추천 정보 포맷팅
         formatted_rec = format_recommendation(request.type, recommendation_data)
 
         # 5. 캐릭터 말투로 추천 메시지 생성
-        answer = generate_recommendation_response(
+        answer = await agenerate_recommendation_response(
             character=request.character,
             category=request.type,
             recommendation_data=recommendation_data,
@@ -165,46 +259,131 @@ async def recommend(request: RecommendRequest):
         )
 
 
+def _sse(event: str, data) -> str:
+    """Server-Sent Events 메시지 한 건을 직렬화합니다."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _sse_response(events) -> StreamingResponse:
+    """SSE 스트리밍 응답 (프록시 버퍼링 비활성화)"""
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/chat/stream")
+async def chat_stream(request: ChatRequest, principal: Optional[Principal] = Depends(get_optional_principal)):
+    """
+    AI 챗봇 스트리밍 버전 (Server-Sent Events)
+    - event: meta  → {"detected_emotion": ...} (감정 분석 직후)
+    - event: token → {"text": ...} (응답 토큰이 도착하는 대로)
+    - event: done  → {"answer": 전체 응답}
+    - event: error → {"detail": ...}
+    """
+    async def events():
+        try:
+            emotion = await aextract_emotion(request.sentence)
+            yield _sse("meta", {"detected_emotion": emotion})
+
+            answer = []
+            async for delta in astream_empathetic_response(
+                character=request.character,
+                user_sentence=request.sentence,
+                user_emotion=emotion
+            ):
+                answer.append(delta)
+                yield _sse("token", {"text": delta})
+
+            # LLM 호출이 실패해 기본 문구(fallback)로 대신한 응답은 대화 세션에 기록하지 않음
+            full_answer = "".join(answer)
+            key = _session_key(request, principal)
+            if key is not None and full_answer != EMPATHY_FALLBACK:
+                await conversation_store.append_turn(key, request.sentence, emotion, full_answer)
+
+            yield _sse("done", {"answer": full_answer, "detected_emotion": emotion})
+        except Exception as e:
+            yield _sse("error", {"detail": f"챗봇 응답 생성 중 오류가 발생했습니다: {str(e)}"})
+
+    return _sse_response(events())
+
+
+@router.post("/recommend/stream")
+async def recommend_stream(request: RecommendRequest, principal: Optional[Principal] = Depends(get_optional_principal)):
+    """
+    RAG 추천 스트리밍 버전 (Server-Sent Events)
+    - event: meta  → {"recommendation_data": ...} (추천 선택 직후, 생성 전에 전송)
+    - event: token → {"text": ...}
+    - event: done  → {"answer": 전체 응답}
+    - event: error → {"detail": ...}
+    """
+    async def events():
+        try:
+            recommendation_data = await _prepare_recommendation(request, _session_key(request, principal))
+
+            if recommendation_data is None:
+                yield _sse("meta", {"recommendation_data": {"error": "데이터 없음"}})
+                yield _sse("done", {"answer": f"{request.type} 추천 데이터가 없습니다."})
+                return
+
+            yield _sse("meta", {"recommendation_data": recommendation_data})
+
+            formatted_rec = format_recommendation(request.type, recommendation_data)
+            answer = []
+            async for delta in astream_recommendation_response(
+                character=request.character,
+                category=request.type,
+                recommendation_data=recommendation_data,
+                formatted_recommendation=formatted_rec
+            ):
+                answer.append(delta)
+                yield _sse("token", {"text": delta})
+
+            yield _sse("done", {"answer": "".join(answer)})
+        except Exception as e:
+            yield _sse("error", {"detail": f"추천 생성 중 오류가 발생했습니다: {str(e)}"})
+
+    return _sse_response(events())
+
+
 @router.post("/analyze-diary")
-async def analyze_diary(request: DiaryAnalysisRequest):
+async def analyze_diary(request: DiaryAnalysisRequest, debug: bool = False):
     """
     일기 분석 및 감정 기반 지능형 추천
-    1. 일기에서 감정 추출
+    1. 일기에서 감정 추출 + 일기 임베딩 (동시에, 일기 임베딩은 1회만)
     2. 감정 벡터를 만들어 반대 감정 찾기
-    3. 일기 내용과 가장 관련성 높은 콘텐츠를 의미 기반으로 추천
+    3. 일기 내용과 가장 관련성 높은 콘텐츠를 세 카테고리 한 번에 추천
+    debug=true 이면 단계별 소요 시간(ms)을 함께 반환합니다.
     """
+    timings = {}
+    started = time.perf_counter()
     try:
-        # 1. 감정 추출
-        emotion = extract_emotion(request.diary)
-
-        # 2. 감정 임베딩 생성 후 벡터 DB에서 반대 감정 찾기
-        emotion_vector = get_embedding(emotion)
-        if emotion_vector is None:
-            return {"error": "감정 분석에 실패했습니다."}
-
-        opposite_emotion = find_dissimilar_emotion_key(emotion_vector)
-
-        # 3. 의미 기반 스마트 추천
-        selected_books = get_smart_recommendation(
-            user_text=request.diary,
-            emotion=opposite_emotion,
-            category="도서",
-            top_k=2
+        # 1. 감정 추출과 일기 임베딩은 서로 독립적이므로 동시에 실행
+        emotion, diary_vector = await asyncio.gather(
+            _timed(aextract_emotion(request.diary), timings, "emotion"),
+            _timed(aget_embedding(request.diary), timings, "diary_embedding")
         )
 
-        selected_music = get_smart_recommendation(
-            user_text=request.diary,
-            emotion=opposite_emotion,
-            category="음악",
-            top_k=2
-        )
+        # 2. 벡터 DB에서 반대 감정 찾기
+        opposite_emotion = await _timed(_find_opposite_emotion(emotion), timings, "opposite_emotion")
+        if opposite_emotion is None:
+            return {"error": "감정 분석에 실패했습니다."}
 
-        selected_food = get_smart_recommendation(
-            user_text=request.diary,
-            emotion=opposite_emotion,
-            category="식사",
-            top_k=2
+        # 3. 의미 기반 스마트 추천 (세 카테고리를 행렬곱 1회로 랭킹)
+        recommendations = await _timed(
+            aget_multi_category_recommendation(
+                user_vector=diary_vector,
+                emotion=opposite_emotion,
+                categories=["도서", "음악", "식사"],
+                top_k=2
+            ),
+            timings,
+            "ranking"
         )
+        selected_books = recommendations["도서"]
+        selected_music = recommendations["음악"]
+        selected_food = recommendations["식사"]
 
         # 4. 감정에 따른 메시지 생성
         emotion_messages = {
@@ -217,7 +396,7 @@ async def analyze_diary(request: DiaryAnalysisRequest):
 
         message = emotion_messages.get(emotion, "오늘 하루의 감정을 바탕으로 추천을 준비했어요.")
 
-        return {
+        result = {
             "emotion": emotion,
             "opposite_emotion": opposite_emotion,
             "message": message,
@@ -225,6 +404,10 @@ async def analyze_diary(request: DiaryAnalysisRequest):
             "music": selected_music,
             "food": selected_food
         }
+        if debug:
+            timings["total"] = round((time.perf_counter() - started) * 1000, 1)
+            result["timings_ms"] = timings
+        return result
 
     except openai.APIError as e:
         raise HTTPException(
@@ -246,3 +429,32 @@ async def analyze_diary(request: DiaryAnalysisRequest):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"일기 분석 중 오류가 발생했습니다: {str(e)}"
         )
+
+
+@router.get("/metrics", dependencies=[Depends(get_current_principal)])
+async def ai_metrics():
+    """
+    AI 파이프라인 운영 지표 (대시보드용)
+    - embedding_batcher: 임베딩 coalescing 배치 통계
+    - embedding_cache: 임베딩 캐시 적중/미스/제거 통계
+    - emotion_classifier: 로컬 감정 분류 fast-path 적중률 및 LLM 일치율
+    - combined_chat: /chat 통합 호출 검증 실패/오류 통계
+    - recommendation_cache: 추천 응답 캐시 적중률 및 키별 통계
+    - chat_semantic_cache: /chat 의미 캐시 적중률 및 품질 검토 샘플
+    - conversation_store: 대화 세션 수, 감정/임베딩 재사용 통계
+    - history_compactor: 대화 기록 압축 요청 수, 요청당 절약 토큰 수 (추정치)
+    - llm_singleflight: 동시에 들어온 동일 LLM 요청의 중복 제거 수
+    - llm_resilience: LLM 호출 지연(p50/p95), 시간 초과, hedging, circuit breaker 상태
+    """
+    return {
+        "embedding_batcher": embedding_batcher.stats(),
+        "embedding_cache": embedding_cache.stats(),
+        "emotion_classifier": emotion_classifier.stats(),
+        "combined_chat": combined_chat_stats(),
+        "recommendation_cache": recommendation_cache.stats(),
+        "chat_semantic_cache": chat_semantic_cache.stats(),
+        "conversation_store": conversation_store.stats(),
+        "history_compactor": history_compactor.stats(),
+        "llm_singleflight": llm_singleflight.stats(),
+        "llm_resilience": llm_resilience.stats()
+    }
@@ -1,93 +1,284 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from datetime import datetime
-from typing import List
-from app.core.deps import get_db, get_current_user_id
+import json
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date, datetime
+from typing import List, Optional
+from app.core.deps import get_async_db, get_current_user_id
 from app.schemas.diary import (
     DiaryCreateRequest, DiaryCreateResponse, DiaryResponse,
-    DiaryUpdateRequest, DiaryListResponse, DiaryCalendarResponse
+    DiaryUpdateRequest, DiaryListResponse, DiaryCalendarResponse,
+    DiaryEmotionStatsResponse, DiaryImportResponse
 )
 from app.crud.diary import (
-    create_diary, get_diary_by_id, get_diary_by_date,
-    get_diaries_by_user, get_diaries_by_month,
-    update_diary, delete_diary
+    acreate_diary, aget_diary_by_id, aget_diary_by_date,
+    aget_diaries_by_user, aget_diaries_by_month,
+    aupdate_diary, adelete_diary, aget_emotion_stats,
+    aimport_diaries, aget_pending_analysis_by_dates, export_diaries_query
 )
+from app.db.database import AsyncSessionLocal
+from app.services.diary_analyzer import diary_analyzer
 
 router = APIRouter(prefix="/diary", tags=["Diary"])
 
+# 가져오기(import) 시 multi-row INSERT 한 번에 담는 줄 수
+IMPORT_BATCH_SIZE = 500
+# 가져오기 응답에 담는 실패 줄 최대 개수 (줄 번호가 앞선 것부터, 전체 실패 수는 failed로 반환)
+IMPORT_MAX_ERRORS = 100
+# 가져오기 한 줄(일기 하나)의 최대 크기 (넘는 줄은 버리고 실패 줄로 기록)
+IMPORT_MAX_LINE_BYTES = 1024 * 1024
+# 내보내기(export) 시 서버 측 커서에서 한 번에 가져오는 행 수
+EXPORT_YIELD_PER = 500
+
+
+def _validate_year_month(year: int, month: int):
+    """월 단위 조회 파라미터 검증"""
+    # 년도 검증
+    if year < 1900 or year > 2100:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="년도는 1900에서 2100 사이여야 합니다"
+        )
+    # 월 검증
+    if month < 1 or month > 12:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="월은 1에서 12 사이여야 합니다"
+        )
+
 
 @router.post("/", response_model=DiaryCreateResponse, status_code=status.HTTP_201_CREATED)
-def create_diary_endpoint(
+async def create_diary_endpoint(
     diary: DiaryCreateRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user_id: int = Depends(get_current_user_id)
 ):
     """일기 작성"""
     # 같은 날짜에 이미 일기가 있는지 확인
-    existing_diary = get_diary_by_date(db, user_id, diary.diary_date)
+    existing_diary = await aget_diary_by_date(db, user_id, diary.diary_date)
     if existing_diary:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"{diary.diary_date} 날짜에 이미 일기가 존재합니다"
         )
 
-    new_diary = create_diary(db, user_id, diary)
+    try:
+        new_diary = await acreate_diary(db, user_id, diary)
+    except IntegrityError:
+        # 동시 요청으로 확인 이후 같은 날짜의 일기가 먼저 저장된 경우 (uq_diary_user_date)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{diary.diary_date} 날짜에 이미 일기가 존재합니다"
+        )
+
+    # 감정/추천이 비어 있으면 백그라운드에서 AI 분석
+    if new_diary.analysis_hash is None:
+        diary_analyzer.enqueue(new_diary.diary_id, new_diary.content)
     return {"message": "일기가 작성되었습니다", "diary": new_diary}
 
 
 @router.get("/list", response_model=List[DiaryListResponse])
-def get_diary_list(
+async def get_diary_list(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    after_date: Optional[date] = None,
+    after_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db),
     user_id: int = Depends(get_current_user_id)
 ):
-    """일기 목록 조회 (최신순)"""
+    """
+    일기 목록 조회 (최신순)
+    - offset 방식: skip / limit
+    - 커서 방식: 이전 페이지 마지막 항목의 diary_date(, diary_id)를 after_date(, after_id)로 전달
+      (페이지가 깊어져도 조회 비용이 일정합니다)
+    """
     # 파라미터 검증
     if skip < 0:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="skip은 0 이상이어야 합니다"
         )
+    if after_date is not None and skip > 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="after_date와 skip은 함께 사용할 수 없습니다"
+        )
+    if after_id is not None and after_date is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="after_id는 after_date와 함께 사용해야 합니다"
+        )
     if limit < 1 or limit > 1000:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="limit은 1에서 1000 사이여야 합니다"
         )
 
-    diaries = get_diaries_by_user(db, user_id, skip, limit)
+    diaries = await aget_diaries_by_user(db, user_id, skip, limit, after_date, after_id)
     return diaries
 
 
 @router.get("/calendar/{year}/{month}", response_model=DiaryCalendarResponse)
-def get_diary_calendar(
+async def get_diary_calendar(
     year: int,
     month: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user_id: int = Depends(get_current_user_id)
 ):
     """월별 일기 조회 (달력용)"""
-    # 년도 검증
-    if year < 1900 or year > 2100:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="년도는 1900에서 2100 사이여야 합니다"
-        )
-    # 월 검증
-    if month < 1 or month > 12:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="월은 1에서 12 사이여야 합니다"
-        )
+    _validate_year_month(year, month)
 
-    diaries = get_diaries_by_month(db, user_id, year, month)
+    diaries = await aget_diaries_by_month(db, user_id, year, month)
     return {"year": year, "month": month, "diaries": diaries}
 
 
+@router.get("/stats/{year}/{month}", response_model=DiaryEmotionStatsResponse)
+async def get_diary_emotion_stats(
+    year: int,
+    month: int,
+    db: AsyncSession = Depends(get_async_db),
+    user_id: int = Depends(get_current_user_id)
+):
+    """월별 감정 통계 (일기 작성/수정/삭제 시 갱신되는 집계 테이블에서 바로 조회)"""
+    _validate_year_month(year, month)
+
+    return await aget_emotion_stats(db, user_id, year, month)
+
+
+def _json_default(value):
+    """date / datetime 직렬화"""
+    return value.isoformat()
+
+
+async def _export_lines(user_id: int):
+    """
+    사용자 일기를 NDJSON으로 내보냅니다.
+    서버 측 커서로 EXPORT_YIELD_PER 행씩 읽어 바로 전송하므로 일기 수와 무관하게 메모리 사용량이 일정합니다.
+    (응답 스트리밍이 요청 의존성보다 오래 살아 있으므로 세션을 직접 엽니다)
+    """
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(export_diaries_query(user_id, EXPORT_YIELD_PER))
+        async for partition in result.mappings().partitions():
+            yield "".join(
+                json.dumps(dict(row), ensure_ascii=False, default=_json_default) + "\n"
+                for row in partition
+            ).encode("utf-8")
+
+
+@router.get("/export")
+async def export_diaries(user_id: int = Depends(get_current_user_id)):
+    """일기 전체 내보내기 (NDJSON 스트리밍, 한 줄에 일기 하나)"""
+    return StreamingResponse(
+        _export_lines(user_id),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="diaries.ndjson"'}
+    )
+
+
+async def _request_lines(request: Request, max_line_bytes: int = IMPORT_MAX_LINE_BYTES):
+    """
+    요청 본문을 줄 단위로 읽습니다 (본문 전체를 메모리에 올리지 않음).
+    max_line_bytes를 넘는 줄은 내용을 버리고 None을 yield 합니다. (줄 번호는 그대로 유지)
+    """
+    buffer = b""
+    oversized = False  # 현재 줄이 이미 제한을 넘어 줄 끝까지 버리는 중
+    async for chunk in request.stream():
+        if oversized:
+            newline = chunk.find(b"\n")
+            if newline < 0:
+                continue
+            oversized = False
+            chunk = chunk[newline + 1:]
+            yield None
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line if len(line) <= max_line_bytes else None
+        if len(buffer) > max_line_bytes:
+            buffer = b""
+            oversized = True
+    if oversized:
+        yield None
+    elif buffer:
+        yield buffer
+
+
+@router.post("/import", response_model=DiaryImportResponse)
+async def import_diaries(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    user_id: int = Depends(get_current_user_id)
+):
+    """
+    일기 가져오기 (NDJSON, 한 줄에 DiaryCreateRequest 하나 - /diary/export 결과를 그대로 사용 가능)
+    IMPORT_BATCH_SIZE 줄씩 multi-row INSERT로 저장하고, 실패한 줄은 줄 번호와 사유를 반환합니다.
+    """
+    imported = 0
+    failed = 0
+    # 실패 줄은 줄 번호가 앞선 IMPORT_MAX_ERRORS개만 보관 (대량 실패 시에도 메모리 사용량 고정)
+    errors = {}
+    batch = []
+
+    def record_error(line: int, detail: str):
+        nonlocal failed
+        failed += 1
+        if len(errors) < IMPORT_MAX_ERRORS:
+            errors[line] = detail
+            return
+        last = max(errors)
+        if line < last:
+            del errors[last]
+            errors[line] = detail
+
+    async def flush():
+        nonlocal imported
+        inserted, batch_errors = await aimport_diaries(db, user_id, batch)
+        imported += len(inserted)
+        for line, detail in batch_errors.items():
+            record_error(line, detail)
+        # 감정/추천이 없는 일기는 백그라운드 분석 (큐가 가득 차면 다음 서버 시작 시 복구)
+        if diary_analyzer.running and inserted:
+            pending = await aget_pending_analysis_by_dates(db, user_id, [diary.diary_date for _, diary in inserted])
+            for diary_id, content in pending:
+                diary_analyzer.enqueue(diary_id, content)
+        batch.clear()
+
+    line_no = 0
+    async for line in _request_lines(request):
+        line_no += 1
+        if line is None:
+            record_error(line_no, f"줄 길이가 최대 {IMPORT_MAX_LINE_BYTES}바이트를 넘습니다")
+            continue
+        if not line.strip():
+            continue
+        try:
+            batch.append((line_no, DiaryCreateRequest.model_validate_json(line)))
+        except ValidationError as e:
+            first = e.errors()[0]
+            location = ".".join(str(part) for part in first.get("loc", ()))
+            record_error(line_no, f"{location}: {first['msg']}" if location else first["msg"])
+            continue
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            await flush()
+    if batch:
+        await flush()
+
+    return {
+        "imported": imported,
+        "failed": failed,
+        "errors": [
+            {"line": line, "detail": detail}
+            for line, detail in sorted(errors.items())
+        ]
+    }
+
+
 @router.get("/by-date/{diary_date}", response_model=DiaryResponse)
-def get_diary_by_date_endpoint(
+async def get_diary_by_date_endpoint(
     diary_date: str,  # YYYY-MM-DD 형식
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user_id: int = Depends(get_current_user_id)
 ):
     """특정 날짜의 일기 조회"""
@@ -99,7 +290,7 @@ def get_diary_by_date_endpoint(
             detail="날짜 형식이 올바르지 않습니다. YYYY-MM-DD 형식을 사용하세요"
         )
 
-    diary = get_diary_by_date(db, user_id, date_obj)
+    diary = await aget_diary_by_date(db, user_id, date_obj)
     if not diary:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -109,13 +300,13 @@ def get_diary_by_date_endpoint(
 
 
 @router.get("/{diary_id}", response_model=DiaryResponse)
-def get_diary_detail(
+async def get_diary_detail(
     diary_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user_id: int = Depends(get_current_user_id)
 ):
     """일기 상세 조회"""
-    diary = get_diary_by_id(db, diary_id, user_id)
+    diary = await aget_diary_by_id(db, diary_id, user_id)
     if not diary:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -125,16 +316,16 @@ def get_diary_detail(
 
 
 @router.put("/{diary_id}", response_model=DiaryResponse)
-def update_diary_endpoint(
+async def update_diary_endpoint(
     diary_id: int,
     diary_update: DiaryUpdateRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user_id: int = Depends(get_current_user_id)
 ):
     """일기 수정"""
     # 날짜를 변경하는 경우, 해당 날짜에 이미 다른 일기가 있는지 확인
     if diary_update.diary_date is not None:
-        existing_diary = get_diary_by_date(db, user_id, diary_update.diary_date)
+        existing_diary = await aget_diary_by_date(db, user_id, diary_update.diary_date)
         # 같은 날짜에 다른 일기가 있고, 그게 현재 수정하려는 일기가 아닌 경우
         if existing_diary and existing_diary.diary_id != diary_id:
             raise HTTPException(
@@ -142,23 +333,33 @@ def update_diary_endpoint(
                 detail=f"{diary_update.diary_date} 날짜에 이미 일기가 존재합니다"
             )
 
-    updated_diary = update_diary(db, diary_id, user_id, diary_update)
+    try:
+        updated_diary = await aupdate_diary(db, diary_id, user_id, diary_update)
+    except IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{diary_update.diary_date} 날짜에 이미 일기가 존재합니다"
+        )
     if not updated_diary:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="일기를 찾을 수 없습니다"
         )
+
+    # 본문이 바뀐 경우에만 다시 분석 (본문 해시가 같으면 analysis_hash 유지)
+    if updated_diary.analysis_hash is None:
+        diary_analyzer.enqueue(updated_diary.diary_id, updated_diary.content)
     return updated_diary
 
 
 @router.delete("/{diary_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_diary_endpoint(
+async def delete_diary_endpoint(
     diary_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user_id: int = Depends(get_current_user_id)
 ):
     """일기 삭제"""
-    success = delete_diary(db, diary_id, user_id)
+    success = await adelete_diary(db, diary_id, user_id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Depends
+from app.core.deps import get_current_principal
+from app.core.security import password_hasher, revoked_tokens, token_cache
+from app.crud.user import user_cache
+from app.services.diary_analyzer import diary_analyzer
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+
+@router.get("", dependencies=[Depends(get_current_principal)])
+async def app_metrics():
+    """
+    앱 운영 지표 (대시보드용, AI 라우터 사용 여부와 관계없이 제공)
+    - password_hasher: bcrypt 프로세스 풀 대기열, 지연 시간, 풀 재생성 수
+    - token_cache / user_cache: 검증된 토큰, 사용자 프로필 캐시 적중률
+    - revoked_tokens: 만료 전까지 보관 중인 폐기 토큰 수
+    - diary_analyzer: 일기 백그라운드 분석 큐 길이 및 대기 시간
+    """
+    return {
+        "password_hasher": password_hasher.stats(),
+        "token_cache": token_cache.stats(),
+        "user_cache": user_cache.stats(),
+        "revoked_tokens": revoked_tokens.stats(),
+        "diary_analyzer": diary_analyzer.stats()
+    }
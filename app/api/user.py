@@ -1,19 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.core.deps import get_db, get_current_user_id
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.deps import get_async_db, get_current_user_id
 from app.schemas.user import UserResponse, CharacterUpdateRequest
-from app.db.models import User
+from app.crud.user import aget_user_profile, aupdate_user_character
 
 router = APIRouter(prefix="/user", tags=["User Profile"])
 
 
 @router.get("/profile", response_model=UserResponse)
-def get_profile(
-    db: Session = Depends(get_db),
+async def get_profile(
+    db: AsyncSession = Depends(get_async_db),
     user_id: int = Depends(get_current_user_id)
 ):
-    """현재 로그인한 사용자의 프로필 조회"""
-    user = db.query(User).filter(User.user_id == user_id).first()
+    """현재 로그인한 사용자의 프로필 조회 (캐시 → DB)"""
+    user = await aget_user_profile(db, user_id)
 
     if not user:
         raise HTTPException(
@@ -25,13 +25,13 @@ def get_profile(
 
 
 @router.patch("/character", response_model=UserResponse)
-def update_character(
+async def update_character(
     character_data: CharacterUpdateRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user_id: int = Depends(get_current_user_id)
 ):
     """사용자의 캐릭터 업데이트"""
-    user = db.query(User).filter(User.user_id == user_id).first()
+    user = await aupdate_user_character(db, user_id, character_data.character)
 
     if not user:
         raise HTTPException(
@@ -39,9 +39,4 @@ def update_character(
             detail="사용자를 찾을 수 없습니다"
         )
 
-    # 캐릭터 업데이트
-    user.character = character_data.character
-    db.commit()
-    db.refresh(user)
-
     return user
@@ -0,0 +1,131 @@
+import heapq
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+
+class TTLCache:
+    """
+    크기 제한 LRU + 항목별 만료 시간 캐시 (프로세스 내)
+
+    Args:
+        max_entries: 최대 항목 수 (초과 시 가장 오래 사용되지 않은 항목부터 제거)
+        ttl_seconds: 기본 만료 시간 (초), set()에서 항목별로 더 짧게 지정할 수 있음
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 300.0):
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (만료 시각, 값)
+        self._lock = threading.Lock()
+
+        # 통계
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expired = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """캐시된 값 (없거나 만료되었으면 None)"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self._expired += 1
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None):
+        """값 저장 (ttl_seconds는 기본 만료 시간보다 길게 지정할 수 없음)"""
+        ttl = self.ttl_seconds if ttl_seconds is None else min(ttl_seconds, self.ttl_seconds)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions,
+                "expired": self._expired
+            }
+
+
+class ExpiringSet:
+    """
+    항목별 만료 시각까지 보관하는 집합 (프로세스 내, 크기 제한 없음)
+    TTLCache와 달리 용량 때문에 항목을 밀어내지 않으므로, 만료 전까지 빠지면 안 되는 목록(토큰 폐기 등)에 사용합니다.
+    만료된 항목은 add() 할 때 만료 순서대로 정리됩니다.
+    """
+
+    def __init__(self):
+        self._expires: Dict[Hashable, float] = {}  # key -> 만료 시각
+        self._heap: List[Tuple[float, Hashable]] = []  # (만료 시각, key), 정리 순서
+        self._lock = threading.Lock()
+
+        # 통계
+        self._added = 0
+        self._expired = 0
+
+    def add(self, key: Hashable, ttl_seconds: float):
+        """ttl_seconds 동안 보관 (이미 있으면 더 늦은 만료 시각 유지)"""
+        if ttl_seconds <= 0:
+            return
+        now = time.monotonic()
+        expires_at = now + ttl_seconds
+        with self._lock:
+            self._purge(now)
+            if expires_at > self._expires.get(key, 0.0):
+                self._expires[key] = expires_at
+                heapq.heappush(self._heap, (expires_at, key))
+            self._added += 1
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            expires_at = self._expires.get(key)
+        return expires_at is not None and expires_at > time.monotonic()
+
+    def _purge(self, now: float):
+        while self._heap and self._heap[0][0] <= now:
+            expires_at, key = heapq.heappop(self._heap)
+            # 만료 시각이 연장된 항목의 이전 기록은 건너뜀
+            if self._expires.get(key) == expires_at:
+                del self._expires[key]
+                self._expired += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._purge(time.monotonic())
+            return {
+                "entries": len(self._expires),
+                "added": self._added,
+                "expired": self._expired
+            }
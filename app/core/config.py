@@ -21,14 +21,42 @@ class Settings(BaseSettings):
     JWT_ALGORITHM: str = "HS256"
     JWT_ACCESS_TOKEN_EXPIRE_MINUTES: int = 10080  # 7 days (60*24*7)
 
+    # Auth Cache Configuration (프로세스 내 캐시, 워커 간 공유되지 않음)
+    TOKEN_CACHE_SIZE: int = 10000  # 검증된 토큰 캐시 최대 항목 수
+    TOKEN_CACHE_TTL_SECONDS: int = 300  # 토큰 만료(exp)가 더 빠르면 exp까지만 캐시
+    USER_CACHE_SIZE: int = 10000  # 사용자 프로필 캐시 최대 항목 수
+    USER_CACHE_TTL_SECONDS: int = 60
+
+    # Password Hashing Configuration (bcrypt, 전용 프로세스 풀)
+    BCRYPT_ROUNDS: int = 12  # 변경하면 기존 해시는 다음 로그인 때 새 cost로 재해싱
+    PASSWORD_HASH_WORKERS: int = 2  # 해싱 전용 프로세스 수
+    PASSWORD_HASH_MAX_PENDING: int = 64  # 대기+실행 중 작업 상한 (초과 시 503)
+
     # OpenAI API Configuration
     OPENAI_API_KEY: Optional[str] = None
     GOOGLE_API_KEY: Optional[str] = None
 
+    # AI Configuration
+    AI_ROUTES_ENABLED: bool = True  # False면 /api (AI) 라우터와 AI 스택을 전혀 로드하지 않음
+    AI_EAGER_INIT: bool = False  # True면 서버 시작 시 AI 스택을 미리 초기화 (기본: 첫 요청 시)
+
+    # Diary Analysis Worker Configuration (일기 작성/수정 시 백그라운드 AI 분석)
+    DIARY_ANALYSIS_ENABLED: bool = True  # AI_ROUTES_ENABLED가 False면 함께 비활성화
+    DIARY_ANALYSIS_WORKERS: int = 2
+    DIARY_ANALYSIS_BATCH_SIZE: int = 16
+    DIARY_ANALYSIS_QUEUE_SIZE: int = 1000
+    DIARY_ANALYSIS_CLAIM_SECONDS: int = 600  # 시작 시 복구한 일기의 점유 시간 (다른 워커 프로세스는 이 동안 가져가지 않음)
+
+    # Conversation Session Configuration (/api/chat 대화 기록, 프로세스 내 저장)
+    CONVERSATION_MAX_TURNS: int = 20  # 세션별 보관하는 최근 대화 턴 수
+    CONVERSATION_MAX_SESSIONS: int = 10000  # 초과 시 가장 오래 사용되지 않은 세션부터 제거
+    CONVERSATION_TTL_SECONDS: int = 3600  # 마지막 대화 이후 세션 보관 시간
+
     # Database Connection Pool Configuration
     DB_POOL_SIZE: int = 10
     DB_MAX_OVERFLOW: int = 20
     DB_POOL_RECYCLE: int = 3600  # 1 hour
+    DB_ASYNC_DRIVER: str = "asyncmy"  # 비동기 엔진 드라이버 (asyncmy 또는 aiomysql)
 
     # Environment Configuration
     ENVIRONMENT: str = "development"  # development, production
@@ -45,6 +73,12 @@ class Settings(BaseSettings):
         encoded_password = quote_plus(self.DB_PASSWORD)
         return f"mysql+pymysql://{self.DB_USER}:{encoded_password}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}?charset=utf8mb4"
 
+    # 비동기 Database URL 생성 (API 라우트용)
+    @property
+    def async_database_url(self) -> str:
+        encoded_password = quote_plus(self.DB_PASSWORD)
+        return f"mysql+{self.DB_ASYNC_DRIVER}://{self.DB_USER}:{encoded_password}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}?charset=utf8mb4"
+
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -1,12 +1,16 @@
-from typing import Generator
+from typing import AsyncGenerator, Generator, Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
-from app.db.database import SessionLocal
-from app.core.security import verify_token
+from app.db.database import SessionLocal, AsyncSessionLocal
+from app.core.security import (
+    Principal, cache_principal, get_cached_principal, is_token_revoked, verify_token
+)
 
 # HTTP Bearer 스키마
 security = HTTPBearer()
+# 인증이 선택 사항인 라우트용 (토큰이 없으면 None)
+optional_security = HTTPBearer(auto_error=False)
 
 
 def get_db() -> Generator:
@@ -21,20 +25,33 @@ def get_db() -> Generator:
         db.close()
 
 
-def get_current_user_id(credentials: HTTPAuthorizationCredentials = Depends(security)) -> int:
+async def get_async_db() -> AsyncGenerator:
     """
-    JWT 토큰에서 현재 사용자 ID 추출
+    비동기 데이터베이스 세션 의존성
+    async 라우트에서 스레드풀을 거치지 않고 이벤트 루프에서 바로 DB를 사용합니다.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
 
-    Args:
-        credentials: HTTP Bearer 토큰
 
-    Returns:
-        int: 사용자 ID
+def _authenticate(token: str) -> Principal:
+    """
+    JWT 토큰 검증 결과 (Principal)
+    검증된 토큰은 exp까지 캐시하므로, 같은 토큰의 반복 요청은 jwt.decode를 다시 하지 않습니다.
 
     Raises:
-        HTTPException: 토큰이 유효하지 않거나 만료된 경우
+        HTTPException: 토큰이 유효하지 않거나, 만료되었거나, 폐기된 경우
     """
-    token = credentials.credentials
+    if is_token_revoked(token):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="유효하지 않거나 만료된 토큰입니다"
+        )
+
+    principal = get_cached_principal(token)
+    if principal is not None:
+        return principal
+
     payload = verify_token(token)
 
     if payload is None:
@@ -50,4 +67,32 @@ def get_current_user_id(credentials: HTTPAuthorizationCredentials = Depends(secu
             detail="토큰 페이로드가 유효하지 않습니다"
         )
 
-    return user_id
+    return cache_principal(token, payload)
+
+
+async def get_current_principal(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Principal:
+    """인증 필수 라우트의 현재 사용자 (Principal)"""
+    return _authenticate(credentials.credentials)
+
+
+async def get_optional_principal(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)
+) -> Optional[Principal]:
+    """인증 선택 라우트의 현재 사용자 (토큰이 없으면 None, 잘못된 토큰은 401)"""
+    if credentials is None:
+        return None
+    return _authenticate(credentials.credentials)
+
+
+async def get_current_user_id(principal: Principal = Depends(get_current_principal)) -> int:
+    """
+    JWT 토큰에서 현재 사용자 ID 추출
+    (CPU 작업이 짧으므로 async로 두어 스레드풀을 거치지 않습니다)
+
+    Args:
+        principal: 검증된 토큰 정보
+
+    Returns:
+        int: 사용자 ID
+    """
+    return principal.user_id
@@ -1,11 +1,27 @@
+import asyncio
+import hashlib
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from app.core.cache import ExpiringSet, TTLCache
 from app.core.config import settings
 
 # 비밀번호 해싱
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# min/max rounds를 기본값과 같게 두어, cost가 다른 기존 해시는 needs_update로 판단되어 로그인 시 재해싱됩니다.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS
+)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -18,6 +34,134 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+# ---------- 해싱 전용 프로세스 풀 ----------
+
+def _timed_hash(password: str) -> Tuple[str, float]:
+    """(프로세스 풀에서 실행) 해싱 결과와 실행 시간"""
+    started = time.perf_counter()
+    return pwd_context.hash(password), time.perf_counter() - started
+
+
+def _timed_verify_and_update(plain_password: str, hashed_password: str) -> Tuple[Tuple[bool, Optional[str]], float]:
+    """(프로세스 풀에서 실행) 검증 결과, cost가 바뀌었으면 새 해시, 실행 시간"""
+    started = time.perf_counter()
+    return pwd_context.verify_and_update(plain_password, hashed_password), time.perf_counter() - started
+
+
+class PasswordHasherBusy(Exception):
+    """해싱 대기열이 가득 찬 경우 (API에서는 503으로 응답)"""
+
+
+class PasswordHasher:
+    """
+    bcrypt 전용 프로세스 풀
+
+    - 요청 스레드풀/이벤트 루프와 분리된 프로세스에서 실행해, 로그인이 몰려도 다른 요청이 밀리지 않습니다.
+    - 대기+실행 중인 작업이 max_pending 이상이면 바로 PasswordHasherBusy를 발생시킵니다.
+    - 프로세스 풀은 처음 사용할 때 생성하고, 워커 프로세스가 죽어 풀이 깨지면 새로 만들어 한 번 다시 시도합니다.
+    """
+
+    def __init__(self, workers: int = 2, max_pending: int = 64):
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._in_flight = 0
+        self._latencies = deque(maxlen=1024)  # (전체 지연, 실행 시간) 초
+
+        # 통계
+        self._completed = 0
+        self._rejected = 0
+        self._rehashed = 0
+        self._pool_restarts = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # 이벤트 루프/스레드를 가진 부모 프로세스를 fork하지 않도록 spawn 사용
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def _discard_executor(self, broken: ProcessPoolExecutor):
+        """깨진 풀을 정리합니다 (동시에 실패한 다른 요청이 이미 새 풀을 만들었으면 그대로 둠)."""
+        if self._executor is broken:
+            self._executor = None
+            self._pool_restarts += 1
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    async def _run(self, fn, *args):
+        if self._in_flight >= self.max_pending:
+            self._rejected += 1
+            raise PasswordHasherBusy("비밀번호 처리 요청이 많습니다")
+
+        self._in_flight += 1
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            executor = self._get_executor()
+            try:
+                result, exec_seconds = await loop.run_in_executor(executor, fn, *args)
+            except BrokenProcessPool as e:
+                # 워커 프로세스가 비정상 종료되면 풀 전체가 사용 불가가 되므로 새 풀로 교체
+                print(f"비밀번호 해싱 프로세스 풀 오류, 풀을 다시 만듭니다: {e}")
+                self._discard_executor(executor)
+                result, exec_seconds = await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            self._in_flight -= 1
+        self._completed += 1
+        self._latencies.append((time.perf_counter() - started, exec_seconds))
+        return result
+
+    async def hash(self, password: str) -> str:
+        """비밀번호 해싱"""
+        return await self._run(_timed_hash, password)
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """
+        비밀번호 검증
+        검증에 성공했고 저장된 해시의 cost가 현재 설정과 다르면 새 해시를 함께 반환합니다.
+        """
+        verified, new_hash = await self._run(_timed_verify_and_update, plain_password, hashed_password)
+        if new_hash is not None:
+            self._rehashed += 1
+        return verified, new_hash
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        """대기열, 거부 수, 지연 시간 (전체 / 프로세스 내 실행)"""
+        totals = sorted(total for total, _ in self._latencies)
+        executions = [execution for _, execution in self._latencies]
+
+        def percentile(values, ratio):
+            return round(values[min(len(values) - 1, int(len(values) * ratio))] * 1000, 1) if values else None
+
+        return {
+            "workers": self.workers,
+            "bcrypt_rounds": settings.BCRYPT_ROUNDS,
+            "in_flight": self._in_flight,
+            "max_pending": self.max_pending,
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "rehashed": self._rehashed,
+            "pool_restarts": self._pool_restarts,
+            "latency_ms_p50": percentile(totals, 0.5),
+            "latency_ms_p95": percentile(totals, 0.95),
+            "exec_ms_avg": round(sum(executions) / len(executions) * 1000, 1) if executions else None
+        }
+
+
+# 전역 해싱 풀 인스턴스
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING
+)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """JWT 액세스 토큰 생성"""
     to_encode = data.copy()
@@ -38,3 +182,65 @@ def verify_token(token: str) -> Optional[dict]:
         return payload
     except JWTError:
         return None
+
+
+# ---------- 검증된 토큰 캐시 ----------
+
+@dataclass(frozen=True)
+class Principal:
+    """검증된 토큰의 사용자 정보"""
+    user_id: int
+    username: Optional[str]
+    expires_at: float  # exp (unix timestamp)
+
+
+# sha256(토큰) -> Principal (토큰 원문은 저장하지 않음)
+token_cache = TTLCache(settings.TOKEN_CACHE_SIZE, settings.TOKEN_CACHE_TTL_SECONDS)
+# sha256(토큰) 폐기 목록 (토큰 만료 시각까지 보관, 용량 때문에 밀려나 폐기가 풀리지 않도록 크기 제한 없음)
+revoked_tokens = ExpiringSet()
+
+
+def _token_key(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def get_cached_principal(token: str) -> Optional[Principal]:
+    """캐시된 검증 결과 (없거나, 만료되었거나, 폐기된 토큰이면 None)"""
+    key = _token_key(token)
+    principal = token_cache.get(key)
+    if principal is None:
+        return None
+    if principal.expires_at <= time.time():
+        token_cache.delete(key)
+        return None
+    return principal
+
+
+def cache_principal(token: str, payload: dict) -> Principal:
+    """검증된 토큰 페이로드를 Principal로 만들어 exp까지 캐시합니다."""
+    expires_at = float(payload.get("exp", 0))
+    principal = Principal(
+        user_id=payload["userId"],
+        username=payload.get("sub"),
+        expires_at=expires_at
+    )
+    token_cache.set(_token_key(token), principal, ttl_seconds=expires_at - time.time())
+    return principal
+
+
+def is_token_revoked(token: str) -> bool:
+    return _token_key(token) in revoked_tokens
+
+
+def revoke_token(token: str):
+    """
+    토큰 폐기 훅 (로그아웃 등)
+    검증 캐시에서 지우고, 토큰 만료 시각까지 폐기 목록에 보관합니다. (현재 프로세스 기준)
+    """
+    key = _token_key(token)
+    token_cache.delete(key)
+    try:
+        expires_at = float(jwt.get_unverified_claims(token).get("exp", 0))
+    except JWTError:
+        return
+    revoked_tokens.add(key, ttl_seconds=expires_at - time.time())
@@ -1,9 +1,94 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import extract
-from app.db.models import Diary
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from app.db.models import Diary, DiaryEmotionStat
 from app.schemas.diary import DiaryCreateRequest, DiaryUpdateRequest
-from datetime import date
-from typing import List, Optional
+import hashlib
+from datetime import date, datetime, timedelta
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+
+# 목록/달력 응답(DiaryListResponse)에 필요한 컬럼만 조회 (content, recommend_content 제외)
+LIST_COLUMNS = (Diary.diary_id, Diary.title, Diary.emotion, Diary.diary_date, Diary.create_date)
+
+
+def diary_content_hash(content: str) -> str:
+    """일기 본문 해시 (AI 분석 결과가 어떤 본문 기준인지 판단)"""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def _initial_analysis_hash(diary: DiaryCreateRequest) -> Optional[str]:
+    """클라이언트가 감정과 추천을 모두 보냈으면 분석 완료로 표시, 아니면 NULL (분석 대기)"""
+    if diary.emotion is not None and diary.recommend_content is not None:
+        return diary_content_hash(diary.content)
+    return None
+
+
+def month_range(year: int, month: int) -> Tuple[date, date]:
+    """
+    월 조회용 반열린 구간 [해당 월 1일, 다음 달 1일)
+    diary_date 컬럼에 함수를 씌우지 않으므로 (user_id, diary_date) 인덱스 범위 검색을 사용할 수 있습니다.
+    """
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return start, end
+
+
+def _keyset_filter(after_date: Optional[date], after_id: Optional[int]):
+    """
+    (diary_date, diary_id) 내림차순 기준으로 커서 이후 행만 남기는 조건
+    (user_id, diary_date) 인덱스 범위 검색으로 처리되므로 페이지 깊이와 무관하게 O(page) 입니다.
+    """
+    if after_id is None:
+        return Diary.diary_date < after_date
+    return or_(
+        Diary.diary_date < after_date,
+        and_(Diary.diary_date == after_date, Diary.diary_id < after_id)
+    )
+
+
+def _emotion_stat_delta(user_id: int, diary_date: date, emotion: Optional[str], delta: int):
+    """
+    월별 감정 집계 증감 쿼리 (INSERT ... ON DUPLICATE KEY UPDATE)
+    감정이 없으면 None을 반환합니다. 호출한 쪽의 트랜잭션 안에서 실행됩니다.
+    """
+    if not emotion:
+        return None
+    stmt = mysql_insert(DiaryEmotionStat).values(
+        user_id=user_id,
+        year=diary_date.year,
+        month=diary_date.month,
+        emotion=emotion,
+        diary_count=max(delta, 0)
+    )
+    return stmt.on_duplicate_key_update(
+        diary_count=DiaryEmotionStat.__table__.c.diary_count + delta
+    )
+
+
+def _emotion_stat_changes(user_id: int, old_date: date, old_emotion: Optional[str], new_date: date, new_emotion: Optional[str]) -> list:
+    """일기의 (월, 감정)이 바뀐 경우 이전 집계 -1, 새 집계 +1 쿼리 목록"""
+    if (old_date.year, old_date.month, old_emotion) == (new_date.year, new_date.month, new_emotion):
+        return []
+    statements = [
+        _emotion_stat_delta(user_id, old_date, old_emotion, -1),
+        _emotion_stat_delta(user_id, new_date, new_emotion, 1)
+    ]
+    return [stmt for stmt in statements if stmt is not None]
+
+
+def _emotion_stats_result(year: int, month: int, rows) -> dict:
+    emotions = {emotion: count for emotion, count in rows if count > 0}
+    return {
+        "year": year,
+        "month": month,
+        "total": sum(emotions.values()),
+        "emotions": emotions,
+        "dominant_emotion": max(emotions, key=emotions.get) if emotions else None
+    }
 
 
 def create_diary(db: Session, user_id: int, diary: DiaryCreateRequest) -> Diary:
@@ -15,9 +100,13 @@ def create_diary(db: Session, user_id: int, diary: DiaryCreateRequest) -> Diary:
             content=diary.content,
             diary_date=diary.diary_date,
             emotion=diary.emotion,
-            recommend_content=diary.recommend_content
+            recommend_content=diary.recommend_content,
+            analysis_hash=_initial_analysis_hash(diary)
         )
         db.add(db_diary)
+        stat = _emotion_stat_delta(user_id, diary.diary_date, diary.emotion, 1)
+        if stat is not None:
+            db.execute(stat)
         db.commit()
         db.refresh(db_diary)
         return db_diary
@@ -26,12 +115,16 @@ def create_diary(db: Session, user_id: int, diary: DiaryCreateRequest) -> Diary:
         raise
 
 
-def get_diary_by_id(db: Session, diary_id: int, user_id: int) -> Optional[Diary]:
-    """일기 ID로 조회 (본인 일기만)"""
-    return db.query(Diary).filter(
+def get_diary_by_id(db: Session, diary_id: int, user_id: int, for_update: bool = False) -> Optional[Diary]:
+    """일기 ID로 조회 (본인 일기만, for_update=True면 트랜잭션이 끝날 때까지 행 잠금)"""
+    query = db.query(Diary).filter(
         Diary.diary_id == diary_id,
         Diary.user_id == user_id
-    ).first()
+    )
+    if for_update:
+        # 같은 세션에서 먼저 읽어 둔 객체가 있어도 잠금 시점의 값으로 다시 채움
+        query = query.with_for_update().populate_existing()
+    return query.first()
 
 
 def get_diary_by_date(db: Session, user_id: int, diary_date: date) -> Optional[Diary]:
@@ -42,37 +135,58 @@ def get_diary_by_date(db: Session, user_id: int, diary_date: date) -> Optional[D
     ).first()
 
 
-def get_diaries_by_user(db: Session, user_id: int, skip: int = 0, limit: int = 100) -> List[Diary]:
-    """사용자의 모든 일기 조회 (최신순)"""
-    return db.query(Diary).filter(
-        Diary.user_id == user_id
-    ).order_by(Diary.diary_date.desc()).offset(skip).limit(limit).all()
+def get_diaries_by_user(
+    db: Session,
+    user_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    after_date: Optional[date] = None,
+    after_id: Optional[int] = None
+) -> List:
+    """
+    사용자의 모든 일기 조회 (최신순, 목록용 컬럼만)
+    after_date(/after_id)를 주면 offset 대신 커서 이후 페이지를 조회합니다.
+    """
+    query = db.query(*LIST_COLUMNS).filter(Diary.user_id == user_id)
+    if after_date is not None:
+        query = query.filter(_keyset_filter(after_date, after_id))
+    else:
+        query = query.offset(skip)
+    return query.order_by(Diary.diary_date.desc(), Diary.diary_id.desc()).limit(limit).all()
 
 
-def get_diaries_by_month(db: Session, user_id: int, year: int, month: int) -> List[Diary]:
-    """월별 일기 조회 (달력용)"""
-    return db.query(Diary).filter(
+def get_diaries_by_month(db: Session, user_id: int, year: int, month: int) -> List:
+    """월별 일기 조회 (달력용, 목록용 컬럼만)"""
+    start, end = month_range(year, month)
+    return db.query(*LIST_COLUMNS).filter(
         Diary.user_id == user_id,
-        extract('year', Diary.diary_date) == year,
-        extract('month', Diary.diary_date) == month
+        Diary.diary_date >= start,
+        Diary.diary_date < end
     ).order_by(Diary.diary_date.asc()).all()
 
 
 def update_diary(db: Session, diary_id: int, user_id: int, diary_update: DiaryUpdateRequest) -> Optional[Diary]:
     """일기 수정"""
     try:
-        db_diary = get_diary_by_id(db, diary_id, user_id)
+        # 집계 증감에 쓰는 기존 날짜/감정이 동시 수정·분석 결과 저장과 어긋나지 않도록 행 잠금
+        db_diary = get_diary_by_id(db, diary_id, user_id, for_update=True)
         if not db_diary:
             return None
+        old_date, old_emotion = db_diary.diary_date, db_diary.emotion
 
         # 수정할 필드만 업데이트
         if diary_update.title is not None:
             db_diary.title = diary_update.title
-        if diary_update.content is not None:
+        if diary_update.content is not None and diary_update.content != db_diary.content:
             db_diary.content = diary_update.content
+            # 분석에 사용한 본문과 달라졌으면 다시 분석 대기
+            if db_diary.analysis_hash != diary_content_hash(db_diary.content):
+                db_diary.analysis_hash = None
         if diary_update.diary_date is not None:
             db_diary.diary_date = diary_update.diary_date
 
+        for stat in _emotion_stat_changes(user_id, old_date, old_emotion, db_diary.diary_date, db_diary.emotion):
+            db.execute(stat)
         db.commit()
         db.refresh(db_diary)
         return db_diary
@@ -84,13 +198,348 @@ def update_diary(db: Session, diary_id: int, user_id: int, diary_update: DiaryUp
 def delete_diary(db: Session, diary_id: int, user_id: int) -> bool:
     """일기 삭제"""
     try:
-        db_diary = get_diary_by_id(db, diary_id, user_id)
+        # 집계 증감에 쓰는 기존 날짜/감정이 동시 수정·분석 결과 저장과 어긋나지 않도록 행 잠금
+        db_diary = get_diary_by_id(db, diary_id, user_id, for_update=True)
         if not db_diary:
             return False
 
         db.delete(db_diary)
+        stat = _emotion_stat_delta(user_id, db_diary.diary_date, db_diary.emotion, -1)
+        if stat is not None:
+            db.execute(stat)
         db.commit()
         return True
     except Exception as e:
         db.rollback()
         raise
+
+
+def get_emotion_stats(db: Session, user_id: int, year: int, month: int) -> dict:
+    """월별 감정 통계 (집계 테이블 기본 키 조회)"""
+    rows = db.query(DiaryEmotionStat.emotion, DiaryEmotionStat.diary_count).filter(
+        DiaryEmotionStat.user_id == user_id,
+        DiaryEmotionStat.year == year,
+        DiaryEmotionStat.month == month
+    ).all()
+    return _emotion_stats_result(year, month, rows)
+
+
+# ---------- 비동기 버전 (AsyncSession, async 라우트용) ----------
+
+async def acreate_diary(db: AsyncSession, user_id: int, diary: DiaryCreateRequest) -> Diary:
+    """일기 생성"""
+    try:
+        db_diary = Diary(
+            user_id=user_id,
+            title=diary.title,
+            content=diary.content,
+            diary_date=diary.diary_date,
+            emotion=diary.emotion,
+            recommend_content=diary.recommend_content,
+            analysis_hash=_initial_analysis_hash(diary)
+        )
+        db.add(db_diary)
+        stat = _emotion_stat_delta(user_id, diary.diary_date, diary.emotion, 1)
+        if stat is not None:
+            await db.execute(stat)
+        await db.commit()
+        await db.refresh(db_diary)
+        return db_diary
+    except Exception as e:
+        await db.rollback()
+        raise
+
+
+async def aget_diary_by_id(db: AsyncSession, diary_id: int, user_id: int, for_update: bool = False) -> Optional[Diary]:
+    """일기 ID로 조회 (본인 일기만, for_update=True면 트랜잭션이 끝날 때까지 행 잠금)"""
+    stmt = select(Diary).where(
+        Diary.diary_id == diary_id,
+        Diary.user_id == user_id
+    )
+    if for_update:
+        # 같은 세션에서 먼저 읽어 둔 객체가 있어도 잠금 시점의 값으로 다시 채움
+        stmt = stmt.with_for_update().execution_options(populate_existing=True)
+    result = await db.execute(stmt)
+    return result.scalars().first()
+
+
+async def aget_diary_by_date(db: AsyncSession, user_id: int, diary_date: date) -> Optional[Diary]:
+    """특정 날짜의 일기 조회"""
+    result = await db.execute(
+        select(Diary).where(
+            Diary.user_id == user_id,
+            Diary.diary_date == diary_date
+        )
+    )
+    return result.scalars().first()
+
+
+async def aget_diaries_by_user(
+    db: AsyncSession,
+    user_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    after_date: Optional[date] = None,
+    after_id: Optional[int] = None
+) -> List:
+    """
+    사용자의 모든 일기 조회 (최신순, 목록용 컬럼만)
+    after_date(/after_id)를 주면 offset 대신 커서 이후 페이지를 조회합니다.
+    """
+    query = select(*LIST_COLUMNS).where(Diary.user_id == user_id)
+    if after_date is not None:
+        query = query.where(_keyset_filter(after_date, after_id))
+    else:
+        query = query.offset(skip)
+    result = await db.execute(
+        query.order_by(Diary.diary_date.desc(), Diary.diary_id.desc()).limit(limit)
+    )
+    return list(result.all())
+
+
+async def aget_diaries_by_month(db: AsyncSession, user_id: int, year: int, month: int) -> List:
+    """월별 일기 조회 (달력용, 목록용 컬럼만)"""
+    start, end = month_range(year, month)
+    result = await db.execute(
+        select(*LIST_COLUMNS).where(
+            Diary.user_id == user_id,
+            Diary.diary_date >= start,
+            Diary.diary_date < end
+        ).order_by(Diary.diary_date.asc())
+    )
+    return list(result.all())
+
+
+async def aupdate_diary(db: AsyncSession, diary_id: int, user_id: int, diary_update: DiaryUpdateRequest) -> Optional[Diary]:
+    """일기 수정"""
+    try:
+        # 집계 증감에 쓰는 기존 날짜/감정이 동시 수정·분석 결과 저장과 어긋나지 않도록 행 잠금
+        db_diary = await aget_diary_by_id(db, diary_id, user_id, for_update=True)
+        if not db_diary:
+            return None
+        old_date, old_emotion = db_diary.diary_date, db_diary.emotion
+
+        # 수정할 필드만 업데이트
+        if diary_update.title is not None:
+            db_diary.title = diary_update.title
+        if diary_update.content is not None and diary_update.content != db_diary.content:
+            db_diary.content = diary_update.content
+            # 분석에 사용한 본문과 달라졌으면 다시 분석 대기
+            if db_diary.analysis_hash != diary_content_hash(db_diary.content):
+                db_diary.analysis_hash = None
+        if diary_update.diary_date is not None:
+            db_diary.diary_date = diary_update.diary_date
+
+        for stat in _emotion_stat_changes(user_id, old_date, old_emotion, db_diary.diary_date, db_diary.emotion):
+            await db.execute(stat)
+        await db.commit()
+        # update_date(onupdate) 등 서버에서 바뀐 값을 다시 읽어옴
+        await db.refresh(db_diary)
+        return db_diary
+    except Exception as e:
+        await db.rollback()
+        raise
+
+
+async def adelete_diary(db: AsyncSession, diary_id: int, user_id: int) -> bool:
+    """일기 삭제"""
+    try:
+        # 집계 증감에 쓰는 기존 날짜/감정이 동시 수정·분석 결과 저장과 어긋나지 않도록 행 잠금
+        db_diary = await aget_diary_by_id(db, diary_id, user_id, for_update=True)
+        if not db_diary:
+            return False
+
+        await db.delete(db_diary)
+        stat = _emotion_stat_delta(user_id, db_diary.diary_date, db_diary.emotion, -1)
+        if stat is not None:
+            await db.execute(stat)
+        await db.commit()
+        return True
+    except Exception as e:
+        await db.rollback()
+        raise
+
+
+async def aget_emotion_stats(db: AsyncSession, user_id: int, year: int, month: int) -> dict:
+    """월별 감정 통계 (집계 테이블 기본 키 조회)"""
+    result = await db.execute(
+        select(DiaryEmotionStat.emotion, DiaryEmotionStat.diary_count).where(
+            DiaryEmotionStat.user_id == user_id,
+            DiaryEmotionStat.year == year,
+            DiaryEmotionStat.month == month
+        )
+    )
+    return _emotion_stats_result(year, month, result.all())
+
+
+async def aclaim_pending_analysis(db: AsyncSession, limit: int = 1000, claim_seconds: int = 600) -> List:
+    """
+    AI 분석 대기 중인 일기 (diary_id, content) 목록을 점유해 가져옵니다 (최신순, 분석 워커 복구용).
+    여러 워커 프로세스가 동시에 복구해도 SKIP LOCKED + 점유 만료 시각으로 일기 하나를 한 프로세스만 가져가며,
+    가져간 프로세스가 분석을 끝내지 못하면 점유가 만료된 뒤 다른 프로세스가 다시 가져갈 수 있습니다.
+    """
+    now = datetime.utcnow()
+    try:
+        result = await db.execute(
+            select(Diary.diary_id, Diary.content).where(
+                Diary.analysis_hash.is_(None),
+                or_(Diary.analysis_claimed_until.is_(None), Diary.analysis_claimed_until < now)
+            ).order_by(Diary.diary_id.desc()).limit(limit).with_for_update(skip_locked=True)
+        )
+        pending = list(result.all())
+        if pending:
+            await db.execute(
+                update(Diary).where(
+                    Diary.diary_id.in_([row.diary_id for row in pending])
+                ).values(
+                    analysis_claimed_until=now + timedelta(seconds=claim_seconds),
+                    # 점유 표시는 일기 수정이 아니므로 update_date(onupdate)를 그대로 유지
+                    update_date=Diary.update_date
+                )
+            )
+        await db.commit()
+        return pending
+    except Exception as e:
+        await db.rollback()
+        raise
+
+
+async def aapply_diary_analysis(
+    db: AsyncSession,
+    diary_id: int,
+    content_hash: str,
+    emotion: Optional[str],
+    recommend_content: dict
+) -> bool:
+    """
+    AI 분석 결과를 저장합니다 (백그라운드 분석 워커용, emotion이 None이면 감정 없이 저장).
+    분석 이후 본문이 바뀌었거나 이미 같은 본문으로 분석된 경우 저장하지 않고 False를 반환합니다.
+    """
+    try:
+        result = await db.execute(
+            select(Diary).where(Diary.diary_id == diary_id).with_for_update()
+        )
+        db_diary = result.scalars().first()
+        if (
+            db_diary is None
+            or db_diary.analysis_hash == content_hash
+            or diary_content_hash(db_diary.content) != content_hash
+        ):
+            await db.rollback()
+            return False
+
+        old_emotion = db_diary.emotion
+        db_diary.emotion = emotion
+        db_diary.recommend_content = recommend_content
+        db_diary.analysis_hash = content_hash
+
+        for stat in _emotion_stat_changes(db_diary.user_id, db_diary.diary_date, old_emotion, db_diary.diary_date, emotion):
+            await db.execute(stat)
+        await db.commit()
+        return True
+    except Exception as e:
+        await db.rollback()
+        raise
+
+
+async def aget_pending_analysis_by_dates(db: AsyncSession, user_id: int, diary_dates: List[date]) -> List:
+    """주어진 날짜들 중 AI 분석 대기 중인 사용자 일기 (diary_id, content) 목록"""
+    if not diary_dates:
+        return []
+    result = await db.execute(
+        select(Diary.diary_id, Diary.content).where(
+            Diary.user_id == user_id,
+            Diary.diary_date.in_(diary_dates),
+            Diary.analysis_hash.is_(None)
+        )
+    )
+    return list(result.all())
+
+
+# 백업(export) 시 내보내는 컬럼 (import 시 DiaryCreateRequest로 다시 읽을 수 있음)
+EXPORT_COLUMNS = (
+    Diary.diary_id, Diary.title, Diary.content, Diary.emotion, Diary.recommend_content,
+    Diary.diary_date, Diary.create_date, Diary.update_date
+)
+
+
+def export_diaries_query(user_id: int, yield_per: int = 500):
+    """사용자 일기 전체 조회 쿼리 (서버 측 커서로 yield_per 행씩 가져옴)"""
+    return select(*EXPORT_COLUMNS).where(
+        Diary.user_id == user_id
+    ).order_by(Diary.diary_date.asc()).execution_options(yield_per=yield_per)
+
+
+async def aimport_diaries(
+    db: AsyncSession,
+    user_id: int,
+    rows: List[Tuple[int, DiaryCreateRequest]]
+) -> Tuple[List[Tuple[int, DiaryCreateRequest]], Dict[int, str]]:
+    """
+    일기 여러 개를 multi-row INSERT 1회로 저장합니다 (import용).
+    rows는 (줄 번호, 일기) 목록이며, (저장된 행 목록, {줄 번호: 오류 메시지})를 반환합니다.
+    같은 날짜의 일기가 이미 있거나 같은 배치에 중복된 줄은 저장하지 않고 오류로 보고합니다.
+    """
+    errors: Dict[int, str] = {}
+    result = await db.execute(
+        select(Diary.diary_date).where(
+            Diary.user_id == user_id,
+            Diary.diary_date.in_({diary.diary_date for _, diary in rows})
+        )
+    )
+    taken = set(result.scalars().all())
+
+    accepted = []
+    for line_no, diary in rows:
+        if diary.diary_date in taken:
+            errors[line_no] = f"{diary.diary_date} 날짜에 이미 일기가 존재합니다"
+            continue
+        taken.add(diary.diary_date)
+        accepted.append((line_no, diary))
+
+    if not accepted:
+        return [], errors
+
+    values = [
+        {
+            "user_id": user_id,
+            "title": diary.title,
+            "content": diary.content,
+            "diary_date": diary.diary_date,
+            "emotion": diary.emotion,
+            "recommend_content": diary.recommend_content,
+            "analysis_hash": _initial_analysis_hash(diary)
+        }
+        for _, diary in accepted
+    ]
+    # 월별 감정 집계는 (년, 월, 감정)별로 묶어서 한 번씩 증가
+    stat_counts = Counter(
+        (diary.diary_date.year, diary.diary_date.month, diary.emotion)
+        for _, diary in accepted if diary.emotion
+    )
+    try:
+        await db.execute(insert(Diary), values)
+        for (year, month, emotion), count in stat_counts.items():
+            await db.execute(_emotion_stat_delta(user_id, date(year, month, 1), emotion, count))
+        await db.commit()
+        return accepted, errors
+    except IntegrityError:
+        # 확인 이후 동시에 같은 날짜가 저장된 경우: 한 줄씩 저장해 실패한 줄만 보고
+        await db.rollback()
+    except Exception as e:
+        await db.rollback()
+        raise
+
+    inserted = []
+    for (line_no, diary), row in zip(accepted, values):
+        try:
+            await db.execute(insert(Diary), [row])
+            stat = _emotion_stat_delta(user_id, diary.diary_date, diary.emotion, 1)
+            if stat is not None:
+                await db.execute(stat)
+            await db.commit()
+            inserted.append((line_no, diary))
+        except IntegrityError:
+            await db.rollback()
+            errors[line_no] = f"{diary.diary_date} 날짜에 이미 일기가 존재합니다"
+    return inserted, errors
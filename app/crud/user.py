@@ -1,8 +1,15 @@
+from typing import Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import or_, select
 from app.db.models import User
-from app.schemas.user import UserSignupRequest
-from app.core.security import get_password_hash
+from app.schemas.user import UserSignupRequest, UserResponse
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.security import get_password_hash, password_hasher
+
+# user_id -> UserResponse (프로필 read-through 캐시, 사용자 정보 변경 시 무효화)
+user_cache = TTLCache(settings.USER_CACHE_SIZE, settings.USER_CACHE_TTL_SECONDS)
 
 
 def get_user_by_username(db: Session, username: str):
@@ -58,3 +65,99 @@ def create_user(db: Session, user_data: UserSignupRequest):
     except Exception as e:
         db.rollback()
         raise
+
+
+# ---------- 비동기 버전 (AsyncSession, async 라우트용) ----------
+
+async def aget_user_by_id(db: AsyncSession, user_id: int) -> Optional[User]:
+    """user_id로 유저 조회"""
+    result = await db.execute(select(User).where(User.user_id == user_id))
+    return result.scalars().first()
+
+
+async def aget_user_profile(db: AsyncSession, user_id: int) -> Optional[UserResponse]:
+    """사용자 프로필 조회 (캐시에 있으면 DB 조회 없이 반환)"""
+    profile = user_cache.get(user_id)
+    if profile is not None:
+        return profile
+
+    user = await aget_user_by_id(db, user_id)
+    if user is None:
+        return None
+    profile = UserResponse.model_validate(user)
+    user_cache.set(user_id, profile)
+    return profile
+
+
+async def aget_user_by_username(db: AsyncSession, username: str) -> Optional[User]:
+    """username으로 유저 조회"""
+    result = await db.execute(select(User).where(User.username == username))
+    return result.scalars().first()
+
+
+async def acheck_duplicate_user(db: AsyncSession, username: str, email: str, nick_name: str) -> Optional[User]:
+    """유저 중복 체크 (1번의 쿼리로 username, email, nickname 동시 검증)"""
+    result = await db.execute(
+        select(User).where(
+            or_(
+                User.username == username,
+                User.email == email,
+                User.nick_name == nick_name
+            )
+        )
+    )
+    return result.scalars().first()
+
+
+async def acreate_user(db: AsyncSession, user_data: UserSignupRequest) -> User:
+    """새로운 유저 생성 (bcrypt 해싱은 전용 프로세스 풀에서 실행, 가득 차면 PasswordHasherBusy)"""
+    hashed_password = await password_hasher.hash(user_data.password)
+    try:
+
+        db_user = User(
+            username=user_data.username,
+            password=hashed_password,
+            person_name=user_data.person_name,
+            nick_name=user_data.nick_name,
+            email=user_data.email,
+            phone=user_data.phone
+        )
+
+        db.add(db_user)
+        await db.commit()
+        await db.refresh(db_user)
+
+        return db_user
+    except Exception as e:
+        await db.rollback()
+        raise
+
+
+async def aupdate_user_character(db: AsyncSession, user_id: int, character: str) -> Optional[User]:
+    """유저 캐릭터 변경"""
+    try:
+        db_user = await aget_user_by_id(db, user_id)
+        if not db_user:
+            return None
+
+        db_user.character = character
+        await db.commit()
+        await db.refresh(db_user)
+        user_cache.delete(user_id)
+        return db_user
+    except Exception as e:
+        await db.rollback()
+        raise
+
+
+async def aupdate_user_password_hash(db: AsyncSession, user: User, hashed_password: str):
+    """로그인 시 bcrypt cost가 바뀐 해시를 새 해시로 교체"""
+    try:
+        user.password = hashed_password
+        await db.commit()
+        # update_date(onupdate) 등 만료된 값을 다시 읽어옴 (로그인 응답 직렬화 시 lazy load 방지)
+        await db.refresh(user)
+        user_cache.delete(user.user_id)
+    except Exception as e:
+        await db.rollback()
+        raise
@@ -19,6 +19,50 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 # 모델 베이스 클래스
 Base = declarative_base()
 
+# 비동기 엔진 / 세션 팩토리 (API 라우트용, 처음 사용할 때 생성)
+# 스크립트처럼 동기 엔진만 쓰는 곳에서는 비동기 드라이버(asyncmy)가 없어도 동작합니다.
+_async_engine = None
+_async_session_factory = None
+
+
+def get_async_engine():
+    """비동기 데이터베이스 엔진 (최초 호출 시 생성)"""
+    global _async_engine, _async_session_factory
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+        _async_engine = create_async_engine(
+            settings.async_database_url,
+            pool_pre_ping=True,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            echo=not settings.is_production
+        )
+        # commit 후에도 객체 속성을 다시 조회하지 않도록 expire_on_commit=False
+        _async_session_factory = async_sessionmaker(
+            _async_engine,
+            autoflush=False,
+            expire_on_commit=False
+        )
+    return _async_engine
+
+
+def AsyncSessionLocal():
+    """비동기 세션 생성"""
+    if _async_session_factory is None:
+        get_async_engine()
+    return _async_session_factory()
+
+
+async def dispose_async_engine():
+    """비동기 엔진의 연결 풀 정리 (서버 종료 시)"""
+    global _async_engine, _async_session_factory
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+        _async_session_factory = None
+
 
 # 모든 테이블 생성
 def init_db():
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Enum, JSON, Text, Date, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Enum, JSON, Text, Date, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.database import Base
@@ -43,6 +43,10 @@ class User(Base):
 
 class Diary(Base):
     __tablename__ = "Diary"
+    __table_args__ = (
+        # 사용자별 날짜 조회/월 범위 조회용 복합 인덱스 (하루에 일기 1개 보장)
+        Index("uq_diary_user_date", "user_id", "diary_date", unique=True),
+    )
 
     # 기본 키
     diary_id = Column(Integer, primary_key=True, index=True, autoincrement=True)
@@ -57,6 +61,8 @@ class Diary(Base):
     # AI 분석 결과 (AI API 연동 전까지 null)
     emotion = Column(String(20), nullable=True)  # "기쁨", "슬픔", "분노", "불안", "설렘", "무기력"
     recommend_content = Column(JSON, nullable=True)  # {"도서": [...], "음악": [...], "식사": [...]}
+    analysis_hash = Column(String(64), nullable=True)  # 분석에 사용한 본문의 sha256 (NULL이면 분석 대기)
+    analysis_claimed_until = Column(DateTime, nullable=True)  # 분석 복구를 가져간 프로세스의 점유 만료 시각 (UTC)
 
     # 일기 날짜 (달력 표시용)
     diary_date = Column(Date, nullable=False, index=True)
@@ -67,3 +73,17 @@ class Diary(Base):
 
     # 관계 설정
     user = relationship("User", back_populates="diaries")
+
+
+class DiaryEmotionStat(Base):
+    """월별 감정 집계 (일기 작성/수정/삭제와 같은 트랜잭션에서 증감)"""
+    __tablename__ = "DiaryEmotionStat"
+
+    # 복합 기본 키 (user_id, year, month, emotion)
+    user_id = Column(Integer, ForeignKey("User.user_id", ondelete="CASCADE"), primary_key=True)
+    year = Column(Integer, primary_key=True, autoincrement=False)
+    month = Column(Integer, primary_key=True, autoincrement=False)
+    emotion = Column(String(20), primary_key=True)
+
+    # 해당 월에 이 감정으로 기록된 일기 수
+    diary_count = Column(Integer, nullable=False, default=0)
@@ -77,3 +77,25 @@ class DiaryCalendarResponse(BaseModel):
     year: int
     month: int
     diaries: List[DiaryListResponse]
+
+
+# 월별 감정 통계 응답 스키마
+class DiaryEmotionStatsResponse(BaseModel):
+    year: int
+    month: int
+    total: int = Field(..., description="감정이 기록된 일기 수")
+    emotions: Dict[str, int] = Field(..., description="감정별 일기 수")
+    dominant_emotion: Optional[str] = Field(None, description="가장 많이 기록된 감정")
+
+
+# 일기 가져오기(import) 실패 줄 정보
+class DiaryImportError(BaseModel):
+    line: int = Field(..., description="NDJSON 줄 번호 (1부터)")
+    detail: str
+
+
+# 일기 가져오기(import) 응답 스키마
+class DiaryImportResponse(BaseModel):
+    imported: int
+    failed: int
+    errors: List[DiaryImportError] = Field(..., description="실패한 줄 목록 (줄 번호 순 최대 100개, 전체 실패 수는 failed)")
@@ -0,0 +1,4 @@
+"""
+Services module.
+Background workers and in-process services shared by the API routes.
+"""
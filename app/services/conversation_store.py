@@ -0,0 +1,223 @@
+# conversation_store.py
+# 사용자별 대화 세션 저장소
+# /api/chat 이 대화 턴을 감지된 감정과 함께 기록하고, /api/recommend 는 전체 대화를 다시 분석하지 않고
+# 마지막 감정과 캐시된 대화 임베딩을 재사용합니다.
+# 세션은 최근 max_turns 턴만 보관하는 링 버퍼이며, 밀려난 턴은 대화 요약에 합쳐집니다. (ai_core.llm.history_compactor)
+# 요약에 아직 합치지 않은 발화도 최근 max_turns개까지만 보관하고, 압축이 꺼져 있으면 보관하지 않습니다.
+# 저장 위치는 백엔드로 교체할 수 있습니다. (기본: 프로세스 메모리)
+
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, List, Optional
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+
+@dataclass
+class ConversationTurn:
+    """대화 한 턴 (사용자 문장 + 감지된 감정 + 챗봇 응답)"""
+    sentence: str
+    emotion: str
+    answer: str
+    created_at: float = field(default_factory=time.time)
+
+
+@dataclass
+class ConversationSession:
+    """대화 세션 하나"""
+    turns: Deque[ConversationTurn]
+    version: int = 0  # 턴이 추가될 때마다 증가
+    summary: str = ""  # 링 버퍼에서 밀려난 턴들의 요약
+    pending: Deque[str] = field(default_factory=deque)  # 밀려났지만 아직 요약에 합치지 않은 발화 (최근 것만 보관)
+    history_tokens: int = 0  # 지금까지 기록된 전체 발화의 토큰 수 (추정치, 압축 지표용)
+    embedding: Optional[List[float]] = None  # 대화 임베딩 캐시
+    embedding_version: int = -1  # embedding을 계산한 시점의 version
+
+
+class ConversationBackend(ABC):
+    """
+    대화 세션 저장소 백엔드
+    여러 워커가 세션을 공유해야 하면 같은 인터페이스로 외부 저장소(Redis 등) 백엔드를 구현해 교체합니다.
+    """
+
+    @abstractmethod
+    async def load(self, key: str) -> Optional[ConversationSession]:
+        ...
+
+    @abstractmethod
+    async def save(self, key: str, session: ConversationSession):
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str):
+        ...
+
+    def stats(self) -> dict:
+        return {}
+
+
+class InMemoryConversationBackend(ConversationBackend):
+    """
+    프로세스 메모리 백엔드 (워커 간 공유되지 않음)
+
+    Args:
+        max_sessions: 최대 세션 수 (초과 시 가장 오래 사용되지 않은 세션부터 제거)
+        ttl_seconds: 마지막 저장 이후 세션 보관 시간
+    """
+
+    def __init__(self, max_sessions: int = 10000, ttl_seconds: float = 3600):
+        self._sessions = TTLCache(max_sessions, ttl_seconds)
+
+    async def load(self, key: str) -> Optional[ConversationSession]:
+        return self._sessions.get(key)
+
+    async def save(self, key: str, session: ConversationSession):
+        # 저장할 때마다 만료 시간이 연장됨
+        self._sessions.set(key, session)
+
+    async def delete(self, key: str):
+        self._sessions.delete(key)
+
+    def stats(self) -> dict:
+        return self._sessions.stats()
+
+
+class ConversationStore:
+    """
+    대화 세션 저장소
+
+    Args:
+        backend: 세션 저장 백엔드
+        max_turns: 세션별 보관하는 최근 대화 턴 수 (링 버퍼)
+    """
+
+    def __init__(self, backend: ConversationBackend, max_turns: int = 20):
+        self.backend = backend
+        self.max_turns = max(1, max_turns)
+
+        # 통계
+        self._appends = 0
+        self._emotion_reuses = 0
+        self._embedding_hits = 0
+        self._embedding_misses = 0
+
+    # ---------- 기록 ----------
+
+    async def append_turn(self, key: str, sentence: str, emotion: str, answer: str):
+        """대화 턴을 기록합니다 (오래된 턴은 링 버퍼에서 밀려남)."""
+        from ai_core.llm import history_compactor
+
+        session = await self.backend.load(key)
+        if session is None:
+            session = ConversationSession(
+                turns=deque(maxlen=self.max_turns),
+                pending=deque(maxlen=self.max_turns)
+            )
+        if len(session.turns) == session.turns.maxlen and history_compactor.enabled:
+            # 요약은 대화 기록이 필요할 때 (추천 시) 한 번에 합침
+            # 추천 없이 대화만 길게 이어져도 pending은 maxlen을 넘지 않음 (더 오래된 발화는 요약에서 빠짐)
+            session.pending.append(session.turns[0].sentence)
+        session.turns.append(ConversationTurn(sentence, emotion, answer))
+        session.version += 1
+        session.history_tokens += _estimate_tokens(sentence)
+        await self.backend.save(key, session)
+        self._appends += 1
+
+    async def get_session(self, key: str) -> Optional[ConversationSession]:
+        """대화 턴이 있는 세션 (없으면 None)"""
+        session = await self.backend.load(key)
+        if session is None or not session.turns:
+            return None
+        return session
+
+    async def clear(self, key: str):
+        await self.backend.delete(key)
+
+    # ---------- 추천용 재사용 ----------
+
+    def latest_emotion(self, session: ConversationSession) -> str:
+        """가장 최근 턴에서 감지된 감정 (대화 전체를 다시 분석하지 않음)"""
+        self._emotion_reuses += 1
+        return session.turns[-1].emotion
+
+    async def atranscript(self, key: str, session: ConversationSession) -> str:
+        """
+        세션의 대화 기록 (이전 턴 요약 + 최근 발화, 토큰 예산 적용)
+        링 버퍼에서 밀려난 발화가 있으면 먼저 요약에 합칩니다.
+        """
+        from ai_core.llm import history_compactor
+
+        sentences = [turn.sentence for turn in session.turns]
+        if not history_compactor.enabled:
+            return "\n".join(sentences)
+
+        if session.pending:
+            pending = list(session.pending)
+            session.pending.clear()
+            session.summary = await history_compactor.afold(session.summary, pending)
+            await self.backend.save(key, session)
+
+        transcript = history_compactor.render(session.summary, sentences)
+        history_compactor.record(session.history_tokens, _estimate_tokens(transcript))
+        return transcript
+
+    async def aget_embedding(self, key: str, session: ConversationSession):
+        """
+        대화 임베딩 (세션에 새 턴이 없으면 캐시된 값을 그대로 사용)
+        임베딩 실패 시 None을 반환합니다.
+        """
+        if session.embedding is not None and session.embedding_version == session.version:
+            self._embedding_hits += 1
+            return session.embedding
+
+        from ai_core.llm import aget_embedding
+
+        self._embedding_misses += 1
+        version = session.version
+        embedding = await aget_embedding(await self.atranscript(key, session))
+        if embedding is not None:
+            session.embedding = embedding
+            session.embedding_version = version
+            await self.backend.save(key, session)
+        return embedding
+
+    # ---------- 지표 ----------
+
+    def stats(self) -> dict:
+        lookups = self._embedding_hits + self._embedding_misses
+        return {
+            "max_turns": self.max_turns,
+            "appends": self._appends,
+            "emotion_reuses": self._emotion_reuses,
+            "embedding_hits": self._embedding_hits,
+            "embedding_misses": self._embedding_misses,
+            "embedding_hit_rate": round(self._embedding_hits / lookups, 4) if lookups else 0.0,
+            "backend": self.backend.stats()
+        }
+
+
+def _estimate_tokens(text: str) -> int:
+    from ai_core.llm.history_compactor import estimate_tokens
+    return estimate_tokens(text)
+
+
+def session_key(user_id: Optional[int], session_id: Optional[str]) -> Optional[str]:
+    """세션 키 (로그인 사용자는 user_id, 아니면 클라이언트가 보낸 session_id)"""
+    if user_id is not None:
+        return f"user:{user_id}"
+    if session_id:
+        return f"session:{session_id}"
+    return None
+
+
+# 전역 대화 세션 저장소 인스턴스
+conversation_store = ConversationStore(
+    InMemoryConversationBackend(
+        max_sessions=settings.CONVERSATION_MAX_SESSIONS,
+        ttl_seconds=settings.CONVERSATION_TTL_SECONDS
+    ),
+    max_turns=settings.CONVERSATION_MAX_TURNS
+)
@@ -0,0 +1,248 @@
+# diary_analyzer.py
+# 새로 작성/수정된 일기의 AI 분석 백그라운드 워커
+# 일기 API는 분석 작업을 큐에 넣고 바로 응답하며, 워커가 감정과 추천 콘텐츠를 채워 넣습니다.
+# 큐는 프로세스 내 asyncio.Queue 이고, 재시작으로 잃은 작업은 시작 시 analysis_hash가 NULL인 일기로 복구합니다.
+# 워커 프로세스가 여러 개면 복구할 일기를 DB에서 점유해 나눠 가지므로 같은 일기를 중복 분석하지 않습니다.
+
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from app.core.config import settings
+from app.crud.diary import aapply_diary_analysis, aclaim_pending_analysis, diary_content_hash
+from app.db.database import AsyncSessionLocal
+
+# AI 감정 라벨 (행복/슬픔/분노/평온/불안) → 일기 감정 라벨 (기쁨/슬픔/분노/불안/설렘/무기력)
+AI_TO_DIARY_EMOTION = {"행복": "기쁨", "슬픔": "슬픔", "분노": "분노", "불안": "불안"}
+# 일기 라벨에 대응하는 감정이 없는 AI 라벨 (감정 없이 추천만 저장)
+# 평온은 분류기가 응답을 해석하지 못했을 때의 기본값이기도 해서 다른 감정으로 옮기면 월별 통계가 왜곡됨
+AI_EMOTIONS_WITHOUT_DIARY_LABEL = {"평온"}
+
+RECOMMEND_CATEGORIES = ["도서", "음악", "식사"]
+
+
+@dataclass
+class AnalysisJob:
+    """분석 작업 하나"""
+    diary_id: int
+    content: str
+    content_hash: str
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class DiaryAnalyzer:
+    """
+    일기 AI 분석 워커 풀
+
+    Args:
+        workers: 동시에 실행할 워커 수
+        batch_size: 한 번에 처리할 최대 일기 수 (임베딩은 배치 1회로 요청)
+        batch_wait_ms: 첫 작업 이후 배치를 채우기 위해 기다리는 시간
+        max_queue_size: 큐 최대 길이 (가득 차면 작업을 버리고, 재시작 시 복구 대상이 됨)
+        top_k: 카테고리별 추천 개수
+        claim_seconds: 복구한 일기의 점유 시간 (다른 프로세스는 이 동안 같은 일기를 가져가지 않음)
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        batch_size: int = 16,
+        batch_wait_ms: float = 50,
+        max_queue_size: int = 1000,
+        top_k: int = 2,
+        claim_seconds: int = 600
+    ):
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.batch_wait_ms = batch_wait_ms
+        self.max_queue_size = max_queue_size
+        self.top_k = top_k
+        self.claim_seconds = claim_seconds
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._recent_lags = deque(maxlen=256)
+
+        # 통계
+        self._enqueued = 0
+        self._dropped = 0
+        self._processed = 0
+        self._skipped = 0
+        self._failed = 0
+        self._batches = 0
+        self._batched_jobs = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    # ---------- 수명 주기 ----------
+
+    async def start(self, recover: bool = True):
+        """워커를 시작하고, 분석 대기 중인 일기를 큐에 다시 넣습니다."""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        if recover:
+            await self._recover_pending()
+
+    async def stop(self):
+        """워커를 종료합니다 (남은 작업은 다음 시작 시 복구)."""
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._queue = None
+
+    async def _recover_pending(self):
+        try:
+            async with AsyncSessionLocal() as db:
+                pending = await aclaim_pending_analysis(db, limit=self.max_queue_size, claim_seconds=self.claim_seconds)
+        except Exception as e:
+            print(f"분석 대기 일기 복구 중 오류 발생: {e}")
+            return
+        for diary_id, content in pending:
+            self.enqueue(diary_id, content)
+        if pending:
+            print(f"분석 대기 일기 {len(pending)}건을 큐에 추가했습니다.")
+
+    # ---------- 작업 등록 ----------
+
+    def enqueue(self, diary_id: int, content: str) -> bool:
+        """
+        분석 작업을 큐에 넣습니다 (응답을 기다리지 않음).
+        워커가 실행 중이 아니거나 큐가 가득 차면 False를 반환합니다.
+        """
+        if self._queue is None:
+            return False
+        try:
+            self._queue.put_nowait(AnalysisJob(diary_id, content, diary_content_hash(content)))
+        except asyncio.QueueFull:
+            self._dropped += 1
+            return False
+        self._enqueued += 1
+        return True
+
+    # ---------- 처리 ----------
+
+    async def _next_batch(self) -> List[AnalysisJob]:
+        """작업 하나를 기다린 뒤, batch_wait_ms 동안 batch_size까지 더 모읍니다."""
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.batch_wait_ms / 1000
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _worker(self):
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self._process(batch)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"일기 분석 배치 처리 중 오류 발생: {e}")
+                self._failed += len(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _process(self, batch: List[AnalysisJob]):
+        from ai_core.llm import aextract_emotion_strict, aget_embeddings
+        from ai_core.recommendation import aget_multi_category_recommendation
+        from ai_core.vector_db import vector_store
+
+        # 같은 일기가 여러 번 들어온 경우 마지막 작업만 처리
+        latest = {job.diary_id: job for job in batch}
+        self._skipped += len(batch) - len(latest)
+        jobs = list(latest.values())
+
+        self._batches += 1
+        self._batched_jobs += len(jobs)
+        now = time.monotonic()
+        for job in jobs:
+            self._recent_lags.append(now - job.enqueued_at)
+
+        # 임베딩은 배치 1회, 감정 추출은 동시에
+        # (LLM 실패 시 기본 감정이 아니라 예외를 받아, 실패한 일기는 analysis_hash를 비워 둔 채 다음 복구 때 재시도)
+        contents = [job.content for job in jobs]
+        vectors, emotions = await asyncio.gather(
+            aget_embeddings(contents),
+            asyncio.gather(*(aextract_emotion_strict(content) for content in contents), return_exceptions=True)
+        )
+
+        for job, vector, emotion in zip(jobs, vectors, emotions):
+            if isinstance(emotion, Exception) or vector is None:
+                reason = emotion if isinstance(emotion, Exception) else "임베딩 실패"
+                print(f"일기 분석 실패, 다음 복구 때 재시도합니다 (diary_id={job.diary_id}): {reason}")
+                self._failed += 1
+                continue
+            diary_emotion = AI_TO_DIARY_EMOTION.get(emotion)
+            if diary_emotion is None and emotion not in AI_EMOTIONS_WITHOUT_DIARY_LABEL:
+                # 일기 라벨로 옮길 수 없는 감정은 저장하지 않고, 다음 복구 때 다시 분석
+                print(f"알 수 없는 감정 라벨로 일기 분석을 건너뜁니다 (diary_id={job.diary_id}, emotion={emotion})")
+                self._failed += 1
+                continue
+            try:
+                opposite_emotion = vector_store.opposite_of(emotion) or "평온"
+                recommendations = await aget_multi_category_recommendation(
+                    user_vector=vector,
+                    emotion=opposite_emotion,
+                    categories=RECOMMEND_CATEGORIES,
+                    top_k=self.top_k
+                )
+                async with AsyncSessionLocal() as db:
+                    applied = await aapply_diary_analysis(
+                        db,
+                        job.diary_id,
+                        job.content_hash,
+                        diary_emotion,
+                        recommendations
+                    )
+                if applied:
+                    self._processed += 1
+                else:
+                    # 삭제되었거나, 분석 중 본문이 바뀌었거나, 이미 분석된 일기
+                    self._skipped += 1
+            except Exception as e:
+                print(f"일기 분석 결과 저장 중 오류 발생 (diary_id={job.diary_id}): {e}")
+                self._failed += 1
+
+    # ---------- 지표 ----------
+
+    def stats(self) -> dict:
+        """큐 길이, 대기 시간(lag), 처리 결과 통계"""
+        lags = sorted(self._recent_lags)
+        return {
+            "running": self.running,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue_size": self.max_queue_size,
+            "enqueued": self._enqueued,
+            "dropped": self._dropped,
+            "processed": self._processed,
+            "skipped": self._skipped,
+            "failed": self._failed,
+            "batches": self._batches,
+            "avg_batch_size": round(self._batched_jobs / self._batches, 2) if self._batches else 0.0,
+            # 큐에 들어간 뒤 처리 시작까지 걸린 시간 (최근 작업 기준)
+            "lag_ms_p50": round(lags[len(lags) // 2] * 1000, 1) if lags else None,
+            "lag_ms_max": round(lags[-1] * 1000, 1) if lags else None
+        }
+
+
+# 전역 분석 워커 인스턴스 (main.py lifespan에서 시작/종료)
+diary_analyzer = DiaryAnalyzer(
+    workers=settings.DIARY_ANALYSIS_WORKERS,
+    batch_size=settings.DIARY_ANALYSIS_BATCH_SIZE,
+    max_queue_size=settings.DIARY_ANALYSIS_QUEUE_SIZE,
+    claim_seconds=settings.DIARY_ANALYSIS_CLAIM_SECONDS
+)
@@ -100,13 +100,15 @@ FOOD_DATA = {
     ]
 }
 
+# 카테고리별 데이터 매핑
+CATEGORY_DATA = {
+    "도서": BOOK_DATA,
+    "음악": MUSIC_DATA,
+    "식사": FOOD_DATA
+}
+
+
 def get_recommendation_data(emotion: str, category: str):
     """감정과 카테고리에 따라 추천 데이터를 반환합니다."""
-    data_map = {
-        "도서": BOOK_DATA,
-        "음악": MUSIC_DATA,
-        "식사": FOOD_DATA
-    }
-
-    data_source = data_map.get(category, {})
+    data_source = CATEGORY_DATA.get(category, {})
     return data_source.get(emotion, [])
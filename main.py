@@ -1,13 +1,37 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-# API 라우터 import
-from app.api import auth, diary, chat, user
+from app.core.config import settings
+from app.core.security import password_hasher
+from app.db.database import dispose_async_engine
+from app.services.diary_analyzer import diary_analyzer
+
+# API 라우터 import (AI 라우터는 아래에서 설정에 따라 로드)
+from app.api import auth, diary, metrics, user
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """서버 시작/종료 훅"""
+    if settings.AI_ROUTES_ENABLED and settings.AI_EAGER_INIT:
+        import ai_core
+        await asyncio.to_thread(ai_core.warmup)
+    if settings.AI_ROUTES_ENABLED and settings.DIARY_ANALYSIS_ENABLED:
+        await diary_analyzer.start()
+    yield
+    await diary_analyzer.stop()
+    password_hasher.shutdown()
+    await dispose_async_engine()
+
 
 app = FastAPI(
     title="ICSYF AI Integrated API",
     description="감정 기반 정서 관리 플랫폼 통합 API (AI + Backend)",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan
 )
 
 # CORS 설정
@@ -31,7 +55,12 @@ app.add_middleware(
 app.include_router(auth.router)
 app.include_router(user.router)
 app.include_router(diary.router)
-app.include_router(chat.router)
+app.include_router(metrics.router)
+
+# AI 라우터는 openai / google / faiss 의존성을 가져오므로 필요한 워커에서만 로드
+if settings.AI_ROUTES_ENABLED:
+    from app.api import chat
+    app.include_router(chat.router)
 
 
 @app.get("/")
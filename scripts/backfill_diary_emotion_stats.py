@@ -0,0 +1,59 @@
+"""
+Backfill script for DiaryEmotionStat (monthly emotion rollup)
+
+Creates the rollup table if needed and rebuilds it from existing Diary rows.
+Run once after deploying the rollup; afterwards the diary CRUD keeps it up to date.
+Re-running is safe: the table is rebuilt in a single transaction.
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import text
+from app.db.database import engine
+from app.db.models import DiaryEmotionStat
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def backfill():
+    """Rebuild DiaryEmotionStat from Diary"""
+
+    DiaryEmotionStat.__table__.create(bind=engine, checkfirst=True)
+    print("✓ Table 'DiaryEmotionStat' is ready")
+
+    with engine.connect() as connection:
+        try:
+            print("\n→ Rebuilding monthly emotion counts...")
+            deleted = connection.execute(text("DELETE FROM `DiaryEmotionStat`")).rowcount
+            inserted = connection.execute(text("""
+                INSERT INTO `DiaryEmotionStat` (user_id, year, month, emotion, diary_count)
+                SELECT user_id, YEAR(diary_date), MONTH(diary_date), emotion, COUNT(*)
+                FROM `Diary`
+                WHERE emotion IS NOT NULL AND emotion <> ''
+                GROUP BY user_id, YEAR(diary_date), MONTH(diary_date), emotion
+            """)).rowcount
+            connection.commit()
+            print(f"✓ Removed {deleted} old rows, inserted {inserted} rows")
+
+        except Exception as e:
+            print(f"✗ Error during backfill: {e}")
+            connection.rollback()
+            raise
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Backfill: DiaryEmotionStat monthly emotion rollup")
+    print("=" * 60)
+    print()
+
+    backfill()
+
+    print()
+    print("=" * 60)
+    print("Backfill completed successfully!")
+    print("=" * 60)
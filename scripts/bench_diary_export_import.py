@@ -0,0 +1,124 @@
+"""
+Benchmark: NDJSON diary import / export
+
+Signs up a throwaway user on a running server, streams N generated diaries
+to POST /diary/import (chunked upload), then reads them back from
+GET /diary/export and reports throughput. Both directions are streamed, so
+neither the client nor the server holds the whole payload in memory.
+
+Usage:
+    uvicorn main:app --port 8000
+    python scripts/bench_diary_export_import.py --rows 100000
+"""
+import argparse
+import http.client
+import json
+import time
+import uuid
+from datetime import date, timedelta
+
+
+def request_json(conn: http.client.HTTPConnection, method: str, path: str, body: dict = None, token: str = None) -> dict:
+    headers = {"Content-Type": "application/json"}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+    response = conn.getresponse()
+    payload = response.read()
+    if response.status >= 400:
+        raise RuntimeError(f"{method} {path} failed: {response.status} {payload[:500]!r}")
+    return json.loads(payload)
+
+
+def create_user(conn: http.client.HTTPConnection) -> str:
+    """Sign up a benchmark user and return an access token"""
+    suffix = uuid.uuid4().hex[:8]
+    password = "bench-password-1234"
+    request_json(conn, "POST", "/auth/signup", {
+        "username": f"bench_{suffix}",
+        "password": password,
+        "person_name": "bench",
+        "nick_name": f"bench_{suffix}",
+        "email": f"bench_{suffix}@example.com",
+        "phone": "010-0000-0000"
+    })
+    login = request_json(conn, "POST", "/auth/login", {"username": f"bench_{suffix}", "password": password})
+    return login["access_token"]
+
+
+def generate_lines(rows: int, lines_per_chunk: int = 1000):
+    """Yield NDJSON chunks (one diary per day, emotion/recommendations included so no AI analysis is queued)"""
+    start = date(1800, 1, 1)
+    chunk = []
+    for i in range(rows):
+        chunk.append(json.dumps({
+            "title": f"bench {i}",
+            "content": "벤치마크용 일기입니다. " * 20,
+            "diary_date": (start + timedelta(days=i)).isoformat(),
+            "emotion": "기쁨",
+            "recommend_content": {"도서": [], "음악": [], "식사": []}
+        }, ensure_ascii=False))
+        if len(chunk) == lines_per_chunk:
+            yield ("\n".join(chunk) + "\n").encode("utf-8")
+            chunk = []
+    if chunk:
+        yield ("\n".join(chunk) + "\n").encode("utf-8")
+
+
+def bench_import(host: str, port: int, token: str, rows: int) -> float:
+    conn = http.client.HTTPConnection(host, port, timeout=3600)
+    started = time.perf_counter()
+    conn.request(
+        "POST",
+        "/diary/import",
+        body=generate_lines(rows),
+        headers={"Authorization": f"Bearer {token}", "Content-Type": "application/x-ndjson"},
+        encode_chunked=True
+    )
+    response = conn.getresponse()
+    result = json.loads(response.read())
+    elapsed = time.perf_counter() - started
+    print(f"[import] {result['imported']} imported, {result['failed']} failed in {elapsed:.2f}s "
+          f"({result['imported'] / elapsed:,.0f} rows/s)")
+    if result["errors"]:
+        print(f"  first error: {result['errors'][0]}")
+    return elapsed
+
+
+def bench_export(host: str, port: int, token: str) -> float:
+    conn = http.client.HTTPConnection(host, port, timeout=3600)
+    started = time.perf_counter()
+    conn.request("GET", "/diary/export", headers={"Authorization": f"Bearer {token}"})
+    response = conn.getresponse()
+
+    lines = 0
+    size = 0
+    first_byte = None
+    while True:
+        chunk = response.read(64 * 1024)
+        if not chunk:
+            break
+        if first_byte is None:
+            first_byte = time.perf_counter() - started
+        lines += chunk.count(b"\n")
+        size += len(chunk)
+    elapsed = time.perf_counter() - started
+    print(f"[export] {lines} rows, {size / 1024 / 1024:.1f} MiB in {elapsed:.2f}s "
+          f"({lines / elapsed:,.0f} rows/s, first byte after {(first_byte or 0) * 1000:.0f} ms)")
+    return elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark diary NDJSON import/export")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--rows", type=int, default=100000)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"Benchmark: diary import/export ({args.rows} rows)")
+    print("=" * 60)
+
+    token = create_user(http.client.HTTPConnection(args.host, args.port, timeout=60))
+    bench_import(args.host, args.port, token, args.rows)
+    bench_export(args.host, args.port, token)
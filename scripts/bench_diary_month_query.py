@@ -0,0 +1,153 @@
+"""
+Benchmark: calendar (month) / by-date diary queries
+
+Compares the old YEAR()/MONTH() filter with the half-open date range used by
+app.crud.diary.get_diaries_by_month, printing MySQL EXPLAIN output and timings.
+
+Usage:
+    # seed a temporary user with 5 years of daily diaries, benchmark, then clean up
+    python scripts/bench_diary_month_query.py --seed-years 5
+
+    # benchmark an existing user
+    python scripts/bench_diary_month_query.py --user-id 1 --year 2024 --month 6
+"""
+import argparse
+import sys
+import time
+import uuid
+from datetime import date, timedelta
+from pathlib import Path
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import insert, text
+from app.db.database import engine, SessionLocal
+from app.db.models import User, Diary
+from app.crud.diary import month_range
+from dotenv import load_dotenv
+
+load_dotenv()
+
+OLD_MONTH_QUERY = """
+    SELECT * FROM `Diary`
+    WHERE user_id = :user_id
+    AND YEAR(diary_date) = :year
+    AND MONTH(diary_date) = :month
+    ORDER BY diary_date ASC
+"""
+
+NEW_MONTH_QUERY = """
+    SELECT * FROM `Diary`
+    WHERE user_id = :user_id
+    AND diary_date >= :start
+    AND diary_date < :end
+    ORDER BY diary_date ASC
+"""
+
+BY_DATE_QUERY = """
+    SELECT * FROM `Diary`
+    WHERE user_id = :user_id
+    AND diary_date = :diary_date
+"""
+
+
+def seed_user(years: int) -> int:
+    """Create a benchmark user with one diary per day for the given number of years"""
+    suffix = uuid.uuid4().hex[:8]
+    db = SessionLocal()
+    try:
+        user = User(
+            username=f"bench_{suffix}",
+            password="!",
+            person_name="bench",
+            nick_name=f"bench_{suffix}",
+            email=f"bench_{suffix}@example.com",
+            phone="000-0000-0000"
+        )
+        db.add(user)
+        db.commit()
+        user_id = user.user_id
+    finally:
+        db.close()
+
+    start = date.today() - timedelta(days=365 * years)
+    rows = [
+        {
+            "user_id": user_id,
+            "title": f"bench {i}",
+            "content": "벤치마크용 일기입니다. " * 20,
+            "diary_date": start + timedelta(days=i)
+        }
+        for i in range(365 * years)
+    ]
+    with engine.begin() as connection:
+        for offset in range(0, len(rows), 1000):
+            connection.execute(insert(Diary), rows[offset:offset + 1000])
+
+    print(f"✓ Seeded user_id={user_id} with {len(rows)} diaries")
+    return user_id
+
+
+def cleanup_user(user_id: int):
+    with engine.begin() as connection:
+        connection.execute(text("DELETE FROM `Diary` WHERE user_id = :user_id"), {"user_id": user_id})
+        connection.execute(text("DELETE FROM `User` WHERE user_id = :user_id"), {"user_id": user_id})
+    print(f"✓ Removed benchmark user_id={user_id}")
+
+
+def explain(connection, label: str, query: str, params: dict):
+    print(f"\n[{label}] EXPLAIN")
+    result = connection.execute(text("EXPLAIN " + query), params)
+    columns = list(result.keys())
+    for row in result.fetchall():
+        info = dict(zip(columns, row))
+        print(f"  type={info.get('type')}  key={info.get('key')}  rows={info.get('rows')}  extra={info.get('Extra')}")
+
+
+def timed(connection, label: str, query: str, params: dict, repeat: int):
+    connection.execute(text(query), params).fetchall()  # warm-up
+    started = time.perf_counter()
+    for _ in range(repeat):
+        count = len(connection.execute(text(query), params).fetchall())
+    elapsed_ms = (time.perf_counter() - started) * 1000 / repeat
+    print(f"[{label}] {elapsed_ms:.2f} ms/query ({count} rows, {repeat} runs)")
+
+
+def run(user_id: int, year: int, month: int, repeat: int):
+    start, end = month_range(year, month)
+    month_params = {"user_id": user_id, "year": year, "month": month, "start": start, "end": end}
+    date_params = {"user_id": user_id, "diary_date": start}
+
+    with engine.connect() as connection:
+        explain(connection, "month / YEAR()+MONTH()", OLD_MONTH_QUERY, month_params)
+        explain(connection, "month / half-open range", NEW_MONTH_QUERY, month_params)
+        explain(connection, "by-date", BY_DATE_QUERY, date_params)
+
+        print()
+        timed(connection, "month / YEAR()+MONTH()", OLD_MONTH_QUERY, month_params, repeat)
+        timed(connection, "month / half-open range", NEW_MONTH_QUERY, month_params, repeat)
+        timed(connection, "by-date", BY_DATE_QUERY, date_params, repeat)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark diary month/by-date queries")
+    parser.add_argument("--user-id", type=int, help="existing user to benchmark")
+    parser.add_argument("--seed-years", type=int, default=5, help="years of daily diaries to seed when --user-id is not given")
+    parser.add_argument("--year", type=int, help="year to query (default: last year)")
+    parser.add_argument("--month", type=int, default=6)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--keep", action="store_true", help="keep the seeded user")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Benchmark: diary month / by-date queries")
+    print("=" * 60)
+
+    seeded = args.user_id is None
+    user_id = args.user_id if not seeded else seed_user(args.seed_years)
+    try:
+        run(user_id, args.year or date.today().year - 1, args.month, args.repeat)
+    finally:
+        if seeded and not args.keep:
+            cleanup_user(user_id)
@@ -0,0 +1,94 @@
+"""
+Migration script to add background analysis columns to Diary table
+
+analysis_hash stores the sha256 of the content the AI analysis (emotion,
+recommend_content) was computed from. NULL means the diary is waiting for
+background analysis. Diaries that already have both emotion and
+recommend_content are marked as analyzed so they are not re-analyzed.
+
+analysis_claimed_until records until when a worker process has claimed a
+pending diary during startup recovery, so other processes skip it instead
+of analyzing the same diary again. An expired claim can be picked up again.
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import text
+from app.db.database import engine
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _column_info(connection, column: str):
+    """Return (COLUMN_NAME, COLUMN_TYPE) of a Diary column, or None if missing"""
+    result = connection.execute(text("""
+        SELECT COLUMN_NAME, COLUMN_TYPE
+        FROM INFORMATION_SCHEMA.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE()
+        AND TABLE_NAME = 'Diary'
+        AND COLUMN_NAME = :column
+    """), {"column": column})
+    return result.fetchone()
+
+
+def migrate():
+    """Add analysis_hash / analysis_claimed_until columns and mark already analyzed diaries"""
+
+    with engine.connect() as connection:
+        try:
+            column_info = _column_info(connection, "analysis_hash")
+            if column_info:
+                print(f"✓ Column 'analysis_hash' exists")
+                print(f"  - Type: {column_info[1]}")
+            else:
+                print("→ Column 'analysis_hash' does not exist. Adding it...")
+                connection.execute(text("""
+                    ALTER TABLE `Diary`
+                    ADD COLUMN `analysis_hash` VARCHAR(64) NULL
+                """))
+
+                print("→ Marking diaries that already have emotion and recommend_content as analyzed...")
+                updated = connection.execute(text("""
+                    UPDATE `Diary`
+                    SET analysis_hash = SHA2(content, 256)
+                    WHERE emotion IS NOT NULL
+                    AND recommend_content IS NOT NULL
+                """)).rowcount
+                print(f"✓ Column added successfully! ({updated} diaries marked as analyzed)")
+
+            column_info = _column_info(connection, "analysis_claimed_until")
+            if column_info:
+                print(f"✓ Column 'analysis_claimed_until' exists")
+                print(f"  - Type: {column_info[1]}")
+            else:
+                print("→ Column 'analysis_claimed_until' does not exist. Adding it...")
+                connection.execute(text("""
+                    ALTER TABLE `Diary`
+                    ADD COLUMN `analysis_claimed_until` DATETIME NULL
+                """))
+                print("✓ Column added successfully!")
+
+            connection.commit()
+
+        except Exception as e:
+            print(f"✗ Error during migration: {e}")
+            connection.rollback()
+            raise
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Database Migration: Add analysis columns to Diary")
+    print("=" * 60)
+    print()
+
+    migrate()
+
+    print()
+    print("=" * 60)
+    print("Migration completed successfully!")
+    print("=" * 60)
@@ -0,0 +1,86 @@
+"""
+Migration script to add composite unique index (user_id, diary_date) to Diary table
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import text
+from app.db.database import engine
+from dotenv import load_dotenv
+
+load_dotenv()
+
+INDEX_NAME = "uq_diary_user_date"
+
+
+def migrate():
+    """Add unique index on (user_id, diary_date) if it does not exist"""
+
+    with engine.connect() as connection:
+        try:
+            # Check if index exists
+            result = connection.execute(text("""
+                SELECT INDEX_NAME, NON_UNIQUE, GROUP_CONCAT(COLUMN_NAME ORDER BY SEQ_IN_INDEX)
+                FROM INFORMATION_SCHEMA.STATISTICS
+                WHERE TABLE_SCHEMA = DATABASE()
+                AND TABLE_NAME = 'Diary'
+                AND INDEX_NAME = :index_name
+                GROUP BY INDEX_NAME, NON_UNIQUE
+            """), {"index_name": INDEX_NAME})
+
+            index_info = result.fetchone()
+
+            if index_info:
+                print(f"✓ Index '{INDEX_NAME}' exists")
+                print(f"  - Columns: {index_info[2]}")
+                print(f"  - Unique: {'YES' if index_info[1] == 0 else 'NO'}")
+                print("✓ No changes needed.")
+                return
+
+            # A unique index cannot be created while duplicate (user_id, diary_date) rows exist
+            duplicates = connection.execute(text("""
+                SELECT user_id, diary_date, COUNT(*) AS cnt
+                FROM `Diary`
+                GROUP BY user_id, diary_date
+                HAVING cnt > 1
+                LIMIT 20
+            """)).fetchall()
+
+            if duplicates:
+                print(f"✗ Found duplicate diaries for the same user and date ({len(duplicates)} shown):")
+                for user_id, diary_date, count in duplicates:
+                    print(f"  - user_id={user_id}, diary_date={diary_date}, count={count}")
+                print("\n→ Resolve the duplicates above and run this script again.")
+                raise SystemExit(1)
+
+            print(f"→ Index '{INDEX_NAME}' does not exist. Adding it...")
+            connection.execute(text(f"""
+                ALTER TABLE `Diary`
+                ADD UNIQUE INDEX `{INDEX_NAME}` (`user_id`, `diary_date`)
+            """))
+            connection.commit()
+            print("✓ Index added successfully!")
+
+        except SystemExit:
+            raise
+        except Exception as e:
+            print(f"✗ Error during migration: {e}")
+            connection.rollback()
+            raise
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Database Migration: Add (user_id, diary_date) unique index")
+    print("=" * 60)
+    print()
+
+    migrate()
+
+    print()
+    print("=" * 60)
+    print("Migration completed successfully!")
+    print("=" * 60)
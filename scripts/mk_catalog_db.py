@@ -0,0 +1,23 @@
+"""
+추천 카탈로그 임베딩 생성 스크립트
+data/recommendation_data.py 의 모든 (감정, 카테고리) 콘텐츠를 RETRIEVAL_DOCUMENT로 임베딩하여
+data/catalog_embeddings.npz 에 저장합니다. 서버는 이 파일을 로드해 질의 텍스트만 임베딩합니다.
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from ai_core.recommendation.catalog_index import catalog_index
+
+
+def create_catalog_db(force: bool = False):
+    """카탈로그 임베딩 행렬을 생성(변경분만 갱신)하고 저장합니다."""
+    print("추천 카탈로그를 벡터화하는 중...")
+    rebuilt = catalog_index.build(force=force)
+    print(f"카탈로그 임베딩 {rebuilt}개 (감정, 카테고리) 갱신 완료: {catalog_index.path}")
+
+
+if __name__ == "__main__":
+    create_catalog_db(force="--force" in sys.argv)